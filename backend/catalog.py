@@ -0,0 +1,156 @@
+"""
+Fichiers JSON servis par l'API (use_cases.json, response_schema.json) gardés en mémoire.
+
+Chaque fichier est lu et parsé une seule fois, puis rechargé automatiquement quand son
+mtime ou sa taille change (un simple `stat` par requête). Les octets bruts sont conservés
+pour être renvoyés tels quels, avec ETag / Last-Modified pour les GET conditionnels.
+
+`DerivedCache` applique le même principe à des valeurs calculées à partir de fichiers
+(réponses de use case normalisées et pré-sérialisées).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from starlette.responses import Response
+
+
+class JsonFile:
+    """Fichier JSON mis en cache, rechargé sur changement de mtime/taille."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._signature: Optional[Tuple[int, int]] = None
+        self.raw: bytes = b""
+        self.data: Any = None
+        self.etag: str = ""
+        self.mtime: float = 0.0
+        self.last_modified: str = ""
+        self.reloads = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> "JsonFile":
+        """Recharge le fichier s'il a changé depuis la dernière lecture. Lève FileNotFoundError s'il n'existe pas."""
+        stat = self.path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            raw = self.path.read_bytes()
+            data = json.loads(raw)
+            self._index(data)
+            self.raw = raw
+            self.data = data
+            self.etag = '"' + hashlib.sha1(raw).hexdigest() + '"'
+            self.mtime = stat.st_mtime
+            self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+            self._signature = signature
+            self.reloads += 1
+        return self
+
+    def _index(self, data: Any) -> None:
+        """Point d'extension : construit les index dérivés à chaque rechargement."""
+
+
+class UseCaseCatalog(JsonFile):
+    """use_cases.json indexé par id de use case."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+
+    def _index(self, data: Any) -> None:
+        use_cases = data.get("use_cases", []) if isinstance(data, dict) else []
+        self.by_id = {uc["id"]: uc for uc in use_cases if isinstance(uc, dict) and uc.get("id") is not None}
+
+    def get(self, use_case_id: str) -> Optional[Dict[str, Any]]:
+        return self.load().by_id.get(use_case_id)
+
+
+def file_signature(paths: Iterable[Path]) -> Tuple[Tuple[str, int, int], ...]:
+    """(chemin, mtime_ns, taille) de chaque fichier source ; lève FileNotFoundError si l'un manque."""
+    signature = []
+    for path in paths:
+        stat = Path(path).stat()
+        signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class DerivedCache:
+    """Valeurs dérivées de fichiers, recalculées quand un fichier source change (LRU borné).
+    Utilisable depuis le threadpool : accès sous verrou, `build` appelé hors verrou."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        # key -> (signature des sources, valeur)
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple, Any]]" = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, sources: Iterable[Path], build: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Retourne (valeur, trouvée_en_cache). `build` n'est appelé que si une source a changé."""
+        signature = file_signature(sources)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+        value = build()
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "builds": self.builds}
+
+
+def is_not_modified(request: Any, etag: str, mtime: Optional[float] = None) -> bool:
+    """Évalue If-None-Match (prioritaire) puis If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_response(request: Any, body: bytes, etag: str, mtime: Optional[float] = None,
+                         media_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> Response:
+    """Réponse 200 avec validateurs, ou 304 sans corps si le client a déjà cette version."""
+    headers = dict(headers or {})
+    headers["ETag"] = etag
+    # le client peut garder la réponse mais doit la revalider (requête conditionnelle quasi gratuite)
+    headers.setdefault("Cache-Control", "no-cache")
+    if mtime is not None:
+        headers["Last-Modified"] = formatdate(mtime, usegmt=True)
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def file_response(request: Any, json_file: JsonFile) -> Response:
+    """Sert un JsonFile tel quel (octets d'origine), avec GET conditionnel."""
+    json_file.load()
+    return conditional_response(request, json_file.raw, json_file.etag, json_file.mtime)
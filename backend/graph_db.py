@@ -0,0 +1,320 @@
+"""
+Stockage SQLite des instantanés de graphe (fichiers de réponse de data/).
+
+Un instantané est ingéré une fois (par fetch_neo4j_data.py, test_utils.save_response ou
+POST /db/ingest) ; ensuite les lectures filtrées (par label, type de relation, nœud) passent
+par les index au lieu de parser tout le fichier JSON.
+
+Tables :
+  snapshots      (id, name, source, ingested_at, file_mtime_ns, file_size, analysis, node_count, relationship_count)
+  labels         (id, name)
+  nodes          (snapshot_id, seq, id, labels, properties)          labels / properties en JSON
+  node_labels    (snapshot_id, node_seq, label_id)                   un label par ligne, pour le filtrage
+  relationships  (snapshot_id, seq, id, type, start_id, end_id, properties)
+Index sur nodes.id, node_labels.label_id, relationships.type / start_id / end_id / id.
+`seq` conserve l'ordre du fichier : un graphe relu est identique à celui normalisé depuis le JSON.
+
+Configuration : GRAPH_DB_PATH (défaut data/graph.db).
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import graph_stream
+from graph_normalizer import locate_graph_data, normalize_node, normalize_nodes, normalize_relationship, normalize_relationships
+
+DB_PATH = Path(os.environ.get("GRAPH_DB_PATH", str(Path(__file__).parent.parent / "data" / "graph.db")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    ingested_at TEXT NOT NULL,
+    file_mtime_ns INTEGER,
+    file_size INTEGER,
+    analysis TEXT,
+    node_count INTEGER NOT NULL,
+    relationship_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, seq)
+);
+CREATE TABLE IF NOT EXISTS node_labels (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    node_seq INTEGER NOT NULL,
+    label_id INTEGER NOT NULL REFERENCES labels(id),
+    PRIMARY KEY (snapshot_id, node_seq, label_id)
+);
+CREATE TABLE IF NOT EXISTS relationships (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    id TEXT,
+    type TEXT NOT NULL,
+    start_id TEXT,
+    end_id TEXT,
+    properties TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, seq)
+);
+CREATE INDEX IF NOT EXISTS nodes_id ON nodes(id, snapshot_id);
+CREATE INDEX IF NOT EXISTS node_labels_label ON node_labels(label_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS relationships_id ON relationships(id);
+CREATE INDEX IF NOT EXISTS relationships_type ON relationships(type, snapshot_id);
+CREATE INDEX IF NOT EXISTS relationships_start ON relationships(start_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS relationships_end ON relationships(end_id, snapshot_id);
+"""
+
+# lignes insérées par executemany
+BATCH_SIZE = 1000
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+
+
+def connect(path: Path = DB_PATH) -> sqlite3.Connection:
+    """Ouvre (et crée au besoin) la base. Une connexion par thread : sqlite3 ne les partage pas."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _analysis_part(document: Any, location: Optional[str]) -> Any:
+    """Partie analyse du document, sans les tableaux bruts du graphe (stockés à part)."""
+    analysis = document.get('analysis') if isinstance(document, dict) else None
+    if location == 'analysis.data' and isinstance(analysis, dict):
+        analysis = {k: v for k, v in analysis.items() if k != 'data'}
+    return analysis
+
+
+class _SnapshotWriter:
+    """Lignes d'un instantané en cours d'ingestion, écrites par lots de BATCH_SIZE."""
+
+    def __init__(self, conn: sqlite3.Connection, name: str):
+        self.conn = conn
+        self.snapshot_id = conn.execute(
+            "INSERT INTO snapshots(name, ingested_at, node_count, relationship_count) VALUES (?, ?, 0, 0)",
+            (name, datetime.now().isoformat()),
+        ).lastrowid
+        self.nodes = 0
+        self.relationships = 0
+        self._labels: Dict[str, int] = {}
+        self._node_rows: List[Tuple[Any, ...]] = []
+        self._label_rows: List[Tuple[Any, ...]] = []
+        self._edge_rows: List[Tuple[Any, ...]] = []
+
+    def _label_id(self, name: str) -> int:
+        label_id = self._labels.get(name)
+        if label_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO labels(name) VALUES (?)", (name,))
+            label_id = self._labels[name] = self.conn.execute("SELECT id FROM labels WHERE name = ?", (name,)).fetchone()[0]
+        return label_id
+
+    def add_node(self, node: Dict[str, Any]) -> None:
+        seq = self.nodes
+        self._node_rows.append((self.snapshot_id, seq, node['id'], _dumps(node['labels']), _dumps(node['properties'])))
+        self._label_rows.extend((self.snapshot_id, seq, self._label_id(label)) for label in node['labels'])
+        self.nodes += 1
+        if len(self._node_rows) >= BATCH_SIZE:
+            self.flush()
+
+    def add_relationship(self, edge: Dict[str, Any]) -> None:
+        self._edge_rows.append((self.snapshot_id, self.relationships, edge.get('id'), edge['label'], edge['from'], edge['to'],
+                                _dumps(edge['properties'])))
+        self.relationships += 1
+        if len(self._edge_rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self.conn.executemany("INSERT INTO nodes(snapshot_id, seq, id, labels, properties) VALUES (?, ?, ?, ?, ?)", self._node_rows)
+        self.conn.executemany("INSERT OR IGNORE INTO node_labels(snapshot_id, node_seq, label_id) VALUES (?, ?, ?)", self._label_rows)
+        self.conn.executemany(
+            "INSERT INTO relationships(snapshot_id, seq, id, type, start_id, end_id, properties) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self._edge_rows,
+        )
+        self._node_rows, self._label_rows, self._edge_rows = [], [], []
+
+    def finish(self, name: str, source: Optional[str], file_stat: Optional[os.stat_result], analysis: Any) -> Dict[str, Any]:
+        self.flush()
+        self.conn.execute(
+            "UPDATE snapshots SET name = ?, source = ?, file_mtime_ns = ?, file_size = ?, analysis = ?, node_count = ?,"
+            " relationship_count = ? WHERE id = ?",
+            (name, source, file_stat.st_mtime_ns if file_stat else None, file_stat.st_size if file_stat else None,
+             _dumps(analysis), self.nodes, self.relationships, self.snapshot_id),
+        )
+        return {'name': name, 'nodes': self.nodes, 'relationships': self.relationships}
+
+
+def ingest_document(conn: sqlite3.Connection, name: str, document: Any, source: Optional[str] = None,
+                    file_stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """Enregistre (ou remplace) l'instantané `name`. Retourne {'name', 'nodes', 'relationships'}."""
+    location, nodes_data, relationships_data = locate_graph_data(document)
+    with conn:
+        conn.execute("DELETE FROM snapshots WHERE name = ?", (name,))
+        writer = _SnapshotWriter(conn, name)
+        if location is not None:
+            for node in normalize_nodes(nodes_data):
+                writer.add_node(node)
+            for edge in normalize_relationships(relationships_data):
+                writer.add_relationship(edge)
+        return writer.finish(name, source, file_stat, _analysis_part(document, location))
+
+
+def ingest_file(conn: sqlite3.Connection, path: Path, source: Optional[str] = None) -> Dict[str, Any]:
+    """Ingère un fichier de réponse JSON ; l'instantané porte le nom du fichier.
+
+    Avec `ijson`, le fichier est lu en flux (voir graph_stream.parse_graph_file) et les éléments
+    écrits au fil de la lecture : la mémoire ne dépend pas de la taille du graphe. Chaque
+    emplacement de graphe rencontré est écrit dans un instantané provisoire ; celui que
+    locate_graph_data retient sur le document reconstruit est gardé, les autres supprimés."""
+    path = Path(path)
+    file_stat = path.stat()
+    source = source or str(path)
+    if graph_stream.ijson is None:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+        return ingest_document(conn, path.name, document, source=source, file_stat=file_stat)
+
+    with conn:
+        conn.execute("DELETE FROM snapshots WHERE name = ?", (path.name,))
+        writers: Dict[str, _SnapshotWriter] = {}
+
+        def writer(location: str) -> _SnapshotWriter:
+            if location not in writers:
+                writers[location] = _SnapshotWriter(conn, f"{path.name}\x00{location}")
+            return writers[location]
+
+        with open(path, "rb") as f:
+            document = graph_stream.parse_graph_file(
+                f, normalize_node, normalize_relationship,
+                lambda location, node: writer(location).add_node(node),
+                lambda location, edge: writer(location).add_relationship(edge),
+            )
+        location, _, _ = locate_graph_data(document)
+        kept = writers.pop(location, None) if location is not None else None
+        for discarded in writers.values():
+            conn.execute("DELETE FROM snapshots WHERE id = ?", (discarded.snapshot_id,))
+        if kept is None:
+            kept = _SnapshotWriter(conn, path.name)
+        return kept.finish(path.name, source, file_stat, _analysis_part(document, location))
+
+
+def list_snapshots(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT name, source, ingested_at, node_count, relationship_count FROM snapshots ORDER BY ingested_at DESC"
+    )
+    return [dict(row) for row in rows]
+
+
+def snapshot_for_file(conn: sqlite3.Connection, path: Path) -> Optional[sqlite3.Row]:
+    """Instantané ingéré depuis ce fichier dans son état actuel (même mtime et taille), sinon None."""
+    stat = Path(path).stat()
+    row = conn.execute("SELECT * FROM snapshots WHERE name = ?", (Path(path).name,)).fetchone()
+    if row is None or row["file_mtime_ns"] != stat.st_mtime_ns or row["file_size"] != stat.st_size:
+        return None
+    return row
+
+
+def _node(row: sqlite3.Row) -> Dict[str, Any]:
+    labels = json.loads(row["labels"])
+    properties = json.loads(row["properties"])
+    nid = row["id"]
+    return {
+        'id': nid,
+        'label': ', '.join(labels) if labels else (properties.get('name') or nid),
+        'labels': labels,
+        'properties': properties,
+    }
+
+
+def _edge(row: sqlite3.Row) -> Dict[str, Any]:
+    edge = {'from': row["start_id"], 'to': row["end_id"], 'label': row["type"], 'properties': json.loads(row["properties"])}
+    if row["id"] is not None:
+        edge['id'] = row["id"]
+    return edge
+
+
+def load_graph(conn: sqlite3.Connection, name: str, labels: Optional[List[str]] = None, types: Optional[List[str]] = None,
+               limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Graphe normalisé d'un instantané, dans l'ordre du fichier ; None si l'instantané n'existe pas.
+
+    Filtres (lecture partielle, via les index) : `labels` garde les nœuds portant l'un de ces labels,
+    `types` les relations de ces types, `limit` les premiers nœuds. Dès qu'un filtre de nœuds
+    s'applique, seules les relations entre nœuds retenus sont renvoyées.
+    """
+    row = conn.execute("SELECT id FROM snapshots WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    snapshot_id = row["id"]
+
+    node_sql = "SELECT seq, id, labels, properties FROM nodes WHERE snapshot_id = ?"
+    params: List[Any] = [snapshot_id]
+    if labels:
+        node_sql += (" AND seq IN (SELECT node_seq FROM node_labels JOIN labels ON labels.id = node_labels.label_id"
+                     f" WHERE node_labels.snapshot_id = ? AND labels.name IN ({','.join('?' * len(labels))}))")
+        params += [snapshot_id, *labels]
+    node_sql += " ORDER BY seq"
+    if limit is not None:
+        node_sql += " LIMIT ?"
+        params.append(limit)
+    nodes = [_node(r) for r in conn.execute(node_sql, params)]
+
+    edge_params: List[Any] = [snapshot_id]
+    if labels or limit is not None:
+        # relations entre nœuds retenus : lues depuis la table des nœuds retenus, par l'index sur start_id
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_nodes (id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.selected_nodes")
+            conn.executemany("INSERT OR IGNORE INTO temp.selected_nodes(id) VALUES (?)", ((n['id'],) for n in nodes))
+        edge_sql = ("SELECT r.id, r.type, r.start_id, r.end_id, r.properties FROM temp.selected_nodes AS s"
+                    " JOIN relationships AS r ON r.start_id = s.id AND r.snapshot_id = ?"
+                    " WHERE r.end_id IN (SELECT id FROM temp.selected_nodes)")
+    else:
+        edge_sql = "SELECT r.id, r.type, r.start_id, r.end_id, r.properties FROM relationships AS r WHERE r.snapshot_id = ?"
+    if types:
+        edge_sql += f" AND r.type IN ({','.join('?' * len(types))})"
+        edge_params += types
+    edge_sql += " ORDER BY r.seq"
+    edges = [_edge(r) for r in conn.execute(edge_sql, edge_params)]
+    return {'nodes': nodes, 'edges': edges}
+
+
+def node_relationships(conn: sqlite3.Connection, node_id: str, snapshot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Un nœud et ses relations (index start_id / end_id), dans un instantané donné ou le plus récent qui le contient."""
+    sql = ("SELECT nodes.*, snapshots.name AS snapshot FROM nodes JOIN snapshots ON snapshots.id = nodes.snapshot_id"
+           " WHERE nodes.id = ?")
+    params: List[Any] = [node_id]
+    if snapshot is not None:
+        sql += " AND snapshots.name = ?"
+        params.append(snapshot)
+    row = conn.execute(sql + " ORDER BY snapshots.ingested_at DESC LIMIT 1", params).fetchone()
+    if row is None:
+        return None
+    edges = conn.execute(
+        "SELECT id, type, start_id, end_id, properties FROM relationships WHERE snapshot_id = ? AND start_id = ?"
+        " UNION ALL SELECT id, type, start_id, end_id, properties FROM relationships WHERE snapshot_id = ? AND end_id = ?",
+        (row["snapshot_id"], node_id, row["snapshot_id"], node_id),
+    )
+    return {'snapshot': row["snapshot"], 'node': _node(row), 'edges': [_edge(r) for r in edges]}
+
+
+def stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    counts = {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+              for table in ("snapshots", "labels", "nodes", "relationships")}
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return {**counts, 'bytes': page_count * page_size}
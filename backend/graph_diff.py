@@ -0,0 +1,127 @@
+"""
+Différence entre deux graphes normalisés (deux instantanés d'une même analyse, par exemple).
+
+Chaque élément est réduit à une empreinte de son contenu (blake2b du JSON canonique) : un seul
+passage sur chaque graphe suffit, et seuls les éléments dont l'empreinte diffère sont comparés
+propriété par propriété.
+
+  - nœuds : appariés par `id` ;
+  - arêtes : appariées par `id` (element id Neo4j) quand elles en ont un ; les arêtes de head sans
+    id, ou dont l'id est inconnu de base, sont appariées aux arêtes de base sans id par (origine,
+    type, destination) ; entre arêtes parallèles de même type, les contenus identiques sont
+    appariés d'abord, les autres dans l'ordre des graphes.
+
+Le résultat peut servir de patch : `added` et `changed` portent l'élément complet (nouvelle
+version), `removed` l'id du nœud ou l'arête retirée.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_encode = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode
+
+
+def element_hash(value: Any) -> bytes:
+    return hashlib.blake2b(_encode(value).encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def edge_key(edge: Dict[str, Any]) -> Tuple[Any, str, Any]:
+    return edge['from'], edge['label'], edge['to']
+
+
+def property_changes(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """{propriété: {'before', 'after'}} des propriétés ajoutées, retirées ou modifiées (None = absente)."""
+    changes = {}
+    for key in before.keys() | after.keys():
+        old, new = before.get(key), after.get(key)
+        if key not in before or key not in after or element_hash(old) != element_hash(new):
+            changes[key] = {'before': old, 'after': new}
+    return changes
+
+
+def _node_changes(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    changed = {'id': after['id'], 'node': after, 'properties': property_changes(before['properties'], after['properties'])}
+    if before['labels'] != after['labels']:
+        changed['labels'] = {'before': before['labels'], 'after': after['labels']}
+    return changed
+
+
+def diff_nodes(base: List[Dict[str, Any]], head: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    base_hashes = {node['id']: (element_hash(node), node) for node in base}
+    added, changed = [], []
+    seen = set()
+    for node in head:
+        nid = node['id']
+        if nid in seen:
+            continue
+        seen.add(nid)
+        previous = base_hashes.get(nid)
+        if previous is None:
+            added.append(node)
+        elif previous[0] != element_hash(node):
+            changed.append(_node_changes(previous[1], node))
+    removed = [nid for nid in base_hashes if nid not in seen]
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def _edge_changes(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    return {'edge': after, 'properties': property_changes(before['properties'], after['properties'])}
+
+
+def diff_edges(base: List[Dict[str, Any]], head: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    by_id = {edge['id']: edge for edge in base if edge.get('id') is not None}
+    added, changed = [], []
+    seen = set()
+    # (origine, type, destination) -> {empreinte des propriétés: [arêtes]} pour les arêtes de base sans id
+    pending: Dict[Tuple[Any, str, Any], Dict[bytes, List[Dict[str, Any]]]] = {}
+    for edge in base:
+        if edge.get('id') is None:
+            pending.setdefault(edge_key(edge), {}).setdefault(element_hash(edge['properties']), []).append(edge)
+
+    unmatched: List[Tuple[Dict[str, Any], Tuple[Any, str, Any]]] = []
+    for edge in head:
+        eid = edge.get('id')
+        same_id = by_id.get(eid) if eid is not None else None
+        if same_id is not None:
+            if eid not in seen:
+                seen.add(eid)
+                if element_hash(same_id) != element_hash(edge):
+                    changed.append(_edge_changes(same_id, edge))
+            continue
+        key = edge_key(edge)
+        same = pending.get(key, {}).get(element_hash(edge['properties']))
+        if same:
+            same.pop()
+        else:
+            unmatched.append((edge, key))
+
+    for edge, key in unmatched:
+        candidates = pending.get(key)
+        previous: Optional[Dict[str, Any]] = None
+        if candidates:
+            for edges in candidates.values():
+                if edges:
+                    previous = edges.pop(0)
+                    break
+        if previous is None:
+            added.append(edge)
+        else:
+            changed.append(_edge_changes(previous, edge))
+    removed = [edge for eid, edge in by_id.items() if eid not in seen]
+    removed.extend(edge for candidates in pending.values() for edges in candidates.values() for edge in edges)
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def diff_graphs(base: Dict[str, Any], head: Dict[str, Any]) -> Dict[str, Any]:
+    """Différence base → head : {'summary', 'nodes': {added, removed, changed}, 'edges': {...}}."""
+    nodes = diff_nodes(base.get('nodes') or [], head.get('nodes') or [])
+    edges = diff_edges(base.get('edges') or [], head.get('edges') or [])
+    summary = {
+        'base': {'nodes': len(base.get('nodes') or []), 'edges': len(base.get('edges') or [])},
+        'head': {'nodes': len(head.get('nodes') or []), 'edges': len(head.get('edges') or [])},
+    }
+    for kind, delta in (('nodes', nodes), ('edges', edges)):
+        for change in ('added', 'removed', 'changed'):
+            summary[f'{kind}_{change}'] = len(delta[change])
+    summary['identical'] = not any(summary[f'{k}_{c}'] for k in ('nodes', 'edges') for c in ('added', 'removed', 'changed'))
+    return {'summary': summary, 'nodes': nodes, 'edges': edges}
@@ -0,0 +1,215 @@
+"""
+Négociation de contenu pour les réponses contenant un graphe.
+
+Selon l'en-tête `Accept`, la réponse est encodée en :
+  - application/json                      (défaut, toujours disponible)
+  - application/msgpack                   (nécessite `msgpack`)
+  - application/vnd.apache.arrow.stream   (nécessite `pyarrow`)
+et, selon `Accept-Encoding`, compressée en zstd (nécessite `zstandard`).
+Un encodage demandé mais non installé retombe silencieusement sur JSON / non compressé.
+
+Format Arrow IPC : une seule table d'éléments, les nœuds d'abord puis les arêtes :
+    kind ('node' | 'edge'), id (null pour une arête sans id), labels (list<string>), type,
+    source, target (index de ligne du nœud), properties (JSON)
+Le reste de la réponse (analysis, use_case, ...) est placé en JSON dans la métadonnée de
+schéma `payload`.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+
+from graph_normalizer import to_columnar
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except Exception:
+    pyarrow = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+_MEDIA_ALIASES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+VARY = "Accept, Accept-Encoding"
+
+# En dessous de cette taille, la compression ne vaut pas son coût
+MIN_COMPRESS_BYTES = 1024
+ZSTD_LEVEL = 3
+
+
+def json_default(value: Any) -> Any:
+    """Valeurs non sérialisables telles quelles : Decimal (ijson, drivers) en nombre, le reste en texte."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def available_media_types() -> List[str]:
+    types = [JSON]
+    if msgpack is not None:
+        types.append(MSGPACK)
+    if pyarrow is not None:
+        types.append(ARROW)
+    return types
+
+
+def _parse_header(value: Optional[str]) -> List[Tuple[str, float]]:
+    """Parse un en-tête de type Accept en [(valeur, q)], trié par q décroissant (ordre d'origine à q égal)."""
+    items = []
+    for position, part in enumerate((value or "").split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        token = fields[0].lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        items.append((token, q, position))
+    items.sort(key=lambda item: (-item[1], item[2]))
+    return [(token, q) for token, q, _ in items]
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """Meilleur type de contenu disponible pour l'en-tête Accept ; JSON par défaut."""
+    available = available_media_types()
+    for token, q in _parse_header(accept):
+        if q <= 0:
+            continue
+        media_type = _MEDIA_ALIASES.get(token)
+        if media_type in available:
+            return media_type
+        if token in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'zstd' si le client l'accepte et que zstandard est installé, sinon None (pas de compression)."""
+    if zstandard is None:
+        return None
+    for token, q in _parse_header(accept_encoding):
+        if token == "zstd" and q > 0:
+            return "zstd"
+    return None
+
+
+def _to_arrow(payload: Dict[str, Any]) -> bytes:
+    graph = payload.get("graph")
+    rest = {k: v for k, v in payload.items() if k != "graph"}
+    kinds: List[str] = []
+    ids: List[Optional[str]] = []
+    labels: List[Optional[List[str]]] = []
+    types: List[Optional[str]] = []
+    sources: List[Optional[int]] = []
+    targets: List[Optional[int]] = []
+    properties: List[Optional[str]] = []
+
+    if isinstance(graph, dict) and "nodes" in graph:
+        columnar = graph if graph.get("format") == "columnar" else to_columnar(graph)
+        rest["graph_format"] = "arrow"
+        rest["dropped_edges"] = columnar.get("dropped_edges", 0)
+        nodes, edges = columnar["nodes"], columnar["edges"]
+        label_sets, type_table = columnar["label_sets"], columnar["types"]
+        for nid, code, props in zip(nodes["id"], nodes["label_set"], nodes["properties"]):
+            kinds.append("node")
+            ids.append(nid)
+            labels.append(label_sets[code])
+            types.append(None)
+            sources.append(None)
+            targets.append(None)
+            properties.append(json.dumps(props, ensure_ascii=False, default=json_default))
+        edge_ids = edges.get("id") or [None] * len(edges["source"])
+        for eid, source, target, code, props in zip(edge_ids, edges["source"], edges["target"], edges["type"], edges["properties"]):
+            kinds.append("edge")
+            ids.append(eid)
+            labels.append(None)
+            types.append(type_table[code])
+            sources.append(source)
+            targets.append(target)
+            properties.append(json.dumps(props, ensure_ascii=False, default=json_default) if props else None)
+    elif graph is not None:
+        rest["graph"] = graph
+
+    table = pyarrow.table({
+        "kind": pyarrow.array(kinds, pyarrow.string()).dictionary_encode(),
+        "id": pyarrow.array(ids, pyarrow.string()),
+        "labels": pyarrow.array(labels, pyarrow.list_(pyarrow.string())),
+        "type": pyarrow.array(types, pyarrow.string()).dictionary_encode(),
+        "source": pyarrow.array(sources, pyarrow.int32()),
+        "target": pyarrow.array(targets, pyarrow.int32()),
+        "properties": pyarrow.array(properties, pyarrow.string()),
+    })
+    table = table.replace_schema_metadata({"payload": json.dumps(rest, ensure_ascii=False, default=json_default)})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_body(payload: Any, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(payload, use_bin_type=True, default=json_default)
+    if media_type == ARROW:
+        return _to_arrow(payload)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+
+def compress_body(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    if encoding != "zstd" or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), "zstd"
+
+
+def negotiate(request: Any) -> Tuple[str, Optional[str]]:
+    """(type de contenu, encodage) négociés pour une requête."""
+    return (
+        negotiate_media_type(request.headers.get("accept")),
+        negotiate_encoding(request.headers.get("accept-encoding")),
+    )
+
+
+def encode(payload: Any, media_type: str, encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+    """Encode et compresse une réponse. Retourne (corps, en-têtes de représentation)."""
+    body, applied = compress_body(encode_body(payload, media_type), encoding)
+    headers = {"Content-Type": media_type, "Vary": VARY}
+    if applied:
+        headers["Content-Encoding"] = applied
+    return body, headers
+
+
+def graph_response(request: Any, payload: Any, headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    """Réponse encodée selon Accept / Accept-Encoding de la requête."""
+    media_type, encoding = negotiate(request)
+    headers = dict(headers or {})
+
+    if media_type == JSON and encoding is None:
+        headers["Vary"] = VARY
+        return Response(content=encode_body(payload, JSON), status_code=status_code, media_type=JSON, headers=headers)
+
+    body, representation = encode(payload, media_type, encoding)
+    headers.update(representation)
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
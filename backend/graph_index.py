@@ -0,0 +1,153 @@
+"""
+Index d'adjacence compact (CSR) d'un graphe normalisé, et voisinage à k sauts d'un nœud.
+
+Pour chaque sens (sortant, entrant), les voisins de tous les nœuds sont rangés bout à bout dans
+des tableaux `array` : les voisins du nœud i sont `neighbors[offsets[i]:offsets[i + 1]]`, avec en
+regard l'index de l'arête correspondante. Le type de chaque arête est un petit entier (table
+`types`). Lister les voisins d'un nœud coûte O(degré), sans dictionnaire ni liste par nœud.
+L'index est construit une fois par graphe et gardé dans le registre (voir graph_registry).
+"""
+from array import array
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+DIRECTIONS = ("both", "out", "in")
+# lookup de nœud par propriété quand l'identifiant n'est pas un id de nœud
+LOOKUP_PROPERTIES = ("id", "label", "name")
+
+
+def _csr(n: int, keys: array, values: array, edge_ids: array) -> Tuple[array, array, array]:
+    """(offsets, voisins, arêtes) à partir de couples clé → valeur, par tri par comptage sur la clé."""
+    offsets = array('l', [0]) * (n + 1)
+    for k in keys:
+        offsets[k + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array('l', offsets[:n])
+    neighbors = array('l', [0]) * len(keys)
+    edges = array('l', [0]) * len(keys)
+    for k, v, e in zip(keys, values, edge_ids):
+        pos = cursor[k]
+        neighbors[pos] = v
+        edges[pos] = e
+        cursor[k] = pos + 1
+    return offsets, neighbors, edges
+
+
+class CSRIndex:
+    """Adjacence CSR sortante et entrante d'un graphe normalisé, arêtes typées par relation."""
+
+    def __init__(self, graph: Dict[str, Any]):
+        self.nodes: List[Dict[str, Any]] = graph.get('nodes') or []
+        self.edges: List[Dict[str, Any]] = graph.get('edges') or []
+        self.index: Dict[str, int] = {}
+        for i, node in enumerate(self.nodes):
+            self.index.setdefault(node['id'], i)
+
+        self.types: List[str] = []
+        self.type_ids: Dict[str, int] = {}
+        self.edge_type = array('l')
+        sources, targets, kept = array('l'), array('l'), array('l')
+        for e, edge in enumerate(self.edges):
+            type_id = self.type_ids.get(edge['label'])
+            if type_id is None:
+                type_id = self.type_ids[edge['label']] = len(self.types)
+                self.types.append(edge['label'])
+            self.edge_type.append(type_id)
+            u, v = self.index.get(edge['from']), self.index.get(edge['to'])
+            if u is None or v is None:
+                # arête pendante : gardée dans edges mais absente de l'adjacence
+                continue
+            sources.append(u)
+            targets.append(v)
+            kept.append(e)
+
+        n = len(self.nodes)
+        self._out = _csr(n, sources, targets, kept)
+        self._in = _csr(n, targets, sources, kept)
+
+    def type_filter(self, names: Optional[Iterable[str]]) -> Optional[FrozenSet[int]]:
+        """Ids des types de relation nommés (les types absents du graphe sont ignorés) ; None = tous."""
+        if names is None:
+            return None
+        return frozenset(self.type_ids[name] for name in names if name in self.type_ids)
+
+    def degree(self, i: int, direction: str = "both") -> int:
+        total = 0
+        for offsets, _, _ in self._lists(direction):
+            total += offsets[i + 1] - offsets[i]
+        return total
+
+    def _lists(self, direction: str) -> Tuple[Tuple[array, array, array], ...]:
+        if direction == "both":
+            return self._out, self._in
+        return (self._out,) if direction == "out" else (self._in,)
+
+    def neighbors(self, i: int, direction: str = "both", types: Optional[FrozenSet[int]] = None) -> Iterator[Tuple[int, int]]:
+        """(voisin, index de l'arête) de chaque arête de `i` dans le sens demandé, filtrées par id de type."""
+        edge_type = self.edge_type
+        for offsets, neighbors, edges in self._lists(direction):
+            for pos in range(offsets[i], offsets[i + 1]):
+                e = edges[pos]
+                if types is None or edge_type[e] in types:
+                    yield neighbors[pos], e
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'nodes': len(self.nodes),
+            'edges': len(self.edges),
+            'indexed_edges': len(self._out[1]),
+            'types': len(self.types),
+            'bytes': sum(a.itemsize * len(a) for lists in (self._out, self._in) for a in lists)
+                     + self.edge_type.itemsize * len(self.edge_type),
+        }
+
+
+def find_nodes(index: CSRIndex, ref: str) -> List[int]:
+    """Index des nœuds désignés par `ref` : id de nœud, sinon valeur d'une propriété id / label / name."""
+    if ref in index.index:
+        return [index.index[ref]]
+    for prop in LOOKUP_PROPERTIES:
+        found = [i for i, node in enumerate(index.nodes) if str(node['properties'].get(prop)) == ref]
+        if found:
+            return found
+    return []
+
+
+def ego_graph(index: CSRIndex, seed: int, depth: int = 1, direction: str = "both",
+              types: Optional[Iterable[str]] = None, max_nodes: int = 500) -> Dict[str, Any]:
+    """Voisinage de `seed` jusqu'à `depth` sauts : {'nodes', 'edges', 'hops', 'truncated'}.
+
+    `hops[i]` est la distance (en relations) du i-ème nœud à `seed`. Les arêtes sont celles, des
+    types demandés, qui relient deux nœuds du voisinage. Le parcours s'arrête à `max_nodes` nœuds
+    (`truncated` vaut alors True).
+    """
+    type_ids = index.type_filter(types)
+    hops: Dict[int, int] = {seed: 0}
+    queue = deque([seed])
+    truncated = False
+    while queue and not truncated:
+        u = queue.popleft()
+        if hops[u] >= depth:
+            continue
+        for v, _ in index.neighbors(u, direction, type_ids):
+            if v in hops:
+                continue
+            if len(hops) >= max_nodes:
+                truncated = True
+                break
+            hops[v] = hops[u] + 1
+            queue.append(v)
+
+    edges = []
+    for u in hops:
+        # chaque arête est vue depuis son origine uniquement
+        for v, e in index.neighbors(u, "out", type_ids):
+            if v in hops:
+                edges.append(index.edges[e])
+    return {
+        'nodes': [index.nodes[i] for i in hops],
+        'edges': edges,
+        'hops': list(hops.values()),
+        'truncated': truncated,
+    }
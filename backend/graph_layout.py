@@ -0,0 +1,246 @@
+"""
+Calcul côté serveur de la disposition (coordonnées x/y) des graphes.
+
+Algorithme de Fruchterman-Reingold vectorisé avec NumPy :
+  - répulsion exacte (toutes les paires, par blocs de lignes) jusqu'à EXACT_MAX_NODES nœuds ;
+  - au-delà, approximation par grille dans l'esprit de Barnes-Hut : répulsion exacte entre
+    nœuds d'une même cellule, et par le centre de masse de chaque autre cellule sinon
+    (O(n^1.5) par itération au lieu de O(n²), en mémoire bornée) ;
+  - attraction le long des arêtes, légère gravité vers l'origine pour garder les composantes
+    non connexes proches, température décroissante.
+
+Les coordonnées sont centrées sur (0, 0), à l'échelle de `edge_length` (distance idéale entre
+deux voisins, en pixels), et alignées sur l'ordre de `graph['nodes']` — donc aussi sur le
+format colonnes. Les dispositions sont mises en cache par empreinte de la topologie.
+
+Nécessite le paquet optionnel `numpy`.
+"""
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_cache import ResultCache
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+EXACT_MAX_NODES = int(os.environ.get("LAYOUT_EXACT_MAX_NODES", "500"))
+DEFAULT_EDGE_LENGTH = float(os.environ.get("LAYOUT_EDGE_LENGTH", "140"))
+GRAVITY = 0.05
+# Taille des blocs de lignes pour la répulsion (mémoire ~ CHUNK x n x 3 flottants)
+CHUNK = 512
+
+layout_cache = ResultCache(
+    ttl=float(os.environ.get("LAYOUT_CACHE_TTL", "0")),
+    max_bytes=int(os.environ.get("LAYOUT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+
+def available() -> bool:
+    return np is not None
+
+
+def default_iterations(node_count: int) -> int:
+    """Moins d'itérations pour les gros graphes : chaque itération y coûte plus cher."""
+    if node_count <= 500:
+        return 200
+    if node_count <= 5000:
+        return 100
+    return 60
+
+
+def topology(graph: Dict[str, Any]) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """(ids des nœuds, arêtes en index de nœuds) ; les arêtes pendantes et les boucles sont ignorées.
+
+    Accepte un graphe normalisé ({'nodes', 'edges'}) ou au format colonnes.
+    """
+    if graph.get('format') == 'columnar':
+        ids = [str(nid) for nid in graph['nodes']['id']]
+        edges = graph['edges']
+        return ids, [(s, t) for s, t in zip(edges['source'], edges['target']) if s != t]
+    ids = [n['id'] for n in graph.get('nodes') or []]
+    position: Dict[str, int] = {}
+    for index, nid in enumerate(ids):
+        position.setdefault(nid, index)
+    lookup = position.get
+    pairs = []
+    for edge in graph.get('edges') or []:
+        source = lookup(edge['from'])
+        target = lookup(edge['to'])
+        if source is not None and target is not None and source != target:
+            pairs.append((source, target))
+    return ids, pairs
+
+
+def layout_key(ids: List[str], pairs: List[Tuple[int, int]], iterations: int, edge_length: float) -> str:
+    """Empreinte de la topologie et des paramètres : deux graphes de même structure partagent leur disposition."""
+    h = hashlib.sha256()
+    h.update(f"{iterations}|{edge_length}|{len(ids)}|{len(pairs)}\n".encode())
+    h.update("\x1f".join(ids).encode("utf-8", "surrogatepass"))
+    h.update(b"\n")
+    h.update(",".join(f"{s}-{t}" for s, t in pairs).encode())
+    return h.hexdigest()
+
+
+def _pairwise(x, y, px, py, k2: float, weights=None, skip=None, offset: int = 0):
+    """Déplacement de répulsion subi par les points (x, y) de la part des points (px, py), par blocs."""
+    dx_out = np.empty(len(x))
+    dy_out = np.empty(len(x))
+    for start in range(0, len(x), CHUNK):
+        stop = min(start + CHUNK, len(x))
+        dx = x[start:stop, None] - px[None, :]
+        dy = y[start:stop, None] - py[None, :]
+        w = dx * dx
+        w += dy * dy
+        np.maximum(w, 0.01, out=w)
+        np.divide(k2 if weights is None else k2 * weights[None, :], w, out=w)
+        rows = np.arange(stop - start)
+        if skip is None:
+            # pas d'auto-répulsion
+            w[rows, rows + start + offset] = 0.0
+        else:
+            w[rows, skip[start:stop]] = 0.0
+        dx_out[start:stop] = np.einsum('ij,ij->i', w, dx)
+        dy_out[start:stop] = np.einsum('ij,ij->i', w, dy)
+    return np.stack((dx_out, dy_out), axis=1)
+
+
+def _exact_repulsion(pos, k2: float):
+    x, y = pos[:, 0].copy(), pos[:, 1].copy()
+    return _pairwise(x, y, x, y, k2)
+
+
+def _grid_repulsion(pos, k2: float):
+    n = len(pos)
+    # ~sqrt(n) cellules de ~sqrt(n) nœuds : champ lointain (n x cellules) et champ proche
+    # (n x taille de cellule) coûtent chacun O(n^1.5).
+    # Cellules par quantiles (colonnes selon x, puis lignes selon y dans chaque colonne) :
+    # leur effectif reste équilibré même quand le graphe se regroupe.
+    side = max(2, int(round(n ** 0.25)))
+    column = np.empty(n, dtype=np.int64)
+    column[np.argsort(pos[:, 0], kind='stable')] = np.arange(n) * side // n
+    order = np.lexsort((pos[:, 1], column))
+    column_size = np.bincount(column, minlength=side)
+    column_start = np.cumsum(column_size) - column_size
+    row = np.empty(n, dtype=np.int64)
+    rank = np.arange(n) - column_start[column[order]]
+    row[order] = rank * side // column_size[column[order]]
+    cell = column * side + row
+    cells = side * side
+
+    counts = np.bincount(cell, minlength=cells).astype(float)
+    occupied = counts > 0
+    centers = np.zeros((cells, 2))
+    centers[:, 0] = np.bincount(cell, weights=pos[:, 0], minlength=cells)
+    centers[:, 1] = np.bincount(cell, weights=pos[:, 1], minlength=cells)
+    centers[occupied] /= counts[occupied, None]
+    centers, counts, remap = centers[occupied], counts[occupied], np.cumsum(occupied) - 1
+    own = remap[cell]
+
+    # champ lointain : centre de masse de chaque autre cellule, pondéré par son effectif
+    x, y = pos[:, 0].copy(), pos[:, 1].copy()
+    disp = _pairwise(x, y, centers[:, 0].copy(), centers[:, 1].copy(), k2, weights=counts, skip=own)
+
+    # champ proche : paires exactes à l'intérieur de chaque cellule. Les cellules ont des effectifs
+    # presque égaux : on les range dans un tableau (cellules x effectif max) et on calcule par blocs.
+    order = np.argsort(own, kind='stable')
+    sizes = np.bincount(own)
+    size = int(sizes.max())
+    slot = np.arange(n) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    members = np.full((len(sizes), size), -1, dtype=np.int64)
+    members[own[order], slot] = order
+    valid = members >= 0
+    safe = np.where(valid, members, 0)
+    cells_per_block = max(1, (CHUNK * CHUNK) // (size * size))
+    for start in range(0, len(sizes), cells_per_block):
+        index = safe[start:start + cells_per_block]
+        mask = valid[start:start + cells_per_block]
+        cx, cy = x[index], y[index]
+        dx = cx[:, :, None] - cx[:, None, :]
+        dy = cy[:, :, None] - cy[:, None, :]
+        w = dx * dx
+        w += dy * dy
+        np.maximum(w, 0.01, out=w)
+        np.divide(k2, w, out=w)
+        w *= mask[:, :, None] & mask[:, None, :]
+        diagonal = np.arange(size)
+        w[:, diagonal, diagonal] = 0.0
+        fx = np.einsum('cij,cij->ci', w, dx)
+        fy = np.einsum('cij,cij->ci', w, dy)
+        disp[index[mask], 0] += fx[mask]
+        disp[index[mask], 1] += fy[mask]
+    return disp
+
+
+def compute_layout(node_count: int, pairs: List[Tuple[int, int]], iterations: int,
+                   edge_length: float = DEFAULT_EDGE_LENGTH, seed: int = 0):
+    """Positions (tableau n x 2) par Fruchterman-Reingold ; `edge_length` joue le rôle de k."""
+    if np is None:
+        raise RuntimeError("numpy requis pour le calcul de disposition mais n'est pas installé")
+    n = node_count
+    if n == 0:
+        return np.zeros((0, 2))
+    k = float(edge_length)
+    k2 = k * k
+    extent = k * np.sqrt(n)
+    rng = np.random.default_rng(seed)
+    pos = (rng.random((n, 2)) - 0.5) * extent
+    if n == 1:
+        return pos * 0.0
+
+    edges = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    src, dst = edges[:, 0], edges[:, 1]
+    repulsion = _exact_repulsion if n <= EXACT_MAX_NODES else _grid_repulsion
+
+    temperature = extent / 10.0
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        disp = repulsion(pos, k2)
+        if len(edges):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            force = delta * (dist / k)[:, None]
+            for axis in (0, 1):
+                pull = np.bincount(src, weights=force[:, axis], minlength=n)
+                pull -= np.bincount(dst, weights=force[:, axis], minlength=n)
+                disp[:, axis] -= pull
+        disp -= GRAVITY * pos * (np.sqrt(np.einsum('ij,ij->i', pos, pos)) / k)[:, None]
+        length = np.sqrt(np.einsum('ij,ij->i', disp, disp))
+        step = np.minimum(length, temperature) / np.maximum(length, 1e-9)
+        pos += disp * step[:, None]
+        temperature -= cooling
+
+    return pos - pos.mean(axis=0)
+
+
+def layout_for(graph: Dict[str, Any], iterations: Optional[int] = None,
+               edge_length: float = DEFAULT_EDGE_LENGTH) -> Dict[str, Any]:
+    """Bloc `layout` d'une réponse : {'x', 'y', 'key', 'cached', ...}, mis en cache par empreinte."""
+    ids, pairs = topology(graph)
+    if iterations is None:
+        iterations = default_iterations(len(ids))
+    key = layout_key(ids, pairs, iterations, edge_length)
+    cached = layout_cache.get(key)
+    if cached is not None:
+        layout = dict(cached[0])
+        layout['cached'] = True
+        return layout
+
+    started = time.perf_counter()
+    pos = compute_layout(len(ids), pairs, iterations, edge_length, seed=int(key[:8], 16))
+    layout = {
+        'algorithm': 'fruchterman-reingold' if len(ids) <= EXACT_MAX_NODES else 'fruchterman-reingold-grid',
+        'iterations': iterations,
+        'edge_length': edge_length,
+        'key': key,
+        'x': [round(v, 1) for v in pos[:, 0].tolist()],
+        'y': [round(v, 1) for v in pos[:, 1].tolist()],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    layout_cache.set(key, layout, size=24 * len(ids) + 256)
+    layout = dict(layout)
+    layout['cached'] = False
+    return layout
@@ -0,0 +1,55 @@
+"""
+Envoi progressif d'une réponse de graphe en NDJSON (un objet JSON par ligne).
+
+Ordre des enregistrements :
+    {"type": "header", "node_count": N, "edge_count": M, "analysis": ..., ...}   reste de la réponse
+    {"type": "nodes", "offset": 0, "items": [...]}                               par lots de `batch_size`
+    {"type": "edges", "offset": 0, "items": [...]}
+    {"type": "end", "nodes": N, "edges": M}
+
+Les nœuds sont tous envoyés avant les arêtes : le client peut dessiner chaque lot dès réception,
+les extrémités d'une arête étant toujours connues quand elle arrive.
+"""
+import json
+import os
+from typing import Any, Dict, Iterator, Optional
+
+from starlette.responses import StreamingResponse
+
+from graph_encoding import json_default
+
+NDJSON = "application/x-ndjson"
+BATCH_SIZE = int(os.environ.get("NDJSON_BATCH_SIZE", "500"))
+
+
+def _line(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default).encode("utf-8") + b"\n"
+
+
+def ndjson_records(payload: Dict[str, Any], batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Lignes NDJSON d'une réponse {..., graph: {nodes, edges}}."""
+    graph = payload.get("graph")
+    if not isinstance(graph, dict):
+        graph = {}
+    nodes = graph.get("nodes") or []
+    edges = graph.get("edges") or []
+
+    header = {"type": "header", "node_count": len(nodes), "edge_count": len(edges)}
+    header.update((k, v) for k, v in payload.items() if k != "graph")
+    if "pruned_edges" in graph:
+        header["pruned_edges"] = graph["pruned_edges"]
+    yield _line(header)
+
+    for kind, items in (("nodes", nodes), ("edges", edges)):
+        for offset in range(0, len(items), batch_size):
+            yield _line({"type": kind, "offset": offset, "items": items[offset:offset + batch_size]})
+
+    yield _line({"type": "end", "nodes": len(nodes), "edges": len(edges)})
+
+
+def ndjson_response(payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None, batch_size: int = BATCH_SIZE) -> StreamingResponse:
+    headers = dict(headers or {})
+    headers.setdefault("Cache-Control", "no-cache")
+    # pas de mise en tampon par un reverse proxy (nginx) : les lots doivent arriver au fil de l'eau
+    headers["X-Accel-Buffering"] = "no"
+    return StreamingResponse(ndjson_records(payload, batch_size), media_type=NDJSON, headers=headers)
@@ -0,0 +1,219 @@
+"""
+Normalisation des graphes Neo4j (nodes/relationships) vers le format du frontend (nodes/edges).
+
+Utilisé par /upstream/analyze (réponse complète ou parsing incrémental) et par /use-cases/{id} :
+une seule fonction par type d'élément, partagée par tous les chemins. Les dictionnaires de
+propriétés ne sont pas recopiés.
+
+Format de sortie :
+    node = {'id': str, 'label': str, 'labels': [str], 'properties': dict}
+    edge = {'from': str | None, 'to': str | None, 'label': str, 'properties': dict, 'id': str (si présent)}
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Emplacements où chercher le graphe dans un fichier de réponse (use cases, instantanés de data/),
+# par ordre de priorité : racine, data, analysis.data, puis un graphe déjà normalisé (fichiers
+# écrits par test_utils.save_response)
+GRAPH_LOCATIONS = (
+    ((), 'nodes', 'relationships'),
+    (('data',), 'nodes', 'relationships'),
+    (('analysis', 'data'), 'nodes', 'relationships'),
+    (('graph',), 'nodes', 'edges'),
+)
+# Réponse de l'upstream /analyze/ : analysis.data, puis data (jamais la racine)
+UPSTREAM_GRAPH_LOCATIONS = (
+    (('analysis', 'data'), 'nodes', 'relationships'),
+    (('data',), 'nodes', 'relationships'),
+)
+
+
+def normalize_node(n: Any, index: int = 0) -> Optional[Dict[str, Any]]:
+    """Normalise un nœud ({id, labels, properties}). Retourne None si l'élément n'est pas un objet.
+
+    L'id est, par ordre de préférence : `id`, `properties.id`, `label`, puis `node_<index>`.
+    """
+    if not isinstance(n, dict):
+        return None
+    get = n.get
+    props = get('properties')
+    if not isinstance(props, dict):
+        props = {}
+    nid = get('id')
+    if nid is None:
+        nid = props.get('id')
+    if nid is None:
+        nid = get('label') or f'node_{index}'
+    if type(nid) is not str:
+        nid = str(nid)
+    labels = get('labels')
+    if not isinstance(labels, list):
+        labels = []
+    return {
+        'id': nid,
+        'label': ', '.join(labels) if labels else (props.get('name') or nid),
+        'labels': labels,
+        'properties': props,
+    }
+
+
+def normalize_relationship(r: Any, index: int = 0) -> Optional[Dict[str, Any]]:
+    """Normalise une relation ({id, type, start_id, end_id, properties}) ; `id` n'est gardé que s'il est présent.
+    Retourne None si ce n'est pas un objet."""
+    if not isinstance(r, dict):
+        return None
+    get = r.get
+    source = get('start_id') or get('from') or get('start')
+    target = get('end_id') or get('to') or get('end')
+    props = get('properties')
+    if not isinstance(props, dict):
+        props = {}
+    edge = {
+        'from': source if source is None or type(source) is str else str(source),
+        'to': target if target is None or type(target) is str else str(target),
+        'label': get('type') or get('relationship_type') or get('label') or '',
+        'properties': props,
+    }
+    rid = get('id')
+    if rid is not None:
+        edge['id'] = rid if type(rid) is str else str(rid)
+    return edge
+
+
+def normalize_nodes(nodes_data: Any) -> List[Dict[str, Any]]:
+    """normalize_node sur un tableau brut ; les éléments qui ne sont pas des objets sont ignorés."""
+    nodes: List[Dict[str, Any]] = []
+    if not isinstance(nodes_data, list):
+        return nodes
+    for n in nodes_data:
+        node = normalize_node(n, len(nodes))
+        if node is not None:
+            nodes.append(node)
+    return nodes
+
+
+def normalize_relationships(relationships_data: Any) -> List[Dict[str, Any]]:
+    """normalize_relationship sur un tableau brut ; les éléments qui ne sont pas des objets sont ignorés."""
+    edges: List[Dict[str, Any]] = []
+    if not isinstance(relationships_data, list):
+        return edges
+    for r in relationships_data:
+        edge = normalize_relationship(r, len(edges))
+        if edge is not None:
+            edges.append(edge)
+    return edges
+
+
+def prune_dangling_edges(nodes: Iterable[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Retire les arêtes dont une extrémité n'est pas un nœud du graphe. Retourne (arêtes, nombre retiré)."""
+    ids = {n['id'] for n in nodes}
+    kept = [e for e in edges if e['from'] in ids and e['to'] in ids]
+    return kept, len(edges) - len(kept)
+
+
+def normalize_graph(nodes_data: Any, relationships_data: Any, prune_dangling: bool = False) -> Dict[str, Any]:
+    """Normalise des tableaux bruts en {'nodes', 'edges'} (+ 'pruned_edges' si prune_dangling)."""
+    nodes = normalize_nodes(nodes_data)
+    edges = normalize_relationships(relationships_data)
+    if not prune_dangling:
+        return {'nodes': nodes, 'edges': edges}
+    edges, pruned = prune_dangling_edges(nodes, edges)
+    return {'nodes': nodes, 'edges': edges, 'pruned_edges': pruned}
+
+
+def graph_fingerprint(graph: Dict[str, Any]) -> str:
+    """Empreinte du contenu d'un graphe normalisé (nœuds et arêtes, propriétés comprises)."""
+    h = hashlib.sha256()
+    dumps = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode
+    for node in graph.get('nodes') or []:
+        h.update(dumps(node).encode('utf-8', 'surrogatepass'))
+        h.update(b'\n')
+    h.update(b'\x00')
+    for edge in graph.get('edges') or []:
+        h.update(dumps(edge).encode('utf-8', 'surrogatepass'))
+        h.update(b'\n')
+    return h.hexdigest()[:32]
+
+
+def locate_graph_data(document: Any, locations: Sequence[Tuple[Tuple[str, ...], str, str]] = GRAPH_LOCATIONS
+                      ) -> Tuple[Optional[str], Any, Any]:
+    """Trouve les tableaux bruts du graphe dans un document, au premier de `locations` qui en contient.
+
+    Retourne (emplacement, nodes, relationships) — emplacement parmi '', 'analysis.data', 'data'
+    ou 'graph' — ou (None, None, None) si aucun graphe n'est présent.
+    """
+    for path, nodes_key, edges_key in locations:
+        container = document
+        for part in path:
+            container = container.get(part) if isinstance(container, dict) else None
+        if isinstance(container, dict) and nodes_key in container and edges_key in container:
+            return '.'.join(path), container[nodes_key], container[edges_key]
+    return None, None, None
+
+
+def to_columnar(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Convertit un graphe {'nodes', 'edges'} normalisé en format colonnes.
+
+    - nodes : tableaux parallèles `id`, `label_set` (index dans `label_sets`) et `properties` ;
+      le libellé d'affichage se déduit côté client (labels joints, sinon properties.name, sinon id).
+    - edges : `source`/`target` = index dans le tableau des nœuds, `type` = index dans `types`,
+      `id` = id de la relation (null si elle n'en a pas), `properties` = null pour une relation
+      sans propriété.
+    Les arêtes dont une extrémité n'est pas un nœud du graphe sont omises (compteur `dropped_edges`).
+    """
+    label_sets: List[List[str]] = []
+    label_set_index: Dict[Tuple[str, ...], int] = {}
+    ids: List[str] = []
+    node_label_sets: List[int] = []
+    node_properties: List[Dict[str, Any]] = []
+    position: Dict[str, int] = {}
+
+    for node in graph.get('nodes') or []:
+        labels = node['labels']
+        key = tuple(labels)
+        code = label_set_index.get(key)
+        if code is None:
+            code = label_set_index[key] = len(label_sets)
+            label_sets.append(labels)
+        nid = node['id']
+        position.setdefault(nid, len(ids))
+        ids.append(nid)
+        node_label_sets.append(code)
+        node_properties.append(node['properties'])
+
+    types: List[str] = []
+    type_index: Dict[str, int] = {}
+    sources: List[int] = []
+    targets: List[int] = []
+    edge_types: List[int] = []
+    edge_ids: List[Optional[str]] = []
+    edge_properties: List[Optional[Dict[str, Any]]] = []
+    dropped = 0
+    lookup = position.get
+
+    for edge in graph.get('edges') or []:
+        source = lookup(edge['from'])
+        target = lookup(edge['to'])
+        if source is None or target is None:
+            dropped += 1
+            continue
+        reltype = edge['label']
+        code = type_index.get(reltype)
+        if code is None:
+            code = type_index[reltype] = len(types)
+            types.append(reltype)
+        sources.append(source)
+        targets.append(target)
+        edge_types.append(code)
+        edge_ids.append(edge.get('id'))
+        edge_properties.append(edge['properties'] or None)
+
+    return {
+        'format': 'columnar',
+        'label_sets': label_sets,
+        'types': types,
+        'nodes': {'id': ids, 'label_set': node_label_sets, 'properties': node_properties},
+        'edges': {'source': sources, 'target': targets, 'type': edge_types, 'id': edge_ids, 'properties': edge_properties},
+        'dropped_edges': dropped,
+    }
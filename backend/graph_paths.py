@@ -0,0 +1,140 @@
+"""
+Plus courts chemins locaux sur un graphe normalisé déjà chargé (au lieu d'un `shortestPath(...)` upstream).
+
+  - `shortest_path`  : BFS bidirectionnel (le graphe n'est pas pondéré : longueur = nombre de relations) ;
+  - `k_shortest_paths` : algorithme de Yen, les k plus courts chemins sans cycle, par longueur croissante.
+
+Comme `-[:A|B*..n]-` en Cypher, la recherche peut se limiter à certains types de relation
+(`types`), à une profondeur maximale (`max_depth`) et à un sens de parcours (`direction` :
+both, out ou in). Deux chemins qui ne diffèrent que par une relation parallèle sont distincts.
+Le parcours s'appuie sur l'index CSR du graphe (voir graph_index).
+"""
+import heapq
+import itertools
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from graph_index import CSRIndex
+
+# (index des nœuds, index des arêtes) d'un chemin
+Path = Tuple[List[int], List[int]]
+
+
+def _reverse(direction: str) -> str:
+    return {"out": "in", "in": "out"}.get(direction, direction)
+
+
+def shortest_path(index: CSRIndex, source: int, target: int, direction: str = "both",
+                  types: Optional[FrozenSet[int]] = None, max_depth: int = 10,
+                  banned_nodes: FrozenSet[int] = frozenset(), banned_edges: FrozenSet[int] = frozenset()) -> Optional[Path]:
+    """Plus court chemin source → target par BFS bidirectionnel, None s'il n'y en a pas en `max_depth` relations.
+
+    La frontière la plus petite est étendue à chaque tour : le premier nœud atteint par les deux
+    recherches donne un plus court chemin (toute rencontre d'un même tour est de longueur minimale).
+    `types` : ids de type de relation (voir CSRIndex.type_filter)."""
+    if source == target:
+        return [source], []
+    if source in banned_nodes or target in banned_nodes:
+        return None
+    # nœud -> (prédécesseur, arête) dans chaque sens de recherche
+    forward: Dict[int, Optional[Tuple[int, int]]] = {source: None}
+    backward: Dict[int, Optional[Tuple[int, int]]] = {target: None}
+    front_f, front_b = [source], [target]
+    depth = 0
+    while front_f and front_b and depth < max_depth:
+        depth += 1
+        expand_forward = len(front_f) <= len(front_b)
+        front, seen, other = (front_f, forward, backward) if expand_forward else (front_b, backward, forward)
+        step = direction if expand_forward else _reverse(direction)
+        meeting = None
+        next_front = []
+        for u in front:
+            for v, e in index.neighbors(u, step, types):
+                if v in seen or v in banned_nodes or e in banned_edges:
+                    continue
+                seen[v] = (u, e)
+                if v in other:
+                    meeting = v
+                    break
+                next_front.append(v)
+            if meeting is not None:
+                break
+        if meeting is not None:
+            nodes, edges = [meeting], []
+            link = forward[meeting]
+            while link is not None:
+                nodes.append(link[0])
+                edges.append(link[1])
+                link = forward[link[0]]
+            nodes.reverse()
+            edges.reverse()
+            link = backward[meeting]
+            while link is not None:
+                nodes.append(link[0])
+                edges.append(link[1])
+                link = backward[link[0]]
+            return nodes, edges
+        if expand_forward:
+            front_f = next_front
+        else:
+            front_b = next_front
+    return None
+
+
+def k_shortest_paths(index: CSRIndex, source: int, target: int, k: int = 1, direction: str = "both",
+                     types: Optional[Iterable[str]] = None, max_depth: int = 10) -> List[Path]:
+    """Les `k` plus courts chemins sans cycle source → target (algorithme de Yen), par longueur croissante.
+    `types` : noms des types de relation autorisés, None pour tous."""
+    types = index.type_filter(types)
+    first = shortest_path(index, source, target, direction, types, max_depth)
+    if first is None:
+        return []
+    found: List[Path] = [first]
+    seen: Set[Tuple[int, ...]] = {tuple(first[1])}
+    candidates: List[Tuple[int, int, Path]] = []
+    counter = itertools.count()
+    while len(found) < k:
+        prev_nodes, prev_edges = found[-1]
+        for i in range(len(prev_nodes) - 1):
+            root_nodes, root_edges = prev_nodes[:i + 1], prev_edges[:i]
+            # les chemins déjà retenus qui partagent cette racine ne peuvent pas repartir par la même arête ;
+            # la racine est comparée par arêtes aussi, deux relations parallèles donnant deux racines distinctes
+            banned_edges = frozenset(edges[i] for nodes, edges in found
+                                     if len(edges) > i and edges[:i] == root_edges and nodes[:i + 1] == root_nodes)
+            spur = shortest_path(index, root_nodes[-1], target, direction, types, max_depth - i,
+                                 banned_nodes=frozenset(root_nodes[:-1]), banned_edges=banned_edges)
+            if spur is None:
+                continue
+            path = (root_nodes[:-1] + spur[0], root_edges + spur[1])
+            key = tuple(path[1])
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (len(path[1]), next(counter), path))
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates)[2])
+    return found
+
+
+def path_subgraph(index: CSRIndex, paths: Sequence[Path]) -> Dict[str, Any]:
+    """Sous-graphe {'nodes', 'edges'} couvert par les chemins et, pour chacun, ses nœuds (ids) et ses
+    arêtes (index dans le sous-graphe)."""
+    node_order: Dict[int, None] = {}
+    edge_pos: Dict[int, int] = {}
+    described = []
+    for nodes, edges in paths:
+        for i in nodes:
+            node_order.setdefault(i, None)
+        for e in edges:
+            edge_pos.setdefault(e, len(edge_pos))
+        described.append({
+            'length': len(edges),
+            'nodes': [index.nodes[i]['id'] for i in nodes],
+            'edges': [edge_pos[e] for e in edges],
+        })
+    return {
+        'paths': described,
+        'graph': {
+            'nodes': [index.nodes[i] for i in node_order],
+            'edges': [index.edges[e] for e in edge_pos],
+        },
+    }
@@ -0,0 +1,91 @@
+"""
+Registre des graphes normalisés servis récemment, adressables par leur empreinte de contenu.
+
+Les endpoints qui travaillent sur « le graphe déjà affiché » (drill-down d'un résumé, ...)
+reçoivent un `graph_id` au lieu de renvoyer le graphe : le registre le retrouve en mémoire.
+Chaque entrée garde aussi les structures dérivées du graphe (résumés, index), calculées à
+la demande et libérées avec lui. Éviction LRU au-delà de `max_entries` graphes.
+Utilisable depuis le threadpool (les calculs lourds y sont déportés) : accès sous verrou.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from graph_normalizer import graph_fingerprint
+
+
+class GraphRegistry:
+    """graph_id (empreinte) → graphe normalisé + valeurs dérivées, LRU borné."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        # graph_id -> {'graph': graphe, 'derived': {clé: valeur}}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # id(graphe) -> graph_id : évite de recalculer l'empreinte d'un graphe déjà enregistré
+        # (le registre garde une référence au graphe, donc son id() reste unique tant qu'il y est)
+        self._by_object: Dict[int, str] = {}
+        self.registered = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def register(self, graph: Dict[str, Any], graph_id: Optional[str] = None) -> str:
+        """Enregistre un graphe (s'il ne l'est pas déjà) et retourne son graph_id.
+        `graph_id`, s'il est connu (empreinte déjà calculée pour ce graphe), évite de la recalculer."""
+        with self._lock:
+            known = self._by_object.get(id(graph))
+            if known is not None and known in self._entries:
+                self._entries.move_to_end(known)
+                return known
+        if graph_id is None:
+            graph_id = graph_fingerprint(graph)
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is None:
+                self._entries[graph_id] = {'graph': graph, 'derived': {}}
+                self._by_object[id(graph)] = graph_id
+                self.registered += 1
+                while len(self._entries) > self.max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._by_object.pop(id(evicted['graph']), None)
+                    self.evictions += 1
+            self._entries.move_to_end(graph_id)
+        return graph_id
+
+    def get(self, graph_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(graph_id)
+            return entry['graph']
+
+    def derived(self, graph_id: str, key: Hashable, build: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Valeur dérivée du graphe `graph_id`, construite au premier appel par `build(graphe)`.
+        Lève KeyError si le graphe n'est pas (ou plus) dans le registre.
+
+        `build` s'exécute hors verrou : deux appels simultanés peuvent construire la même valeur,
+        la première insérée est gardée par les deux."""
+        with self._lock:
+            entry = self._entries[graph_id]
+            self._entries.move_to_end(graph_id)
+            derived = entry['derived']
+            if key in derived:
+                return derived[key]
+        value = build(entry['graph'])
+        with self._lock:
+            return derived.setdefault(key, value)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._by_object.clear()
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "registered": self.registered,
+            "evictions": self.evictions,
+        }
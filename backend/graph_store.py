@@ -0,0 +1,281 @@
+"""
+Graphe fusionné de toutes les réponses reçues (analyses upstream, use cases).
+
+Les réponses se recouvrent largement (mêmes Subnets, Policies, Devices, avec les mêmes element
+ids Neo4j) : au lieu de N copies, chaque nœud est gardé une seule fois, par id, et chaque
+relation une seule fois, par id (par (origine, type, destination) si elle n'en a pas). La
+version la plus récente d'un élément remplace la précédente.
+
+Pour limiter la mémoire, les ensembles de labels et les noms de propriétés sont internés
+(partagés entre tous les éléments) et les sources qui référencent un élément sont un masque de
+bits sur la table des sources (`analysis:<question>`, `use_case:<id>`, ...). Au-delà de
+`max_sources` sources, la moins récemment reçue est libérée : son bit est retiré de tous les
+éléments et ceux qu'elle était seule à référencer sont supprimés.
+Un graphe identique (même empreinte, voir graph_fingerprint) au dernier reçu de la même source
+n'est pas refusionné : une réponse servie depuis un cache ne coûte rien au store.
+Utilisable depuis le threadpool (la fusion y est faite) : accès sous verrou.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+MAX_SOURCES = 256
+
+
+class _Node:
+    __slots__ = ('labels', 'properties', 'refs')
+
+    def __init__(self, labels: Tuple[str, ...], properties: Dict[str, Any], refs: int):
+        self.labels = labels
+        self.properties = properties
+        self.refs = refs
+
+
+class _Edge:
+    __slots__ = ('id', 'source', 'target', 'type', 'properties', 'refs')
+
+    def __init__(self, id: Optional[str], source: str, target: str, type: str, properties: Dict[str, Any], refs: int):
+        self.id = id
+        self.source = source
+        self.target = target
+        self.type = type
+        self.properties = properties
+        self.refs = refs
+
+
+def edge_key(edge: Dict[str, Any]) -> Hashable:
+    """Identité d'une relation dans le store : son id, sinon (origine, type, destination)."""
+    eid = edge.get('id')
+    return eid if eid is not None else (edge['from'], edge['label'], edge['to'])
+
+
+class GraphStore:
+    """Nœuds et relations fusionnés par identité, avec la liste des sources qui les ont référencés."""
+
+    def __init__(self, max_sources: int = MAX_SOURCES):
+        self.max_sources = max_sources
+        self._nodes: Dict[str, _Node] = {}
+        self._edges: Dict[Hashable, _Edge] = {}
+        # id de nœud -> clés des relations qui le touchent (dict ordonné utilisé comme ensemble)
+        self._incident: Dict[str, Dict[Hashable, None]] = {}
+        self._label_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._keys: Dict[str, str] = {}
+        # source -> numéro de bit, de la moins à la plus récemment reçue ; numéros libérés réutilisés
+        self._source_ids: "OrderedDict[str, int]" = OrderedDict()
+        self._free_ids: List[int] = []
+        # source -> empreinte du dernier graphe fusionné
+        self._merged: Dict[str, str] = {}
+        self.skipped_graphs = 0
+        self.released_sources = 0
+        self.received_nodes = 0
+        self.received_edges = 0
+        self.updated_nodes = 0
+        self.updated_edges = 0
+        # incrémentée à chaque changement des nœuds (index dérivés à reconstruire)
+        self.version = 0
+        self._lock = threading.RLock()
+
+    def _source_bit(self, source: str) -> int:
+        sid = self._source_ids.get(source)
+        if sid is None:
+            if len(self._source_ids) >= self.max_sources:
+                self._release(next(iter(self._source_ids)))
+            sid = self._free_ids.pop() if self._free_ids else len(self._source_ids)
+            self._source_ids[source] = sid
+        self._source_ids.move_to_end(source)
+        return 1 << sid
+
+    def _release(self, source: str) -> None:
+        """Oublie une source : son bit est retiré, les éléments qui n'ont plus de source sont supprimés."""
+        sid = self._source_ids.pop(source)
+        self._merged.pop(source, None)
+        mask = ~(1 << sid)
+        for node_id in [node_id for node_id, node in self._nodes.items() if node.refs & ~mask]:
+            node = self._nodes[node_id]
+            node.refs &= mask
+            if not node.refs:
+                del self._nodes[node_id]
+        for key in [key for key, edge in self._edges.items() if edge.refs & ~mask]:
+            edge = self._edges[key]
+            edge.refs &= mask
+            if not edge.refs:
+                self._unlink(key, edge)
+                del self._edges[key]
+        self._free_ids.append(sid)
+        self.released_sources += 1
+        self.version += 1
+
+    def _link(self, key: Hashable, edge: _Edge) -> None:
+        self._incident.setdefault(edge.source, {})[key] = None
+        self._incident.setdefault(edge.target, {})[key] = None
+
+    def _unlink(self, key: Hashable, edge: _Edge) -> None:
+        for node_id in (edge.source, edge.target):
+            keys = self._incident.get(node_id)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._incident[node_id]
+
+    def _labels(self, labels: Iterable[str]) -> Tuple[str, ...]:
+        key = tuple(labels)
+        return self._label_sets.setdefault(key, tuple(sys.intern(label) for label in key))
+
+    def _properties(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        keys = self._keys
+        return {keys.setdefault(k, sys.intern(k)) if type(k) is str else k: v for k, v in properties.items()}
+
+    def add_graph(self, graph: Dict[str, Any], source: str, fingerprint: Optional[str] = None) -> Dict[str, int]:
+        """Fusionne un graphe normalisé référencé par `source`. Retourne les compteurs d'éléments nouveaux.
+        Avec `fingerprint` (graph_id), un graphe identique au dernier fusionné pour cette source est ignoré."""
+        nodes = graph.get('nodes') or []
+        edges = graph.get('edges') or []
+        new_nodes = new_edges = 0
+        with self._lock:
+            if fingerprint is not None and self._merged.get(source) == fingerprint:
+                self._source_ids.move_to_end(source)
+                self.skipped_graphs += 1
+                return {'nodes': len(nodes), 'edges': len(edges), 'new_nodes': 0, 'new_edges': 0, 'skipped': True}
+            updated_before = self.updated_nodes + self.updated_edges
+            bit = self._source_bit(source)
+            for node in nodes:
+                current = self._nodes.get(node['id'])
+                if current is None:
+                    self._nodes[node['id']] = _Node(self._labels(node['labels']), self._properties(node['properties']), bit)
+                    new_nodes += 1
+                    continue
+                current.refs |= bit
+                if current.properties != node['properties'] or list(current.labels) != node['labels']:
+                    current.labels = self._labels(node['labels'])
+                    current.properties = self._properties(node['properties'])
+                    self.updated_nodes += 1
+            for edge in edges:
+                key = edge_key(edge)
+                current = self._edges.get(key)
+                if current is None:
+                    current = self._edges[key] = _Edge(edge.get('id'), edge['from'], edge['to'], sys.intern(edge['label']),
+                                                       self._properties(edge['properties']), bit)
+                    self._link(key, current)
+                    new_edges += 1
+                    continue
+                current.refs |= bit
+                if (current.properties != edge['properties'] or current.type != edge['label']
+                        or current.source != edge['from'] or current.target != edge['to']):
+                    if current.source != edge['from'] or current.target != edge['to']:
+                        self._unlink(key, current)
+                        current.source, current.target = edge['from'], edge['to']
+                        self._link(key, current)
+                    current.type = sys.intern(edge['label'])
+                    current.properties = self._properties(edge['properties'])
+                    self.updated_edges += 1
+            self.received_nodes += len(nodes)
+            self.received_edges += len(edges)
+            if new_nodes or new_edges or self.updated_nodes + self.updated_edges != updated_before:
+                self.version += 1
+            if fingerprint is not None:
+                self._merged[source] = fingerprint
+        return {'nodes': len(nodes), 'edges': len(edges), 'new_nodes': new_nodes, 'new_edges': new_edges}
+
+    def _source_list(self, refs: int) -> List[str]:
+        return [name for name, sid in self._source_ids.items() if refs >> sid & 1]
+
+    def _node_dict(self, node_id: str, node: _Node, with_sources: bool = False) -> Dict[str, Any]:
+        labels = list(node.labels)
+        out = {
+            'id': node_id,
+            'label': ', '.join(labels) if labels else (node.properties.get('name') or node_id),
+            'labels': labels,
+            'properties': node.properties,
+        }
+        if with_sources:
+            out['sources'] = self._source_list(node.refs)
+        return out
+
+    def node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Nœud fusionné, ses sources et ses relations ; None s'il n'a jamais été reçu."""
+        with self._lock:
+            node = self._nodes.get(node_id)
+            if node is None:
+                return None
+            out = self._node_dict(node_id, node, with_sources=True)
+            out['edges'] = [self._edge_dict(self._edges[key]) for key in self._incident.get(node_id, ())]
+            return out
+
+    def _edge_dict(self, edge: _Edge) -> Dict[str, Any]:
+        out = {'from': edge.source, 'to': edge.target, 'label': edge.type, 'properties': edge.properties}
+        if edge.id is not None:
+            out['id'] = edge.id
+        return out
+
+    def nodes(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """(version, nœuds normalisés) du store, lus ensemble sous le verrou."""
+        with self._lock:
+            return self.version, [self._node_dict(node_id, node) for node_id, node in self._nodes.items()]
+
+    def _matching_nodes(self, bit: Optional[int], label: Optional[str]) -> Iterator[Tuple[str, _Node]]:
+        for node_id, node in self._nodes.items():
+            if (bit is None or node.refs & bit) and (label is None or label in node.labels):
+                yield node_id, node
+
+    def graph(self, source: Optional[str] = None, label: Optional[str] = None, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Graphe normalisé du store, restreint aux éléments d'une source et/ou aux nœuds d'un label
+        (avec les relations entre ces nœuds). None si la source est inconnue."""
+        with self._lock:
+            bit = None
+            if source is not None:
+                if source not in self._source_ids:
+                    return None
+                bit = 1 << self._source_ids[source]
+            nodes = []
+            for node_id, node in self._matching_nodes(bit, label):
+                if limit is not None and len(nodes) >= limit:
+                    break
+                nodes.append(self._node_dict(node_id, node))
+            ids = {n['id'] for n in nodes}
+            edges = [self._edge_dict(e) for e in self._edges.values()
+                     if (bit is None or e.refs & bit) and e.source in ids and e.target in ids]
+            return {'nodes': nodes, 'edges': edges}
+
+    def sources(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            counts: Dict[int, List[int]] = {sid: [0, 0] for sid in self._source_ids.values()}
+            for kind, elements in ((0, self._nodes.values()), (1, self._edges.values())):
+                for element in elements:
+                    refs, sid = element.refs, 0
+                    while refs:
+                        if refs & 1:
+                            counts[sid][kind] += 1
+                        refs >>= 1
+                        sid += 1
+            return [{'source': name, 'nodes': counts[sid][0], 'edges': counts[sid][1]} for name, sid in self._source_ids.items()]
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._nodes)
+            for table in (self._nodes, self._edges, self._incident, self._label_sets, self._keys, self._source_ids, self._merged):
+                table.clear()
+            self._free_ids.clear()
+            self.received_nodes = self.received_edges = self.updated_nodes = self.updated_edges = 0
+            self.version += 1
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            received = self.received_nodes + self.received_edges
+            stored = len(self._nodes) + len(self._edges)
+            return {
+                'nodes': len(self._nodes),
+                'edges': len(self._edges),
+                'sources': len(self._source_ids),
+                'max_sources': self.max_sources,
+                'released_sources': self.released_sources,
+                'label_sets': len(self._label_sets),
+                'property_keys': len(self._keys),
+                'received_nodes': self.received_nodes,
+                'received_edges': self.received_edges,
+                'updated_nodes': self.updated_nodes,
+                'updated_edges': self.updated_edges,
+                'skipped_graphs': self.skipped_graphs,
+                'dedup_ratio': round(received / stored, 2) if stored else None,
+            }
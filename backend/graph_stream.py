@@ -0,0 +1,155 @@
+"""
+Parsing incrémental des réponses upstream volumineuses.
+
+Au lieu de charger tout le corps JSON (`resp.json()`) puis d'en construire une copie
+normalisée, le corps est lu par morceaux et les éléments des tableaux `nodes` et
+`relationships` sont normalisés un par un, dès qu'ils sont complets. Le reste du
+document (analyse, métadonnées) est reconstruit normalement ; les tableaux de graphe
+bruts y restent vides.
+
+Les fichiers (ingestion dans graph_db) sont lus de la même façon, chaque élément normalisé
+étant passé à un callback au lieu d'être gardé.
+
+Nécessite le paquet optionnel `ijson` (>= 3.1 pour l'API asynchrone).
+"""
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from graph_normalizer import GRAPH_LOCATIONS
+
+try:
+    import ijson
+except Exception:
+    ijson = None
+
+
+class _AsyncByteReader:
+    """Adapte un itérateur asynchrone de bytes à l'interface `await read(n)` attendue par ijson."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b""
+        self._eof = False
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class _ItemCollector:
+    """Reconstruit un élément de tableau à partir des événements ijson puis le passe au normaliseur.
+    Les éléments normalisés sont gardés dans `items`, ou passés à `sink` (et non gardés)."""
+
+    def __init__(self, normalize: Callable[[Any, int], Optional[Dict[str, Any]]],
+                 sink: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.normalize = normalize
+        self.sink = sink
+        self.items: List[Dict[str, Any]] = []
+        self.count = 0
+        self._builder = None
+        self._depth = 0
+
+    def feed(self, event: str, value: Any) -> None:
+        if self._builder is None:
+            self._builder = ijson.ObjectBuilder()
+        self._builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            self._depth += 1
+        elif event in ("end_map", "end_array"):
+            self._depth -= 1
+        if self._depth == 0:
+            item = self.normalize(self._builder.value, self.count)
+            if item is not None:
+                self.count += 1
+                if self.sink is None:
+                    self.items.append(item)
+                else:
+                    self.sink(item)
+            self._builder = None
+
+
+class _DocumentParser:
+    """Aiguille les événements ijson : éléments des tableaux de graphe vers leur collecteur, le reste
+    vers la reconstruction du document."""
+
+    def __init__(self, normalize_node: Callable[[Any, int], Optional[Dict[str, Any]]],
+                 normalize_relationship: Callable[[Any, int], Optional[Dict[str, Any]]],
+                 on_node: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 on_edge: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.collectors: Dict[str, _ItemCollector] = {}
+        self.graphs: Dict[str, Tuple[_ItemCollector, _ItemCollector]] = {}
+        for path, nodes_key, edges_key in GRAPH_LOCATIONS:
+            location = '.'.join(path)
+            nodes = self.collectors['.'.join(path + (nodes_key,)) + ".item"] = _ItemCollector(
+                normalize_node, _bind(on_node, location))
+            edges = self.collectors['.'.join(path + (edges_key,)) + ".item"] = _ItemCollector(
+                normalize_relationship, _bind(on_edge, location))
+            self.graphs[location] = (nodes, edges)
+        self.root = ijson.ObjectBuilder()
+
+    def event(self, prefix: str, event: str, value: Any) -> None:
+        collector = self.collectors.get(prefix)
+        if collector is None and prefix:
+            # événements imbriqués d'un élément (ex: data.nodes.item.properties)
+            for item_prefix, candidate in self.collectors.items():
+                if prefix.startswith(item_prefix + "."):
+                    collector = candidate
+                    break
+        if collector is not None:
+            collector.feed(event, value)
+        else:
+            self.root.event(event, value)
+
+    def result(self) -> Tuple[Any, Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]]:
+        graphs = {location: (nodes.items, edges.items) for location, (nodes, edges) in self.graphs.items()}
+        return getattr(self.root, "value", None), graphs
+
+
+def _bind(callback: Optional[Callable[[str, Dict[str, Any]], None]], location: str) -> Optional[Callable[[Dict[str, Any]], None]]:
+    return None if callback is None else (lambda item: callback(location, item))
+
+
+async def parse_graph_document(
+    chunks: AsyncIterator[bytes],
+    normalize_node: Callable[[Any, int], Optional[Dict[str, Any]]],
+    normalize_relationship: Callable[[Any, int], Optional[Dict[str, Any]]],
+    buf_size: int = 64 * 1024,
+) -> Tuple[Any, Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]]:
+    """Parse un document JSON en flux.
+
+    Retourne `(document, graphs)` où `document` est la réponse sans le contenu des tableaux
+    de graphe (les tableaux eux-mêmes restent, vides) et `graphs` associe chaque emplacement
+    de graph_normalizer.GRAPH_LOCATIONS ('', 'analysis.data', ...) au couple (nodes, edges) normalisés.
+    """
+    if ijson is None:
+        raise RuntimeError("ijson requis pour le parsing incrémental mais n'est pas installé")
+    parser = _DocumentParser(normalize_node, normalize_relationship)
+    async for prefix, event, value in ijson.parse_async(_AsyncByteReader(chunks), buf_size=buf_size, use_float=True):
+        parser.event(prefix, event, value)
+    return parser.result()
+
+
+def parse_graph_file(
+    fp: BinaryIO,
+    normalize_node: Callable[[Any, int], Optional[Dict[str, Any]]],
+    normalize_relationship: Callable[[Any, int], Optional[Dict[str, Any]]],
+    on_node: Callable[[str, Dict[str, Any]], None],
+    on_edge: Callable[[str, Dict[str, Any]], None],
+    buf_size: int = 64 * 1024,
+) -> Any:
+    """Variante synchrone pour un fichier : chaque élément normalisé est passé à `on_node(emplacement,
+    nœud)` / `on_edge(emplacement, arête)` au lieu d'être gardé, la mémoire ne dépend donc pas de la
+    taille du graphe. Retourne le document sans le contenu des tableaux de graphe."""
+    if ijson is None:
+        raise RuntimeError("ijson requis pour le parsing incrémental mais n'est pas installé")
+    parser = _DocumentParser(normalize_node, normalize_relationship, on_node, on_edge)
+    for prefix, event, value in ijson.parse(fp, buf_size=buf_size, use_float=True):
+        parser.event(prefix, event, value)
+    return parser.result()[0]
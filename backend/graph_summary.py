@@ -0,0 +1,191 @@
+"""
+Résumé (niveau de détail) d'un graphe normalisé : regroupement de nœuds en super-nœuds.
+
+Modes de regroupement :
+  - label  : un super-nœud par combinaison de labels (Device, Subnet, Policy, ...) ;
+  - subnet : chaque Subnet absorbe ses membres (`(membre)-[:BELONGS_TO]->(subnet)` ou
+             `(subnet)-[:HAS_DEVICE]->(membre)`), les autres nœuds restent tels quels ;
+  - policy : les Policy sont regroupées par ensemble de cibles (`HAS_TARGET`).
+
+Un groupe d'un seul nœud n'est pas résumé. Les arêtes entre groupes sont agrégées par
+(origine, destination, type) avec un compteur `properties.count` ; les arêtes internes à un
+groupe sont comptées dans `properties.internal_edges` du super-nœud. Le résultat est un graphe
+au format normalisé habituel : il passe par to_columnar, graph_layout, etc. sans adaptation.
+
+`expand` renvoie le contenu d'un super-nœud (drill-down) : ses membres, les arêtes internes et
+les arêtes vers le reste du graphe, avec le représentant de chaque extrémité dans le résumé.
+"""
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+SUMMARY_MODES = ("label", "subnet", "policy")
+
+SUBNET_LABEL = "Subnet"
+POLICY_LABEL = "Policy"
+# type de relation -> True si l'origine est le membre, False si c'est le subnet
+SUBNET_MEMBERSHIP = {"BELONGS_TO": True, "HAS_DEVICE": False}
+POLICY_TARGET = "HAS_TARGET"
+
+
+def _label_keys(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], index: Dict[str, int]) -> List[Optional[Hashable]]:
+    return [tuple(n['labels']) for n in nodes]
+
+
+def _subnet_keys(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], index: Dict[str, int]) -> List[Optional[Hashable]]:
+    is_subnet = [SUBNET_LABEL in n['labels'] for n in nodes]
+    keys: List[Optional[Hashable]] = [n['id'] if flag else None for n, flag in zip(nodes, is_subnet)]
+    for edge in edges:
+        member_first = SUBNET_MEMBERSHIP.get(edge['label'])
+        if member_first is None:
+            continue
+        member, subnet = (edge['from'], edge['to']) if member_first else (edge['to'], edge['from'])
+        mi, si = index.get(member), index.get(subnet)
+        if mi is None or si is None or not is_subnet[si] or is_subnet[mi]:
+            continue
+        if keys[mi] is None:
+            # un membre de plusieurs subnets reste dans le premier rencontré
+            keys[mi] = nodes[si]['id']
+    return keys
+
+
+def _policy_keys(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], index: Dict[str, int]) -> List[Optional[Hashable]]:
+    targets: Dict[int, set] = {}
+    for i, node in enumerate(nodes):
+        if POLICY_LABEL in node['labels']:
+            targets[i] = set()
+    for edge in edges:
+        if edge['label'] == POLICY_TARGET:
+            pi = index.get(edge['from'])
+            if pi in targets:
+                targets[pi].add(edge['to'])
+    return [tuple(sorted(targets[i])) if i in targets else None for i in range(len(nodes))]
+
+
+_KEY_FUNCTIONS = {"label": _label_keys, "subnet": _subnet_keys, "policy": _policy_keys}
+
+
+def _node_name(node: Dict[str, Any]) -> str:
+    props = node['properties']
+    if props.get('name'):
+        return str(props['name'])
+    if props.get('ip') and props.get('mask'):
+        return f"{props['ip']}/{props['mask']}"
+    return str(props.get('label') or node['label'])
+
+
+def _describe(by: str, key: Hashable, nodes: List[Dict[str, Any]], index: Dict[str, int]) -> Tuple[str, List[str]]:
+    """(nom, labels) d'un super-nœud."""
+    if by == "label":
+        labels = list(key)
+        return (', '.join(labels) or '(sans label)'), labels
+    if by == "subnet":
+        subnet = nodes[index[key]]
+        return _node_name(subnet), subnet['labels']
+    names = [_node_name(nodes[index[t]]) if t in index else str(t) for t in key[:3]]
+    if len(key) > 3:
+        names.append('...')
+    return f"Policies → {', '.join(names) or '(sans cible)'}", [POLICY_LABEL]
+
+
+def summarize(graph: Dict[str, Any], by: str) -> Dict[str, Any]:
+    """Résume un graphe normalisé. Retourne {'by', 'graph', 'groups', 'super_nodes', 'representative'} :
+    `groups` associe chaque id de super-nœud ('<mode>:<n>') aux index de ses membres dans graph['nodes'],
+    `representative` associe chaque id de nœud à son id dans le résumé."""
+    if by not in _KEY_FUNCTIONS:
+        raise ValueError(f"mode de résumé inconnu: {by}")
+    nodes = graph.get('nodes') or []
+    edges = graph.get('edges') or []
+    index: Dict[str, int] = {}
+    for i, node in enumerate(nodes):
+        index.setdefault(node['id'], i)
+
+    members: Dict[Hashable, List[int]] = {}
+    for i, key in enumerate(_KEY_FUNCTIONS[by](nodes, edges, index)):
+        if key is not None:
+            members.setdefault(key, []).append(i)
+
+    group_of: List[Optional[str]] = [None] * len(nodes)
+    groups: Dict[str, List[int]] = {}
+    super_nodes: Dict[str, Dict[str, Any]] = {}
+    for key, indexes in members.items():
+        if len(indexes) < 2:
+            continue
+        group_id = f"{by}:{len(groups)}"
+        name, labels = _describe(by, key, nodes, index)
+        groups[group_id] = indexes
+        super_nodes[group_id] = {
+            'id': group_id,
+            'label': f"{name} ({len(indexes)})",
+            'labels': labels,
+            'properties': {
+                'summary': True,
+                'group_by': by,
+                'name': name,
+                'count': len(indexes),
+                'member_labels': dict(Counter(', '.join(nodes[i]['labels']) for i in indexes)),
+                'internal_edges': 0,
+            },
+        }
+        for i in indexes:
+            group_of[i] = group_id
+
+    representative: Dict[str, str] = {}
+    out_nodes: List[Dict[str, Any]] = []
+    for node, group_id in zip(nodes, group_of):
+        if group_id is None:
+            representative.setdefault(node['id'], node['id'])
+            out_nodes.append(node)
+        elif node['id'] not in representative:
+            representative[node['id']] = group_id
+            if groups[group_id][0] == index[node['id']]:
+                # le super-nœud prend la place de son premier membre
+                out_nodes.append(super_nodes[group_id])
+
+    out_edges: List[Dict[str, Any]] = []
+    aggregated: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    for edge in edges:
+        source = representative.get(edge['from'], edge['from'])
+        target = representative.get(edge['to'], edge['to'])
+        if source == edge['from'] and target == edge['to']:
+            out_edges.append(edge)
+            continue
+        if source == target:
+            super_nodes[source]['properties']['internal_edges'] += 1
+            continue
+        key = (source, target, edge['label'])
+        summary_edge = aggregated.get(key)
+        if summary_edge is None:
+            summary_edge = aggregated[key] = {'from': source, 'to': target, 'label': edge['label'], 'properties': {'count': 0}}
+            out_edges.append(summary_edge)
+        summary_edge['properties']['count'] += 1
+
+    return {
+        'by': by,
+        'graph': {'nodes': out_nodes, 'edges': out_edges},
+        'groups': groups,
+        'super_nodes': super_nodes,
+        'representative': representative,
+    }
+
+
+def expand(graph: Dict[str, Any], summary: Dict[str, Any], group_id: str) -> Optional[Dict[str, Any]]:
+    """Contenu d'un super-nœud : {'group', 'nodes', 'edges'} ; None si le groupe n'existe pas.
+
+    Chaque arête touche au moins un membre et porte `from_group` / `to_group`, l'id de ses
+    extrémités dans le résumé (le super-nœud lui-même pour un membre).
+    """
+    indexes = summary['groups'].get(group_id)
+    if indexes is None:
+        return None
+    nodes = graph.get('nodes') or []
+    member_nodes = [nodes[i] for i in indexes]
+    member_ids = {n['id'] for n in member_nodes}
+    representative = summary['representative']
+    edges = []
+    for edge in graph.get('edges') or []:
+        if edge['from'] in member_ids or edge['to'] in member_ids:
+            expanded = dict(edge)
+            expanded['from_group'] = representative.get(edge['from'], edge['from'])
+            expanded['to_group'] = representative.get(edge['to'], edge['to'])
+            edges.append(expanded)
+    return {'group': summary['super_nodes'][group_id], 'nodes': member_nodes, 'edges': edges}
@@ -0,0 +1,222 @@
+"""
+Index radix (plus long préfixe commun) des réseaux portés par les nœuds : quels Subnets,
+IPRanges ou SSLranges contiennent une adresse donnée.
+
+  - Subnet : propriétés `ip` + `mask` (masque pointé ou longueur), sinon un CIDR dans l'id ou
+    le label (`MTL_LAN_172.18.93.0/24`) ;
+  - IPRange / SSLrange : bornes `start_ip` / `end_ip` (ou start / end, first_ip / last_ip),
+    ou une plage `a.b.c.d-e.f.g.h` dans une propriété ; une plage est découpée en blocs CIDR ;
+  - autres nœuds (Device, Interface...) : ce ne sont pas des réseaux (leur `mask` est celui de
+    leur interface) ; leur adresse (`ip`, `device_ip_address`) est indexée à part, dans une table
+    d'adresses exactes, et renvoyée dans `hosts`, jamais dans `match` / `matches`.
+
+Un trie par version d'IP, indexé octet par octet (voir RadixTree) : une recherche descend au
+plus 4 niveaux en IPv4 (16 en IPv6) et collecte au passage tous les réseaux qui contiennent
+l'adresse, du moins au plus spécifique ; le premier de la liste inversée est le plus long préfixe.
+"""
+import ipaddress
+import re
+import socket
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+NETWORK_LABELS = ("Subnet", "IPRange", "SSLrange")
+RANGE_BOUNDS = (("start_ip", "end_ip"), ("start", "end"), ("first_ip", "last_ip"), ("ip_start", "ip_end"))
+RANGE_PROPERTIES = ("range", "ip_range", "ip", "label", "name", "id")
+HOST_PROPERTIES = ("ip", "device_ip_address")
+
+_CIDR = re.compile(r"(\d{1,3}(?:\.\d{1,3}){3}/\d{1,2}|[0-9a-fA-F:]*:[0-9a-fA-F:]+/\d{1,3})")
+_RANGE = re.compile(r"(\d{1,3}(?:\.\d{1,3}){3})\s*-\s*(\d{1,3}(?:\.\d{1,3}){3})")
+
+
+def _network(ip: Any, mask: Any) -> Optional[Network]:
+    try:
+        return ipaddress.ip_network(f"{str(ip).strip()}/{str(mask).strip()}", strict=False)
+    except ValueError:
+        return None
+
+
+def _range(start: Any, end: Any) -> List[Network]:
+    try:
+        first, last = ipaddress.ip_address(str(start).strip()), ipaddress.ip_address(str(end).strip())
+        return list(ipaddress.summarize_address_range(first, last))
+    except (ValueError, TypeError):
+        return []
+
+
+def node_hosts(node: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Adresses (version, entier) portées par un nœud qui n'est pas un réseau."""
+    if any(label in NETWORK_LABELS for label in node['labels']):
+        return []
+    props = node['properties']
+    hosts = []
+    for key in HOST_PROPERTIES:
+        if isinstance(props.get(key), str):
+            try:
+                hosts.append(_address_key(props[key].strip()))
+            except ValueError:
+                continue
+    return list(dict.fromkeys(hosts))
+
+
+def node_networks(node: Dict[str, Any]) -> List[Network]:
+    """Réseaux (blocs CIDR) décrits par un nœud, vide s'il n'en décrit pas."""
+    props = node['properties']
+    is_network = any(label in NETWORK_LABELS for label in node['labels'])
+    if is_network and props.get('ip') is not None and props.get('mask') is not None:
+        network = _network(props['ip'], props['mask'])
+        if network is not None:
+            return [network]
+    for start, end in RANGE_BOUNDS:
+        if props.get(start) is not None and props.get(end) is not None:
+            blocks = _range(props[start], props[end])
+            if blocks:
+                return blocks
+    if not is_network:
+        return []
+    for key in RANGE_PROPERTIES:
+        value = node['id'] if key == 'id' else props.get(key)
+        if not isinstance(value, str):
+            continue
+        match = _RANGE.search(value)
+        if match:
+            blocks = _range(*match.groups())
+            if blocks:
+                return blocks
+        match = _CIDR.search(value)
+        if match:
+            try:
+                return [ipaddress.ip_network(match.group(1), strict=False)]
+            except ValueError:
+                continue
+    return []
+
+
+class RadixTree:
+    """Trie multibit (pas de 8 bits) des préfixes d'une version d'IP.
+
+    Chaque nœud est un couple (fils par octet, réseaux par octet). Un préfixe dont la longueur
+    n'est pas un multiple de 8 est recopié dans toutes les cases d'octet qu'il couvre : une
+    recherche lit une case par octet de l'adresse (4 en IPv4) au lieu d'un niveau par bit."""
+
+    STRIDE = 8
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.root: Tuple[Dict[int, Any], Dict[int, List[Tuple[Network, Any]]]] = ({}, {})
+        self.default: List[Tuple[Network, Any]] = []
+        self.size = 0
+
+    def insert(self, network: Network, value: Any) -> None:
+        """Ajoute un réseau ; les réseaux sont à insérer par longueur de préfixe croissante
+        (chaque case garde ainsi ses réseaux du moins au plus spécifique)."""
+        key, length = int(network.network_address), network.prefixlen
+        self.size += 1
+        if length == 0:
+            self.default.append((network, value))
+            return
+        node, shift = self.root, self.bits - self.STRIDE
+        while length > self.STRIDE:
+            slot = key >> shift & 0xFF
+            child = node[0].get(slot)
+            if child is None:
+                child = node[0][slot] = ({}, {})
+            node, shift, length = child, shift - self.STRIDE, length - self.STRIDE
+        first = key >> shift & 0xFF
+        entries = node[1]
+        for slot in range(first, first + (1 << (self.STRIDE - length))):
+            if slot in entries:
+                entries[slot].append((network, value))
+            else:
+                entries[slot] = [(network, value)]
+
+    def lookup(self, key: int) -> List[Tuple[Network, Any]]:
+        """Réseaux contenant l'adresse `key`, du moins spécifique au plus spécifique."""
+        found = list(self.default)
+        node, shift = self.root, self.bits - self.STRIDE
+        while node is not None:
+            slot = key >> shift & 0xFF
+            entries = node[1].get(slot)
+            if entries:
+                found.extend(entries)
+            node, shift = node[0].get(slot), shift - self.STRIDE
+        return found
+
+
+def _address_key(address: str) -> Tuple[int, int]:
+    """(version, entier) d'une adresse IP ; ValueError si ce n'en est pas une."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big')
+    except OSError:
+        ip = ipaddress.ip_address(address)
+        return ip.version, int(ip)
+
+
+class IPIndex:
+    """Réseaux des nœuds d'un graphe normalisé, par version d'IP."""
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes = nodes
+        self.trees = {4: RadixTree(32), 6: RadixTree(128)}
+        # (version, adresse) -> nœuds non réseau qui portent exactement cette adresse
+        self.hosts: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        self.indexed_nodes = 0
+        found = []
+        for node in nodes:
+            networks = node_networks(node)
+            # description construite une fois, partagée par tous les résultats
+            found.extend((network, self._describe(network, node)) for network in networks)
+            if networks:
+                self.indexed_nodes += 1
+            for key in node_hosts(node):
+                self.hosts.setdefault(key, []).append(self._describe_host(node))
+        found.sort(key=lambda item: item[0].prefixlen)
+        for network, described in found:
+            self.trees[network.version].insert(network, described)
+
+    @staticmethod
+    def _describe(network: Network, node: Dict[str, Any]) -> Dict[str, Any]:
+        props = node['properties']
+        return {
+            'id': node['id'],
+            'name': props.get('name') or props.get('label') or node['id'],
+            'labels': node['labels'],
+            'network': str(network),
+            'prefixlen': network.prefixlen,
+        }
+
+    @staticmethod
+    def _describe_host(node: Dict[str, Any]) -> Dict[str, Any]:
+        props = node['properties']
+        return {'id': node['id'], 'name': props.get('name') or props.get('label') or node['id'], 'labels': node['labels']}
+
+    def lookup(self, address: str) -> Dict[str, Any]:
+        """{'ip', 'match' (réseau le plus spécifique ou None), 'matches' (réseaux du plus au moins
+        spécifique), 'hosts' (nœuds non réseau qui portent cette adresse)}.
+        Lève ValueError si `address` n'est pas une adresse IP."""
+        address = address.strip()
+        version, key = _address_key(address)
+        found = self.trees[version].lookup(key)
+        matches = [described for _, described in reversed(found)]
+        return {'ip': address, 'match': matches[0] if matches else None, 'matches': matches,
+                'hosts': self.hosts.get((version, key), [])}
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, Any]:
+        """Recherche en lot : résultats dans l'ordre des adresses, adresses invalides à part."""
+        results, invalid = [], []
+        for address in addresses:
+            try:
+                results.append(self.lookup(address))
+            except ValueError:
+                invalid.append(address)
+        matched = sum(1 for r in results if r['match'] is not None)
+        return {'results': results, 'matched': matched, 'unmatched': len(results) - matched, 'invalid': invalid}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'nodes': len(self.nodes),
+            'indexed_nodes': self.indexed_nodes,
+            'hosts': len(self.hosts),
+            'networks': {f"ipv{version}": tree.size for version, tree in self.trees.items()},
+        }
@@ -0,0 +1,184 @@
+"""
+Jobs asynchrones : la requête HTTP rend la main tout de suite, le travail est fait en arrière-plan.
+
+Les jobs sont placés dans une file bornée (`max_queue`) et exécutés par un nombre fixe de
+workers asyncio (`workers`) : une rafale de requêtes attend son tour au lieu de partir d'un
+coup vers l'upstream, et une file pleine est refusée immédiatement (asyncio.QueueFull).
+Les jobs terminés restent consultables pendant `retention` secondes, dans la limite de
+`max_jobs` jobs et de `max_bytes` octets de résultats (taille estimée) : au-delà, les plus
+anciens sont oubliés.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from result_cache import estimate_size
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    def __init__(self, kind: str, runner: Callable[[], Awaitable[Any]], params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.size = 0
+        self.error: Optional[Dict[str, Any]] = None
+        self._runner = runner
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        """Durées en millisecondes : attente dans la file, exécution, total."""
+        now = time.time()
+        started = self.started_at or now
+        finished = self.finished_at or now
+        return {
+            "queued_ms": round((started - self.created_at) * 1000, 1),
+            "run_ms": round((finished - started) * 1000, 1) if self.started_at else None,
+            "total_ms": round((finished - self.created_at) * 1000, 1),
+        }
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timings": self.timings(),
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == SUCCEEDED:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """File de jobs bornée servie par un pool fixe de workers, avec rétention des résultats."""
+
+    def __init__(self, workers: int = 4, max_queue: int = 100, retention: float = 3600.0, max_jobs: int = 1000,
+                 max_bytes: Optional[int] = None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, runner: Callable[[], Awaitable[Any]], params: Optional[Dict[str, Any]] = None) -> Job:
+        """Place un job dans la file. Lève asyncio.QueueFull si elle est pleine."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue non démarrée")
+        self._purge()
+        job = Job(kind, runner, params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self._jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def recent(self) -> List[Job]:
+        self._purge()
+        return list(self._jobs.values())
+
+    def _purge(self) -> None:
+        """Oublie les jobs terminés depuis plus de `retention` s, puis les plus anciens au-delà de
+        `max_jobs` jobs ou de `max_bytes` octets de résultats."""
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished_at > self.retention]:
+            del self._jobs[job_id]
+        if len(self._jobs) > self.max_jobs:
+            for job_id in [j.id for j in self._jobs.values() if j.finished][:len(self._jobs) - self.max_jobs]:
+                del self._jobs[job_id]
+        if self.max_bytes is not None:
+            excess = self.retained_bytes() - self.max_bytes
+            for job in [j for j in self._jobs.values() if j.finished]:
+                if excess <= 0:
+                    break
+                excess -= job.size
+                del self._jobs[job.id]
+
+    def retained_bytes(self) -> int:
+        return sum(j.size for j in self._jobs.values())
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = await job._runner()
+                job.size = estimate_size(job.result)
+                job.status = SUCCEEDED
+                self.succeeded += 1
+            except asyncio.CancelledError:
+                job.status = FAILED
+                job.error = {"status": 503, "detail": "Job interrompu (arrêt du serveur)"}
+                raise
+            except Exception as e:
+                job.status = FAILED
+                job.error = {"status": getattr(e, "status_code", 500), "detail": getattr(e, "detail", None) or str(e)}
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                job._runner = None
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = self.recent()
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for j in jobs if j.status == RUNNING),
+            "retained": len(jobs),
+            "retained_bytes": self.retained_bytes(),
+            "max_jobs": self.max_jobs,
+            "max_bytes": self.max_bytes,
+            "retention": self.retention,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
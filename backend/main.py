@@ -2,13 +2,47 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import json
+import hashlib
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from datetime import datetime
 from enum import Enum
 import os
+import sys
+import time
+import asyncio
+import itertools
+import threading
 import logging
+from contextlib import asynccontextmanager
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+# Les modules voisins (upstream_client.py, ...) doivent être importables que l'app soit lancée
+# via `uvicorn backend.main:app` depuis la racine ou via `python backend/main.py`
+sys.path.insert(0, str(Path(__file__).parent))
+
+import upstream_client
+import result_cache
+import graph_stream
+import graph_normalizer
+import graph_encoding
+import catalog
+import graph_layout
+import graph_registry
+import graph_summary
+import graph_paths
+import graph_index
+import graph_diff
+import graph_store
+import graph_db
+import search_index
+import ip_index
+import risk_scoring
+import graph_ndjson
+import sse
+import jobs
 
 # optional http client for upstream API
 try:
@@ -47,6 +81,22 @@ async def startup_event():
         app.state.upstream = env_up.rstrip('/')
     else:
         app.state.upstream = "http://127.0.0.1:8000"
+    # Client HTTP partagé (pool keep-alive) pour tous les appels upstream de ce worker
+    app.state.http_client = upstream_client.build_client()
+    # Option: construire les réponses des use cases dès le démarrage plutôt qu'au premier accès
+    if os.environ.get("USE_CASE_PRELOAD", "0").strip().lower() in ("1", "true", "yes", "on"):
+        print(f"Use cases préchargés: {preload_use_cases()}")
+    await analysis_jobs.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrête les workers de jobs et ferme proprement le client HTTP partagé."""
+    await analysis_jobs.stop()
+    client = getattr(app.state, "http_client", None)
+    if client is not None:
+        await client.aclose()
+        app.state.http_client = None
 
 # Configuration CORS pour permettre les requêtes depuis le frontend
 app.add_middleware(
@@ -57,11 +107,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Déduplication des analyses identiques en vol
+analyze_flight = upstream_client.SingleFlight()
+
+# Nombre d'appels simultanés vers l'upstream borné, file d'attente bornée (voir upstream_client)
+upstream_limiter = upstream_client.ConcurrencyLimiter()
+# Échec rapide quand l'upstream est en panne, appels courts idempotents doublés quand ils traînent
+upstream_breaker = upstream_client.CircuitBreaker()
+upstream_hedger = upstream_client.Hedger()
+
+# Analyses asynchrones (POST /jobs/analyze) : file bornée, pool fixe de workers, rétention en secondes,
+# en nombre de jobs et en octets de résultats
+analysis_jobs = jobs.JobQueue(
+    workers=int(os.environ.get("JOBS_WORKERS", "4")),
+    max_queue=int(os.environ.get("JOBS_MAX_QUEUE", "100")),
+    retention=float(os.environ.get("JOBS_RETENTION", "3600")),
+    max_jobs=int(os.environ.get("JOBS_MAX_RETAINED", "1000")),
+    max_bytes=int(os.environ.get("JOBS_MAX_RESULT_BYTES", str(256 * 1024 * 1024))),
+)
+JOBS_RETRY_AFTER = int(os.environ.get("JOBS_RETRY_AFTER", "10"))
+
+# Cache des résultats normalisés de /upstream/analyze (TTL en secondes, taille en octets)
+analyze_cache = result_cache.ResultCache(
+    ttl=float(os.environ.get("ANALYZE_CACHE_TTL", "900")),
+    max_bytes=int(os.environ.get("ANALYZE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    max_entries=int(os.environ["ANALYZE_CACHE_MAX_ENTRIES"]) if os.environ.get("ANALYZE_CACHE_MAX_ENTRIES") else None,
+)
+
+# Parsing incrémental des réponses /analyze/ (activable par défaut, taille des morceaux lus en octets)
+STREAM_PARSE_DEFAULT = os.environ.get("UPSTREAM_STREAM_PARSE", "0").strip().lower() in ("1", "true", "yes", "on")
+STREAM_CHUNK_SIZE = int(os.environ.get("UPSTREAM_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
 # Chemin vers le dossier data
 DATA_DIR = Path(__file__).parent.parent / "data"
 SCHEMA_PATH = Path(__file__).parent.parent / "response_schema.json"
 USE_CASES_PATH = DATA_DIR / "use_cases.json"
 
+# Fichiers servis depuis la mémoire, rechargés automatiquement quand ils changent sur disque
+schema_file = catalog.JsonFile(SCHEMA_PATH)
+use_case_catalog = catalog.UseCaseCatalog(USE_CASES_PATH)
+
+# Réponses de use case : payload normalisé, puis octets encodés par variante (format, type, compression).
+# Invalidés quand use_cases.json ou le fichier de réponse change.
+use_case_payloads = catalog.DerivedCache(max_entries=int(os.environ.get("USE_CASE_CACHE_ENTRIES", "64")))
+use_case_responses = catalog.DerivedCache(max_entries=int(os.environ.get("USE_CASE_CACHE_ENTRIES", "64")) * 4)
+
+# Instantanés de data/ normalisés et différences entre deux instantanés, invalidés quand un fichier change
+snapshot_graphs = catalog.DerivedCache(max_entries=int(os.environ.get("SNAPSHOT_CACHE_ENTRIES", "32")))
+snapshot_diffs = catalog.DerivedCache(max_entries=int(os.environ.get("SNAPSHOT_CACHE_ENTRIES", "32")))
+
+# Graphe fusionné de toutes les réponses reçues (analyses, use cases), désactivable via GRAPH_STORE=0
+GRAPH_STORE_ENABLED = os.environ.get("GRAPH_STORE", "1").strip().lower() in ("1", "true", "yes", "on")
+store = graph_store.GraphStore(max_sources=int(os.environ.get("GRAPH_STORE_MAX_SOURCES", str(graph_store.MAX_SOURCES))))
+
+# Index dérivés du store (recherche, réseaux IP), reconstruits au premier usage qui suit un changement du store
+_store_indexes: Dict[str, Tuple[int, Any]] = {}
+_store_indexes_lock = threading.Lock()
+
+# Base SQLite des instantanés (voir graph_db) : lue quand elle existe, désactivable via GRAPH_DB=0
+GRAPH_DB_ENABLED = os.environ.get("GRAPH_DB", "1").strip().lower() in ("1", "true", "yes", "on")
+_graph_db_local = threading.local()
+
+# Graphes servis récemment, retrouvés par graph_id (drill-down des résumés, ...)
+registry = graph_registry.GraphRegistry(max_entries=int(os.environ.get("GRAPH_REGISTRY_MAX_ENTRIES", "32")))
+
 
 def require_upstream() -> str:
     """Return the configured upstream URL set via /config/upstream by the frontend.
@@ -75,6 +184,49 @@ def require_upstream() -> str:
     return upstream.rstrip('/')
 
 
+def get_http_client() -> "httpx.AsyncClient":
+    """Retourne le client HTTP partagé, créé au démarrage (ou à la demande si le startup n'a pas tourné)."""
+    if httpx is None:
+        raise HTTPException(status_code=500, detail="httpx requis pour interroger l'API upstream mais n'est pas installé")
+    client = getattr(app.state, "http_client", None)
+    if client is None or client.is_closed:
+        client = upstream_client.build_client()
+        app.state.http_client = client
+    return client
+
+
+@asynccontextmanager
+async def upstream_slot(wait: bool = True):
+    """Encadre un appel upstream : disjoncteur (voir upstream_breaker) puis place réservée (voir
+    upstream_limiter). 503 + Retry-After si le disjoncteur est ouvert ou si aucune place ne se libère
+    (file d'attente pleine ou attente trop longue ; immédiatement avec `wait=False`).
+    Le résultat de l'appel (exception levée dans le bloc ou non) alimente le disjoncteur."""
+    try:
+        upstream_breaker.before_call()
+        try:
+            await upstream_limiter.acquire(wait=wait)
+        except BaseException:
+            upstream_breaker.record_abort()
+            raise
+    except upstream_client.UpstreamBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    try:
+        yield
+    except Exception as e:
+        if upstream_client.is_upstream_failure(e):
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
+        raise
+    except BaseException:
+        upstream_breaker.record_abort()
+        raise
+    else:
+        upstream_breaker.record_success()
+    finally:
+        upstream_limiter.release()
+
+
 @app.post("/config/upstream")
 async def set_upstream(cfg: Dict[str, str]):
     """Set the upstream API base URL from the frontend. Body: { "upstream": "http://127.0.0.1:8000" }"""
@@ -84,6 +236,9 @@ async def set_upstream(cfg: Dict[str, str]):
     # basic validation
     if not (url.startswith("http://") or url.startswith("https://")):
         raise HTTPException(status_code=400, detail="L'URL doit commencer par http:// ou https://")
+    if url.rstrip('/') != getattr(app.state, "upstream", None):
+        # nouvel upstream : l'état du disjoncteur ne le concerne pas
+        upstream_breaker.reset()
     app.state.upstream = url.rstrip('/')
     return {"message": "upstream configuré", "upstream": app.state.upstream}
 
@@ -92,8 +247,8 @@ async def set_upstream(cfg: Dict[str, str]):
 async def get_upstream_config():
     upstream = getattr(app.state, "upstream", None)
     if not upstream:
-        return {"upstream": None}
-    return {"upstream": upstream}
+        return {"upstream": None, "pool": upstream_client.pool_config()}
+    return {"upstream": upstream, "pool": upstream_client.pool_config()}
 
 
 # Modèles Pydantic basés sur le schéma de réponse
@@ -193,28 +348,53 @@ async def root():
         "description": "POC client pour visualiser les résultats d'analyse de graphes de cybersécurité",
         "endpoints": {
             "POST /analysis/mock": "Génère un résultat d'analyse mock pour test (proxy vers upstream)",
-            "POST /upstream/analyze": "Proxy vers l'upstream /analyze/ (retourne analysis + optional graph)",
+            "POST /upstream/analyze": "Proxy vers l'upstream /analyze/ (retourne analysis + optional graph, résultats mis en cache; ?cache=refresh|bypass, ?layout=true)",
+            "POST /upstream/analyze/ndjson": "Comme /upstream/analyze, réponse NDJSON progressive (en-tête, puis nœuds et arêtes par lots)",
+            "POST /upstream/analyze/events": "Comme /upstream/analyze, progression en Server-Sent Events (accepted, waiting, analysis, graph, done)",
+            "POST /jobs/analyze": "Lance une analyse en arrière-plan et retourne un job_id (202; 503 si la file est pleine)",
+            "GET /jobs/{job_id}": "Statut, durées et résultat d'un job d'analyse",
+            "GET /jobs": "Compteurs de la file de jobs et jobs retenus",
+            "GET /upstream/status": "Appels upstream en cours et en attente, état du disjoncteur et des requêtes doublées",
+            "GET /cache/stats": "Compteurs hit/miss du cache d'analyses",
+            "DELETE /cache": "Vide le cache d'analyses",
             "GET /upstream/last_query": "DEPRECATED: /analyze/last_query is decommissioned; use POST /upstream/analyze with include_data=true",
             "POST /data": "Proxy pour envoyer des données au backend upstream",
             "POST /config/upstream": "Configurer l'URL de l'upstream au runtime",
             "GET /config/upstream": "Récupérer la configuration actuelle de l'upstream",
-            "GET /schema": "Récupère le schéma JSON de réponse",
-            "GET /use-cases": "Liste tous les use cases disponibles",
-            "GET /use-cases/{use_case_id}": "Charge les données pré-enregistrées d'un use case spécifique"
+            "GET /schema": "Récupère le schéma JSON de réponse (GET conditionnel via ETag)",
+            "GET /use-cases": "Liste tous les use cases disponibles (GET conditionnel via ETag)",
+            "GET /use-cases/{use_case_id}": "Charge les données pré-enregistrées d'un use case spécifique (?format=columnar pour un graphe en colonnes, ?layout=true pour les coordonnées)",
+            "GET /use-cases/{use_case_id}/ndjson": "Données d'un use case en NDJSON progressif (en-tête, puis nœuds et arêtes par lots)",
+            "GET /snapshots": "Liste les instantanés (fichiers .json) de data/",
+            "GET /snapshots/diff": "Différence entre deux instantanés de data/ (?base=&head=): éléments ajoutés, retirés, modifiés",
+            "GET /store/stats": "Taille et déduplication du graphe fusionné (analyses et use cases)",
+            "GET /store/graph": "Graphe fusionné, filtrable par source et par label (?source=&label=&limit=)",
+            "GET /store/nodes/{node_id}": "Nœud du graphe fusionné avec ses sources et ses relations",
+            "GET /ip/lookup": "Subnets / IPRanges contenant une adresse (?ip=&graph_id=), plus long préfixe d'abord, et nœuds portant cette adresse",
+            "POST /ip/lookup": "Recherche en lot d'adresses dans les Subnets / IPRanges ({ips: [...], graph_id?})",
+            "GET /risk/ranking": "Nœuds classés par score d'exposition (?graph_id=&label=&limit=&offset=)",
+            "GET /graphs/{graph_id}/risk": "Graphe chargé avec les propriétés exposure_score / exposure_hops par nœud",
+            "GET /search": "Recherche de nœuds par préfixe, mot ou propriété (?q=&limit=&offset=&label=&graph_id=)",
+            "GET /db/stats": "Taille de la base SQLite des instantanés",
+            "GET /db/snapshots": "Instantanés ingérés dans la base SQLite (data/graph.db)",
+            "GET /db/snapshots/{name}/graph": "Graphe d'un instantané lu dans la base, filtrable (?labels=&types=&limit=)",
+            "GET /db/nodes/{node_id}": "Nœud et ses relations lus dans la base (?snapshot=)",
+            "POST /db/ingest": "Ingère les fichiers de data/ dans la base SQLite",
+            "POST /layout": "Calcule la disposition (x/y) d'un graphe {nodes, edges} côté serveur",
+            "GET /graphs/{graph_id}/expand/{group_id}": "Contenu d'un super-nœud d'un graphe résumé (?summary=label|subnet|policy)",
+            "GET /graphs/{graph_id}/paths": "Plus courts chemins entre deux nœuds d'un graphe chargé (?source=&target=&k=&types=&max_depth=)",
+            "GET /graphs/{graph_id}/neighbors/{node_id}": "Voisinage à k sauts d'un nœud d'un graphe chargé (?depth=&types=&direction=)"
         }
     }
 
 
 @app.get("/schema")
-async def get_schema():
-    """Récupère le schéma JSON de réponse attendu"""
+async def get_schema(request: Request):
+    """Récupère le schéma JSON de réponse attendu (ETag / If-None-Match supportés)"""
+    if not schema_file.exists():
+        raise HTTPException(status_code=404, detail="Schéma non trouvé")
     try:
-        if SCHEMA_PATH.exists():
-            with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
-                schema = json.load(f)
-            return schema
-        else:
-            raise HTTPException(status_code=404, detail="Schéma non trouvé")
+        return catalog.file_response(request, schema_file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -242,103 +422,494 @@ async def create_mock_analysis(query: AnalysisQuery):
     url = f"{upstream}/analysis/mock"
     payload = {"query": query.query, "context": query.context or {}}
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.post(url, json=payload)
-            resp.raise_for_status()
+        client = get_http_client()
+
+        async def call(secondary: bool) -> Any:
+            # la copie d'un appel doublé ne passe que si une place est libre tout de suite
+            async with upstream_slot(wait=not secondary):
+                resp = await client.post(url, json=payload, timeout=upstream_client.endpoint_timeout("mock"))
+                resp.raise_for_status()
             return resp.json()
+
+        return await upstream_hedger.run("mock", call)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Erreur upstream: {e}")
 
 
-@app.post("/upstream/analyze")
-async def upstream_analyze(payload: Dict[str, Any]):
-    """Proxy POST to UPSTREAM_API/analyze/ — forward arbitrary payload (e.g. {question: ...})"""
+def _build_analysis_result(data: Any, streamed_graphs: Optional[Dict[str, Any]] = None, prune_dangling: bool = False) -> Dict[str, Any]:
+    """Construit {analysis, graph, graph_present, data_included} à partir de la réponse upstream.
+
+    `streamed_graphs` contient les nodes/edges déjà normalisés par le parsing incrémental
+    (voir graph_stream.parse_graph_document) ; sinon ils sont normalisés depuis `data`.
+    """
+    # The upstream is expected to include normalized graph data in its POST response when include_data=true.
+    # We will prefer the `data` field in the returned JSON (which should contain nodes/relationships/meta).
+    analysis = data.get('analysis') if isinstance(data, dict) and 'analysis' in data else data
+
+    graph = None
+    graph_present = False
+
+    # If the upstream returned a `data` object with nodes/relationships, normalize it to graph nodes/edges
+    try:
+        location, nodes_data, relationships_data = graph_normalizer.locate_graph_data(
+            data, graph_normalizer.UPSTREAM_GRAPH_LOCATIONS)
+        if location is not None:
+            if streamed_graphs is not None:
+                nodes, edges = streamed_graphs[location]
+                graph = {'nodes': nodes, 'edges': edges}
+                if prune_dangling:
+                    graph['edges'], graph['pruned_edges'] = graph_normalizer.prune_dangling_edges(nodes, edges)
+            else:
+                graph = graph_normalizer.normalize_graph(nodes_data, relationships_data, prune_dangling=prune_dangling)
+            graph_present = len(graph['nodes']) > 0
+        else:
+            # If there is some `data` but not in nodes/relationships shape, include it raw under graph.last_query for debugging
+            dat = None
+            if isinstance(analysis, dict) and isinstance(analysis.get('data'), dict):
+                dat = analysis['data']
+            elif isinstance(data, dict) and isinstance(data.get('data'), dict):
+                dat = data['data']
+            if dat is not None:
+                graph = {'last_query': dat}
+                graph_present = True
+    except Exception:
+        graph = None
+        graph_present = False
+
+    result = {
+        'analysis': analysis,
+        'graph': graph,
+        'graph_present': bool(graph_present),
+        'data_included': bool(graph_present)
+    }
+
+    return _register_graph(result)
+
+
+def _store_graph(result: Dict[str, Any], source: str) -> None:
+    """Fusionne le graphe d'une réponse dans le store commun (voir graph_store), en notant sa source.
+    Parcourt tout le graphe : à appeler depuis le threadpool."""
+    graph = result.get('graph')
+    if GRAPH_STORE_ENABLED and isinstance(graph, dict) and graph.get('nodes'):
+        store.add_graph(graph, source, result.get('graph_id'))
+
+
+def _analysis_source(payload: Any, key: str) -> str:
+    question = payload.get('question') if isinstance(payload, dict) else None
+    return f"analysis:{' '.join(question.split())}" if isinstance(question, str) and question.strip() else f"analysis:{key[:12]}"
+
+
+def _register_graph(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Enregistre le graphe d'une réponse dans le registre et y ajoute son `graph_id`, qui permet de
+    l'interroger ensuite localement (chemins, drill-down, ...) sans le renvoyer.
+
+    L'empreinte est calculée une fois, à la construction de la réponse (dans le threadpool) : une
+    réponse servie depuis un cache garde son `graph_id` et se réenregistre sans la recalculer."""
+    graph = result.get('graph')
+    if isinstance(graph, dict) and graph.get('nodes'):
+        result['graph_id'] = registry.register(graph, result.get('graph_id'))
+    return result
+
+
+async def _fetch_analysis_document(analyze_url: str, payload: Dict[str, Any]) -> Any:
+    """Appelle UPSTREAM_API/analyze/ et retourne le document JSON brut"""
+    client = get_http_client()
+    async with upstream_slot():
+        resp = await client.post(analyze_url, json=payload, timeout=upstream_client.endpoint_timeout("analyze"))
+        resp.raise_for_status()
+    return resp.json()
+
+
+async def _fetch_analysis(analyze_url: str, payload: Dict[str, Any], prune_dangling: bool = False) -> Dict[str, Any]:
+    """Appelle UPSTREAM_API/analyze/ et normalise la réponse en {analysis, graph, graph_present, data_included}"""
+    data = await _fetch_analysis_document(analyze_url, payload)
+    return await run_in_threadpool(_build_analysis_result, data, None, prune_dangling)
+
+
+def _analysis_preview(data: Any) -> Any:
+    """Partie analyse d'une réponse upstream, sans les données du graphe (envoyée avant leur normalisation)."""
+    analysis = data.get('analysis') if isinstance(data, dict) and 'analysis' in data else data
+    if isinstance(analysis, dict):
+        return {k: v for k, v in analysis.items() if k not in ('data', 'nodes', 'relationships', 'graph')}
+    return analysis
+
+
+def _ndjson_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Réponse à envoyer en NDJSON : l'analyse de l'en-tête ne recopie pas les tableaux du graphe."""
+    if isinstance(payload, dict) and 'analysis' in payload:
+        return {**payload, 'analysis': _analysis_preview(payload)}
+    return payload
+
+
+async def _fetch_analysis_streamed(analyze_url: str, payload: Dict[str, Any], prune_dangling: bool = False) -> Dict[str, Any]:
+    """Variante de _fetch_analysis qui parse le corps upstream en flux.
+
+    La mémoire de pointe est bornée par UPSTREAM_STREAM_CHUNK_SIZE plutôt que par la taille de la
+    réponse : le corps brut n'est jamais chargé en entier et les tableaux bruts nodes/relationships
+    ne sont pas recopiés dans `analysis`.
+    """
+    client = get_http_client()
+    async with upstream_slot():
+        async with client.stream("POST", analyze_url, json=payload, timeout=upstream_client.endpoint_timeout("analyze")) as resp:
+            resp.raise_for_status()
+            data, graphs = await graph_stream.parse_graph_document(
+                resp.aiter_bytes(STREAM_CHUNK_SIZE),
+                graph_normalizer.normalize_node,
+                graph_normalizer.normalize_relationship,
+                buf_size=STREAM_CHUNK_SIZE,
+            )
+    return await run_in_threadpool(_build_analysis_result, data, graphs, prune_dangling)
+
+
+def _stream_mode(stream: Optional[bool]) -> bool:
+    """Parsing incrémental demandé par `?stream=` ou par défaut via UPSTREAM_STREAM_PARSE ; nécessite ijson."""
+    requested = STREAM_PARSE_DEFAULT if stream is None else stream
+    if requested and graph_stream.ijson is None:
+        upstream_client.logger.warning("Parsing incrémental demandé mais ijson n'est pas installé: lecture complète du corps")
+        return False
+    return requested
+
+
+def _cache_mode(request: Request, cache: Optional[str]) -> str:
+    """Mode de cache demandé : 'use' (défaut), 'refresh' (ignore l'entrée existante mais stocke le résultat)
+    ou 'bypass' (ni lecture ni écriture). Accepte `?cache=` ou l'en-tête Cache-Control (no-cache / no-store)."""
+    if cache:
+        mode = cache.strip().lower()
+        if mode not in ("use", "refresh", "bypass"):
+            raise HTTPException(status_code=400, detail="Paramètre 'cache' invalide (use, refresh ou bypass)")
+        return mode
+    directives = {d.strip().lower() for d in request.headers.get("cache-control", "").split(",")}
+    if "no-store" in directives:
+        return "bypass"
+    if "no-cache" in directives or "max-age=0" in directives:
+        return "refresh"
+    return "use"
+
+
+GRAPH_FORMATS = ("default", "columnar")
+
+
+def _check_graph_format(format: str) -> str:
+    if format not in GRAPH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Paramètre 'format' invalide ({', '.join(GRAPH_FORMATS)})")
+    return format
+
+
+def _graph_layout(graph: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Disposition calculée côté serveur (voir graph_layout) ; None si numpy n'est pas installé."""
+    if not graph_layout.available():
+        upstream_client.logger.warning("Disposition demandée mais numpy n'est pas installé: le frontend la calculera")
+        return None
+    return graph_layout.layout_for(graph)
+
+
+def _check_summary(summary: Optional[str]) -> Optional[str]:
+    if summary is not None and summary not in graph_summary.SUMMARY_MODES:
+        raise HTTPException(status_code=400, detail=f"Paramètre 'summary' invalide ({', '.join(graph_summary.SUMMARY_MODES)})")
+    return summary
+
+
+def _summarize(graph: Dict[str, Any], by: str) -> Tuple[str, Dict[str, Any]]:
+    """Enregistre le graphe complet et retourne (graph_id, résumé), le résumé étant gardé avec le graphe."""
+    graph_id = registry.register(graph)
+    return graph_id, registry.derived(graph_id, ('summary', by), lambda g: graph_summary.summarize(g, by))
+
+
+def _graph_patch(graph_id: str, since_version: str) -> Optional[Dict[str, Any]]:
+    """Patch (voir graph_diff) qui fait passer le client de la version `since_version` du graphe à `graph_id`.
+    None si la version du client n'est plus dans le registre : il reçoit alors le graphe complet."""
+    base = registry.get(since_version)
+    if base is None:
+        return None
+    try:
+        return registry.derived(graph_id, ('patch', since_version), lambda graph: {
+            'base_version': since_version, 'version': graph_id, **graph_diff.diff_graphs(base, graph),
+        })
+    except KeyError:
+        return None
+
+
+def _format_graph_result(result: Dict[str, Any], format: str, layout: bool = False,
+                         summary: Optional[str] = None, since_version: Optional[str] = None) -> Dict[str, Any]:
+    """Applique le format de graphe demandé à une réponse {..., graph} sans modifier l'original (partagé via le cache).
+
+    Avec `since_version` (graph_id, c'est-à-dire la version de contenu, du graphe déjà affiché par le
+    client), le graphe est remplacé par un `patch` des nœuds et arêtes ajoutés, retirés ou modifiés
+    quand cette version est encore connue ; ni disposition ni format colonnes ne s'appliquent alors.
+    Avec `summary`, le graphe est remplacé par son résumé en super-nœuds et un bloc `summary`
+    ({'graph_id', 'by', ...}) permet le drill-down via /graphs/{graph_id}/expand/{group_id}.
+    Avec `layout`, ajoute un bloc `layout` ({'x', 'y', ...} alignés sur l'ordre des nœuds).
+    """
+    graph = result.get('graph')
+    if since_version and not summary and result.get('graph_id'):
+        patch = _graph_patch(result['graph_id'], since_version)
+        if patch is not None:
+            formatted = dict(result)
+            formatted['graph'] = None
+            formatted['patch'] = patch
+            return formatted
+    if (format != "columnar" and not layout and not summary) or not isinstance(graph, dict) or 'nodes' not in graph:
+        return result
+    formatted = dict(result)
+    if summary:
+        graph_id, summarized = _summarize(graph, summary)
+        formatted['summary'] = {
+            'graph_id': graph_id,
+            'by': summary,
+            'groups': len(summarized['groups']),
+            'nodes': len(graph['nodes']),
+            'edges': len(graph.get('edges') or []),
+        }
+        graph = formatted['graph'] = summarized['graph']
+    if layout:
+        formatted['layout'] = _graph_layout(graph)
+    if format == "columnar":
+        formatted['graph'] = graph_normalizer.to_columnar(graph)
+    return formatted
+
+
+async def _format_graph_result_async(result: Dict[str, Any], format: str, layout: bool = False,
+                                     summary: Optional[str] = None, since_version: Optional[str] = None) -> Dict[str, Any]:
+    """_format_graph_result hors de la boucle d'événements quand une disposition, un résumé ou un patch est à calculer."""
+    if layout or summary or since_version:
+        return await run_in_threadpool(_format_graph_result, result, format, layout, summary, since_version)
+    return _format_graph_result(result, format)
+
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    analysis = result.get('analysis')
+    return not (isinstance(analysis, dict) and analysis.get('status') == 'error')
+
+
+def _prepare_analysis(payload: Dict[str, Any], request: Request, cache: Optional[str]) -> Tuple[str, str]:
+    """Vérifications communes aux endpoints d'analyse. Retourne (URL upstream /analyze/, mode de cache)."""
     upstream = require_upstream()
     if httpx is None:
         raise HTTPException(status_code=500, detail="httpx requis mais non installé")
 
     analyze_url = f"{upstream}/analyze/"
-    last_query_url = f"{upstream}/analyze/last_query"
+    mode = _cache_mode(request, cache)
+
+    # Ensure clients request the normalized graph directly from the upstream by setting include_data=True
+    if isinstance(payload, dict):
+        # don't override an explicit false, but prefer to request the data when not provided
+        if 'include_data' not in payload:
+            payload['include_data'] = True
+    return analyze_url, mode
+
+
+async def _run_analysis(payload: Dict[str, Any], request: Request, cache: Optional[str], stream: Optional[bool],
+                        prune_dangling: bool) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Résultat normalisé d'une analyse upstream (cache + déduplication des requêtes en vol).
+    Retourne (résultat, en-têtes X-Cache / Age)."""
+    analyze_url, mode = _prepare_analysis(payload, request, cache)
+    streamed = _stream_mode(stream)
+    fetch = _fetch_analysis_streamed if streamed else _fetch_analysis
+    variant = ("stream" if streamed else "") + (":prune" if prune_dangling else "")
+    key = upstream_client.request_key(analyze_url, payload, variant=variant)
+    if mode == "use":
+        cached = analyze_cache.get(key)
+        if cached is not None:
+            result, age = cached
+            # le graphe a pu sortir du registre depuis la mise en cache
+            _register_graph(result)
+            return result, {"X-Cache": "HIT", "Age": str(int(age))}
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Ensure clients request the normalized graph directly from the upstream by setting include_data=True
-            if isinstance(payload, dict):
-                # don't override an explicit false, but prefer to request the data when not provided
-                if 'include_data' not in payload:
-                    payload['include_data'] = True
-            resp = await client.post(analyze_url, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            # The upstream is expected to include normalized graph data in its POST response when include_data=true.
-            # We will prefer the `data` field in the returned JSON (which should contain nodes/relationships/meta).
-            analysis = data.get('analysis') if isinstance(data, dict) and 'analysis' in data else data
-
-            graph = None
-            graph_present = False
-
-            # If the upstream returned a `data` object with nodes/relationships, normalize it to graph nodes/edges
-            try:
-                dat = None
-                # analysis may be the full response dict or wrapped under 'analysis'
-                if isinstance(analysis, dict) and 'data' in analysis and isinstance(analysis['data'], dict):
-                    dat = analysis['data']
-                elif isinstance(data, dict) and 'data' in data and isinstance(data['data'], dict):
-                    dat = data['data']
-
-                if isinstance(dat, dict) and 'nodes' in dat and 'relationships' in dat:
-                    nodes = []
-                    edges = []
-                    for n in dat.get('nodes', []):
-                        nid = str(n.get('id')) if n.get('id') is not None else (n.get('properties', {}).get('id') if isinstance(n.get('properties', {}), dict) else None)
-                        nid = str(nid) if nid is not None else (n.get('label') or '')
-                        labels = n.get('labels') if isinstance(n.get('labels'), list) else []
-                        props = n.get('properties', {}) if isinstance(n.get('properties'), dict) else {}
-                        label = ', '.join(labels) if labels else (props.get('name') or nid)
-                        nodes.append({
-                            'id': nid,
-                            'label': label,
-                            'labels': labels,
-                            'properties': props
-                        })
-
-                    for r in dat.get('relationships', []):
-                        source = r.get('start_id') or r.get('from') or r.get('start')
-                        target = r.get('end_id') or r.get('to') or r.get('end')
-                        reltype = r.get('type') or r.get('relationship_type') or ''
-                        edges.append({
-                            'from': str(source) if source is not None else None,
-                            'to': str(target) if target is not None else None,
-                            'label': reltype,
-                            'properties': r.get('properties', {})
-                        })
-
-                    graph = {'nodes': nodes, 'edges': edges}
-                    graph_present = len(nodes) > 0
-                else:
-                    # If there is some `data` but not in nodes/relationships shape, include it raw under graph.last_query for debugging
-                    if dat is not None:
-                        graph = {'last_query': dat}
-                        graph_present = True
-            except Exception:
-                graph = None
-                graph_present = False
-
-            result = {
-                'analysis': analysis,
-                'graph': graph,
-                'graph_present': bool(graph_present),
-                'data_included': bool(graph_present)
-            }
-
-            return result
+        result = await analyze_flight.run(key, lambda: fetch(analyze_url, payload, prune_dangling=prune_dangling))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Erreur upstream: {e}")
 
+    if mode != "bypass" and _is_cacheable(result):
+        analyze_cache.set(key, result)
+    await run_in_threadpool(_store_graph, result, _analysis_source(payload, key))
+    return result, {"X-Cache": {"use": "MISS", "refresh": "REFRESH", "bypass": "BYPASS"}[mode]}
+
+
+@app.post("/upstream/analyze")
+async def upstream_analyze(payload: Dict[str, Any], request: Request, cache: Optional[str] = None,
+                           stream: Optional[bool] = None, prune_dangling: bool = False, format: str = "default",
+                           layout: bool = False, summary: Optional[str] = None, since_version: Optional[str] = None):
+    """Proxy POST to UPSTREAM_API/analyze/ — forward arbitrary payload (e.g. {question: ...})
+
+    Les résultats normalisés sont mis en cache (voir `_cache_mode` pour le contrôle par requête) et
+    les requêtes concurrentes identiques (même payload normalisé) partagent un seul appel upstream.
+    `?stream=true` active le parsing incrémental des grosses réponses (voir `_fetch_analysis_streamed`),
+    `?prune_dangling=true` retire les arêtes dont une extrémité est absente du graphe,
+    `?format=columnar` renvoie le graphe en colonnes (voir graph_normalizer.to_columnar),
+    `?layout=true` ajoute les coordonnées des nœuds calculées côté serveur (voir graph_layout),
+    `?summary=label|subnet|policy` renvoie un résumé en super-nœuds (voir graph_summary),
+    `?since_version=<graph_id>` renvoie un patch depuis le graphe déjà affiché (voir _format_graph_result).
+    L'encodage (JSON, MessagePack, Arrow IPC, zstd) est négocié via Accept / Accept-Encoding.
+    """
+    _check_graph_format(format)
+    _check_summary(summary)
+    result, headers = await _run_analysis(payload, request, cache, stream, prune_dangling)
+    formatted = await _format_graph_result_async(result, format, layout, summary, since_version)
+    return graph_encoding.graph_response(request, formatted, headers=headers)
+
+
+@app.post("/upstream/analyze/ndjson")
+async def upstream_analyze_ndjson(payload: Dict[str, Any], request: Request, cache: Optional[str] = None,
+                                  stream: Optional[bool] = None, prune_dangling: bool = False):
+    """Comme POST /upstream/analyze, mais la réponse est envoyée en NDJSON : en-tête (analyse) puis
+    nœuds et arêtes par lots (voir graph_ndjson), pour un affichage progressif côté client."""
+    result, headers = await _run_analysis(payload, request, cache, stream, prune_dangling)
+    return graph_ndjson.ndjson_response(_ndjson_payload(result), headers=headers)
+
+
+async def _analysis_events(request: Request, payload: Dict[str, Any], analyze_url: str, mode: str,
+                           prune_dangling: bool, format: str, layout: bool, summary: Optional[str],
+                           since_version: Optional[str] = None):
+    """Événements SSE d'une analyse : accepted, waiting (toutes les sse.HEARTBEAT_INTERVAL s), analysis
+    (dès réception, avant la normalisation du graphe), graph, done ; error en cas d'échec."""
+    started = time.monotonic()
+    ids = itertools.count()
+
+    def event(name: str, data: Any) -> bytes:
+        return sse.format_event(name, data, next(ids))
+
+    # même clé que POST /upstream/analyze (lecture complète) : le cache est partagé entre les deux endpoints
+    key = upstream_client.request_key(analyze_url, payload, variant=":prune" if prune_dangling else "")
+    yield event('accepted', {'question': payload.get('question') if isinstance(payload, dict) else None, 'cache': mode})
+    task = None
+    try:
+        cached = analyze_cache.get(key) if mode == "use" else None
+        if cached is not None:
+            result, age = cached
+            _register_graph(result)
+            yield event('analysis', {'analysis': _analysis_preview(result), 'cache': 'HIT', 'age': int(age)})
+        else:
+            document_key = upstream_client.request_key(analyze_url, payload, variant="document")
+            task = asyncio.ensure_future(analyze_flight.run(document_key, lambda: _fetch_analysis_document(analyze_url, payload)))
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=sse.HEARTBEAT_INTERVAL)
+                if done:
+                    break
+                if await request.is_disconnected():
+                    return
+                yield event('waiting', {'elapsed': round(time.monotonic() - started, 1)})
+            data = task.result()
+            yield event('analysis', {'analysis': _analysis_preview(data), 'cache': {"use": "MISS", "refresh": "REFRESH", "bypass": "BYPASS"}[mode]})
+            result = await run_in_threadpool(_build_analysis_result, data, None, prune_dangling)
+            if mode != "bypass" and _is_cacheable(result):
+                analyze_cache.set(key, result)
+            await run_in_threadpool(_store_graph, result, _analysis_source(payload, key))
+
+        yield event('graph', await _format_graph_result_async(result, format, layout, summary, since_version))
+        yield event('done', {'elapsed': round(time.monotonic() - started, 1)})
+    except Exception as e:
+        if isinstance(e, HTTPException):
+            error = {'status': e.status_code, 'detail': e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error['retry_after'] = int(e.headers["Retry-After"])
+            yield event('error', error)
+        else:
+            yield event('error', {'status': 502, 'detail': f"Erreur upstream: {e}"})
+    finally:
+        # client parti : l'appel upstream partagé continue pour les autres requêtes (voir SingleFlight)
+        if task is not None and not task.done():
+            task.cancel()
+
+
+@app.post("/upstream/analyze/events")
+async def upstream_analyze_events(payload: Dict[str, Any], request: Request, cache: Optional[str] = None,
+                                  prune_dangling: bool = False, format: str = "default",
+                                  layout: bool = False, summary: Optional[str] = None, since_version: Optional[str] = None):
+    """Comme POST /upstream/analyze, mais la progression est envoyée en Server-Sent Events :
+    accepted, waiting (heartbeat pendant l'attente de l'upstream), analysis (résumé dès réception),
+    graph (réponse complète, mêmes options que /upstream/analyze), done ou error."""
+    _check_graph_format(format)
+    _check_summary(summary)
+    analyze_url, mode = _prepare_analysis(payload, request, cache)
+    return sse.sse_response(_analysis_events(request, payload, analyze_url, mode, prune_dangling, format, layout, summary,
+                                             since_version))
+
+
+@app.post("/jobs/analyze", status_code=202)
+async def submit_analysis_job(payload: Dict[str, Any], request: Request, cache: Optional[str] = None,
+                              stream: Optional[bool] = None, prune_dangling: bool = False, format: str = "default",
+                              layout: bool = False, summary: Optional[str] = None):
+    """Lance une analyse en arrière-plan (mêmes options que POST /upstream/analyze) et retourne
+    immédiatement un job_id ; le résultat se récupère via GET /jobs/{job_id}. 503 si la file est pleine."""
+    _check_graph_format(format)
+    _check_summary(summary)
+    require_upstream()
+    mode = _cache_mode(request, cache)
+
+    async def run() -> Dict[str, Any]:
+        result, _ = await _run_analysis(payload, request, mode, stream, prune_dangling)
+        return await _format_graph_result_async(result, format, layout, summary)
+
+    params = {'question': payload.get('question') if isinstance(payload, dict) else None, 'cache': mode,
+              'format': format, 'layout': layout, 'summary': summary, 'prune_dangling': prune_dangling}
+    try:
+        job = analysis_jobs.submit("analyze", run, params)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="File de jobs pleine, réessayez plus tard",
+                            headers={"Retry-After": str(JOBS_RETRY_AFTER)})
+    location = f"/jobs/{job.id}"
+    return JSONResponse(status_code=202, content={**job.to_dict(), 'location': location}, headers={"Location": location})
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """Compteurs de la file de jobs et jobs retenus (sans leurs résultats)"""
+    return {"stats": analysis_jobs.stats(), "jobs": [job.to_dict(include_result=False) for job in analysis_jobs.recent()]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Statut, durées et (une fois terminé) résultat d'un job"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' inconnu ou expiré")
+    return graph_encoding.graph_response(request, job.to_dict())
+
+
+@app.get("/upstream/status")
+async def upstream_status():
+    """Appels upstream en cours et en attente (limitation de la concurrence), état du disjoncteur,
+    requêtes doublées, déduplication en vol"""
+    return {
+        "upstream": getattr(app.state, "upstream", None),
+        "limiter": upstream_limiter.stats(),
+        "breaker": upstream_breaker.stats(),
+        "hedging": upstream_hedger.stats(),
+        "in_flight": analyze_flight.stats(),
+    }
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Compteurs des caches (analyses, use cases) et de la déduplication des requêtes en vol"""
+    return {
+        "analyze": analyze_cache.stats(),
+        "in_flight": analyze_flight.stats(),
+        "use_case_payloads": use_case_payloads.stats(),
+        "use_case_responses": use_case_responses.stats(),
+        "snapshot_graphs": snapshot_graphs.stats(),
+        "snapshot_diffs": snapshot_diffs.stats(),
+        "layouts": graph_layout.layout_cache.stats(),
+        "graphs": registry.stats(),
+    }
+
+
+@app.delete("/cache")
+async def clear_cache():
+    """Vide le cache d'analyses et les réponses de use case pré-construites"""
+    use_case_payloads.clear()
+    use_case_responses.clear()
+    snapshot_graphs.clear()
+    snapshot_diffs.clear()
+    graph_layout.layout_cache.clear()
+    registry.clear()
+    return {"cleared": analyze_cache.clear()}
+
 
 @app.get("/upstream/last_query")
 async def upstream_last_query():
@@ -349,10 +920,15 @@ async def upstream_last_query():
 
     url = f"{upstream}/analyze/last_query"
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
+        client = get_http_client()
+
+        async def call(secondary: bool) -> Any:
+            async with upstream_slot(wait=not secondary):
+                resp = await client.get(url, timeout=upstream_client.endpoint_timeout("last_query"))
+                resp.raise_for_status()
             return resp.json()
+
+        return await upstream_hedger.run("last_query", call)
     except HTTPException:
         raise
     except Exception as e:
@@ -370,10 +946,11 @@ async def save_data(json_data: JsonData):
     url = f"{upstream}/data"
     payload = {"data": json_data.data, "filename": json_data.filename}
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.post(url, json=payload)
+        client = get_http_client()
+        async with upstream_slot():
+            resp = await client.post(url, json=payload, timeout=upstream_client.endpoint_timeout("data"))
             resp.raise_for_status()
-            return resp.json()
+        return resp.json()
     except HTTPException:
         raise
     except Exception as e:
@@ -400,161 +977,721 @@ async def get_analysis_stats(filename: str):
     raise HTTPException(status_code=404, detail="Endpoint removed: per-file stats retrieval is unsupported. Use POST /upstream/analyze.")
 
 
+def _snapshot_path(name: str) -> Path:
+    """Chemin d'un instantané de data/ désigné par son nom de fichier ; 400 hors de data/, 404 s'il n'existe pas."""
+    path = (DATA_DIR / name).resolve()
+    if path.parent != DATA_DIR.resolve() or path.suffix != ".json":
+        raise HTTPException(status_code=400, detail=f"Instantané invalide: '{name}' (nom d'un fichier .json de data/)")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Instantané non trouvé: {name}")
+    return path
+
+
+def _graph_db(create: bool = False) -> Optional[Any]:
+    """Connexion SQLite du thread courant (voir graph_db) ; None si la base est désactivée ou
+    n'existe pas encore (sauf `create`)."""
+    if not GRAPH_DB_ENABLED or (not create and not graph_db.DB_PATH.exists()):
+        return None
+    conn = getattr(_graph_db_local, 'conn', None)
+    if conn is None:
+        conn = _graph_db_local.conn = graph_db.connect(graph_db.DB_PATH)
+    return conn
+
+
+def _db_snapshot(path: Path, prune_dangling: bool = False) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """(analyse, graphe normalisé) d'un fichier de data/ lus dans la base s'il y a été ingéré dans
+    son état actuel ; None sinon (le fichier est alors parsé)."""
+    conn = _graph_db()
+    if conn is None:
+        return None
+    try:
+        row = graph_db.snapshot_for_file(conn, path)
+        if row is None:
+            return None
+        graph = graph_db.load_graph(conn, row["name"])
+    except Exception as e:
+        logger.warning("Lecture de %s dans la base impossible: %s", path.name, e)
+        return None
+    if prune_dangling:
+        edges, pruned = graph_normalizer.prune_dangling_edges(graph['nodes'], graph['edges'])
+        graph = {'nodes': graph['nodes'], 'edges': edges, 'pruned_edges': pruned}
+    return json.loads(row["analysis"]), graph
+
+
+def _load_snapshot_graph(path: Path) -> Dict[str, Any]:
+    """Graphe normalisé d'un instantané (vide si le fichier ne contient pas de graphe)."""
+    stored = _db_snapshot(path)
+    if stored is not None:
+        return stored[1]
+    with open(path, "r", encoding="utf-8") as f:
+        document = json.load(f)
+    location, nodes_data, relationships_data = graph_normalizer.locate_graph_data(document)
+    if location is None:
+        return {'nodes': [], 'edges': []}
+    return graph_normalizer.normalize_graph(nodes_data, relationships_data)
+
+
+def _snapshot_diff(base: Path, head: Path) -> Dict[str, Any]:
+    def graph(path: Path) -> Dict[str, Any]:
+        return snapshot_graphs.get_or_build(path.name, (path,), lambda: _load_snapshot_graph(path))[0]
+
+    return snapshot_diffs.get_or_build(
+        (base.name, head.name), (base, head), lambda: graph_diff.diff_graphs(graph(base), graph(head)),
+    )
+
+
+@app.get("/snapshots")
+async def list_snapshots():
+    """Instantanés disponibles dans data/ (fichiers .json), du plus récent au plus ancien"""
+    files = sorted(DATA_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return {"snapshots": [
+        {"name": p.name, "size": p.stat().st_size, "modified": datetime.fromtimestamp(p.stat().st_mtime).isoformat()}
+        for p in files
+    ]}
+
+
+@app.get("/snapshots/diff")
+async def diff_snapshots(base: str, head: str, request: Request):
+    """Différence entre deux instantanés de data/ (voir graph_diff) : nœuds et relations ajoutés, retirés
+    ou modifiés (propriété par propriété), et compteurs. Résultat mis en cache tant que les fichiers ne changent pas."""
+    base_path, head_path = _snapshot_path(base), _snapshot_path(head)
+    try:
+        diff, hit = await run_in_threadpool(_snapshot_diff, base_path, head_path)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=422, detail=f"Instantané illisible: {e}")
+    return graph_encoding.graph_response(request, {'base': base, 'head': head, **diff},
+                                         headers={"X-Cache": "HIT" if hit else "MISS"})
+
+
 @app.get("/use-cases")
-async def get_use_cases():
-    """Récupère la liste de tous les use cases disponibles"""
+async def get_use_cases(request: Request):
+    """Récupère la liste de tous les use cases disponibles (ETag / If-None-Match supportés)"""
     try:
-        if not USE_CASES_PATH.exists():
+        if not use_case_catalog.exists():
             raise HTTPException(status_code=404, detail="Fichier use_cases.json non trouvé")
         
-        with open(USE_CASES_PATH, "r", encoding="utf-8") as f:
-            use_cases = json.load(f)
-        
-        return use_cases
+        return catalog.file_response(request, use_case_catalog)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la lecture des use cases: {str(e)}")
 
 
-@app.get("/use-cases/{use_case_id}")
-async def get_use_case_data(use_case_id: str):
-    """Charge les données pré-enregistrées d'un use case spécifique"""
-    try:
-        # Charger la liste des use cases
-        if not USE_CASES_PATH.exists():
-            raise HTTPException(status_code=404, detail="Fichier use_cases.json non trouvé")
-        
-        with open(USE_CASES_PATH, "r", encoding="utf-8") as f:
-            use_cases_data = json.load(f)
-        
-        # Trouver le use case demandé
-        use_case = None
-        for uc in use_cases_data.get("use_cases", []):
-            if uc.get("id") == use_case_id:
-                use_case = uc
-                break
-        
-        if not use_case:
-            raise HTTPException(status_code=404, detail=f"Use case '{use_case_id}' non trouvé")
-        
-        # Charger le fichier de réponse
-        response_file = use_case.get("response_file")
-        if not response_file:
-            raise HTTPException(status_code=404, detail=f"Pas de fichier de réponse défini pour ce use case")
-        
-        response_path = DATA_DIR / response_file
-        if not response_path.exists():
-            raise HTTPException(status_code=404, detail=f"Fichier de réponse non trouvé: {response_file}")
-        
+def _use_case_response_path(use_case_id: str) -> Tuple[Dict[str, Any], Path]:
+    """Retourne (use case, chemin du fichier de réponse) ou lève HTTPException(404)."""
+    # Trouver le use case demandé dans le catalogue indexé
+    if not use_case_catalog.exists():
+        raise HTTPException(status_code=404, detail="Fichier use_cases.json non trouvé")
+    
+    use_case = use_case_catalog.get(use_case_id)
+    
+    if not use_case:
+        raise HTTPException(status_code=404, detail=f"Use case '{use_case_id}' non trouvé")
+    
+    # Charger le fichier de réponse
+    response_file = use_case.get("response_file")
+    if not response_file:
+        raise HTTPException(status_code=404, detail=f"Pas de fichier de réponse défini pour ce use case")
+    
+    response_path = DATA_DIR / response_file
+    if not response_path.exists():
+        raise HTTPException(status_code=404, detail=f"Fichier de réponse non trouvé: {response_file}")
+    return use_case, response_path
+
+
+def _build_use_case_payload(use_case: Dict[str, Any], response_path: Path, prune_dangling: bool = False) -> Dict[str, Any]:
+    """Lit et normalise le fichier de réponse d'un use case en {use_case, analysis, graph, ...}
+    (depuis la base SQLite quand le fichier y a été ingéré dans son état actuel)"""
+    stored = _db_snapshot(response_path, prune_dangling)
+    if stored is None:
         with open(response_path, "r", encoding="utf-8") as f:
             response_data = json.load(f)
-        
-        # Normaliser la structure de la réponse pour qu'elle soit compatible avec le frontend
-        graph = None
-        graph_present = False
-        analysis = None
-        
-        try:
+    
+    # Normaliser la structure de la réponse pour qu'elle soit compatible avec le frontend
+    graph = None
+    graph_present = False
+    analysis = None
+    
+    try:
+        if stored is not None:
+            analysis, graph = stored
+        else:
             # Extraire l'analyse si elle existe
             if isinstance(response_data, dict) and 'analysis' in response_data:
                 analysis = response_data['analysis']
-            
-            # Chercher les nodes et relationships à différents endroits
-            nodes_data = []
-            relationships_data = []
-            
-            # Cas 1: directement dans response_data
-            if 'nodes' in response_data and 'relationships' in response_data:
-                nodes_data = response_data.get('nodes', [])
-                relationships_data = response_data.get('relationships', [])
-            # Cas 2: dans response_data.data
-            elif isinstance(response_data, dict) and 'data' in response_data:
-                data_obj = response_data['data']
-                if isinstance(data_obj, dict):
-                    nodes_data = data_obj.get('nodes', [])
-                    relationships_data = data_obj.get('relationships', [])
-            # Cas 3: dans response_data.analysis.data
-            elif isinstance(analysis, dict) and 'data' in analysis:
-                data_obj = analysis['data']
-                if isinstance(data_obj, dict):
-                    nodes_data = data_obj.get('nodes', [])
-                    relationships_data = data_obj.get('relationships', [])
-            
-            # Normaliser les nodes et edges
-            nodes = []
-            edges = []
-            
-            for n in nodes_data if isinstance(nodes_data, list) else []:
-                if not isinstance(n, dict):
-                    continue
-                nid = str(n.get('id')) if n.get('id') is not None else (n.get('properties', {}).get('id') if isinstance(n.get('properties', {}), dict) else None)
-                nid = str(nid) if nid is not None else (n.get('label') or f'node_{len(nodes)}')
-                labels = n.get('labels') if isinstance(n.get('labels'), list) else []
-                props = n.get('properties', {}) if isinstance(n.get('properties'), dict) else {}
-                label = ', '.join(labels) if labels else (props.get('name') or nid)
-                
-                nodes.append({
-                    'id': nid,
-                    'label': label,
-                    'labels': labels,
-                    'properties': props
-                })
-            
-            for r in relationships_data if isinstance(relationships_data, list) else []:
-                if not isinstance(r, dict):
-                    continue
-                source = r.get('start_id') or r.get('from') or r.get('start')
-                target = r.get('end_id') or r.get('to') or r.get('end')
-                reltype = r.get('type') or r.get('relationship_type') or ''
-                
-                edges.append({
-                    'from': str(source) if source is not None else None,
-                    'to': str(target) if target is not None else None,
-                    'label': reltype,
-                    'properties': r.get('properties', {})
-                })
-            
-            graph = {'nodes': nodes, 'edges': edges}
-            graph_present = len(nodes) > 0
-            
-        except Exception as e:
-            print(f"Erreur lors de la normalisation du graphe: {e}")
-            import traceback
-            traceback.print_exc()
-            graph = {'nodes': [], 'edges': []}
-            graph_present = False
-        
-        # Utiliser l'analyse existante ou créer une analyse synthétique
-        if not analysis:
-            analysis = {
-                'status': 'success',
-                'summary': f"Use case: {use_case.get('name')}",
-                'technical_analysis': use_case.get('description', ''),
-                'recommendations': [f"Ceci est un use case pré-enregistré: {use_case.get('name')}"],
-                'query': use_case.get('cypher', ''),
-                'timestamp': datetime.now().isoformat(),
-                'original_question': use_case.get('name'),
-                'record_count': len(graph.get('nodes', [])) if isinstance(graph, dict) and 'nodes' in graph else 0
-            }
-        else:
-            # Mettre à jour le record_count avec le nombre réel de nodes
-            if isinstance(graph, dict) and 'nodes' in graph:
-                analysis['record_count'] = len(graph.get('nodes', []))
 
+            # Chercher les nodes et relationships à différents endroits (racine, data, analysis.data, graph)
+            _, nodes_data, relationships_data = graph_normalizer.locate_graph_data(response_data)
+            graph = graph_normalizer.normalize_graph(nodes_data, relationships_data, prune_dangling=prune_dangling)
+        graph_present = len(graph['nodes']) > 0
         
-        return {
-            'use_case': use_case,
-            'analysis': analysis,
-            'graph': graph,
-            'graph_present': graph_present,
-            'data_included': graph_present
+    except Exception as e:
+        print(f"Erreur lors de la normalisation du graphe: {e}")
+        import traceback
+        traceback.print_exc()
+        graph = {'nodes': [], 'edges': []}
+        graph_present = False
+    
+    # Utiliser l'analyse existante ou créer une analyse synthétique
+    if not analysis:
+        analysis = {
+            'status': 'success',
+            'summary': f"Use case: {use_case.get('name')}",
+            'technical_analysis': use_case.get('description', ''),
+            'recommendations': [f"Ceci est un use case pré-enregistré: {use_case.get('name')}"],
+            'query': use_case.get('cypher', ''),
+            'timestamp': datetime.now().isoformat(),
+            'original_question': use_case.get('name'),
+            'record_count': len(graph.get('nodes', [])) if isinstance(graph, dict) and 'nodes' in graph else 0
         }
+    else:
+        # Mettre à jour le record_count avec le nombre réel de nodes
+        if isinstance(graph, dict) and 'nodes' in graph:
+            analysis['record_count'] = len(graph.get('nodes', []))
+
     
+    payload = _register_graph({
+        'use_case': use_case,
+        'analysis': analysis,
+        'graph': graph,
+        'graph_present': graph_present,
+        'data_included': graph_present
+    })
+    _store_graph(payload, f"use_case:{use_case.get('id')}")
+    return payload
+
+
+def _use_case_entry(use_case_id: str, prune_dangling: bool, format: str, media_type: str, encoding: Optional[str],
+                    layout: bool = False, summary: Optional[str] = None,
+                    since_version: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+    """Réponse d'un use case prête à envoyer (octets encodés + ETag), construite au premier accès puis
+    servie depuis le cache tant que use_cases.json et le fichier de réponse ne changent pas."""
+    use_case, response_path = _use_case_response_path(use_case_id)
+    sources = (USE_CASES_PATH, response_path)
+    payload, _ = use_case_payloads.get_or_build(
+        (use_case_id, prune_dangling), sources,
+        lambda: _build_use_case_payload(use_case, response_path, prune_dangling),
+    )
+    # la réponse en cache référence un graph_id : le graphe doit rester dans le registre
+    _register_graph(payload)
+
+    def build_entry():
+        formatted = _format_graph_result(payload, format, layout, summary, since_version)
+        body, headers = graph_encoding.encode(formatted, media_type, encoding)
+        return {'body': body, 'headers': headers, 'etag': '"' + hashlib.sha1(body).hexdigest() + '"'}
+
+    if since_version and since_version != payload.get('graph_id') and registry.get(since_version) is None:
+        # version inconnue : même réponse (graphe complet) que sans since_version
+        since_version = None
+    key = (use_case_id, prune_dangling, format, media_type, encoding, layout, summary, since_version)
+    return use_case_responses.get_or_build(key, sources, build_entry)
+
+
+def preload_use_cases() -> int:
+    """Construit à l'avance la réponse JSON par défaut de chaque use case. Retourne le nombre préchargé."""
+    loaded = 0
+    if not use_case_catalog.exists():
+        return loaded
+    for use_case_id in list(use_case_catalog.load().by_id):
+        try:
+            _use_case_entry(use_case_id, False, "default", graph_encoding.JSON, None)
+            loaded += 1
+        except Exception as e:
+            print(f"Préchargement du use case {use_case_id} impossible: {e}")
+    return loaded
+
+
+@app.get("/use-cases/{use_case_id}")
+async def get_use_case_data(use_case_id: str, request: Request, prune_dangling: bool = False, format: str = "default",
+                            layout: bool = False, summary: Optional[str] = None, since_version: Optional[str] = None):
+    """Charge les données pré-enregistrées d'un use case spécifique
+
+    `?prune_dangling=true` retire les arêtes dont une extrémité est absente du graphe,
+    `?format=columnar` renvoie le graphe en colonnes (voir graph_normalizer.to_columnar),
+    `?layout=true` ajoute les coordonnées des nœuds calculées côté serveur (voir graph_layout),
+    `?summary=label|subnet|policy` renvoie un résumé en super-nœuds (voir graph_summary),
+    `?since_version=<graph_id>` renvoie un patch depuis le graphe déjà affiché (voir _format_graph_result).
+    L'encodage (JSON, MessagePack, Arrow IPC, zstd) est négocié via Accept / Accept-Encoding.
+    La réponse encodée est mise en cache et servie avec un ETag (If-None-Match → 304).
+    """
+    _check_graph_format(format)
+    _check_summary(summary)
+    media_type, encoding = graph_encoding.negotiate(request)
+    try:
+        # premier accès : lecture du fichier ou de la base, normalisation, empreinte et fusion dans le store
+        entry, hit = await run_in_threadpool(_use_case_entry, use_case_id, prune_dangling, format, media_type, encoding,
+                                             layout, summary, since_version)
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {e.filename}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors du chargement du use case: {str(e)}")
+
+    headers = dict(entry['headers'])
+    headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    return catalog.conditional_response(request, entry['body'], entry['etag'], media_type=media_type, headers=headers)
+
+
+@app.get("/use-cases/{use_case_id}/ndjson")
+async def get_use_case_ndjson(use_case_id: str, prune_dangling: bool = False):
+    """Données d'un use case en NDJSON : en-tête (use case, analyse) puis nœuds et arêtes par lots"""
+    def load() -> Tuple[Dict[str, Any], bool]:
+        use_case, response_path = _use_case_response_path(use_case_id)
+        return use_case_payloads.get_or_build(
+            (use_case_id, prune_dangling), (USE_CASES_PATH, response_path),
+            lambda: _build_use_case_payload(use_case, response_path, prune_dangling),
+        )
+
+    try:
+        payload, hit = await run_in_threadpool(load)
     except HTTPException:
         raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {e.filename}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors du chargement du use case: {str(e)}")
+    return graph_ndjson.ndjson_response(_ndjson_payload(payload), headers={"X-Cache": "HIT" if hit else "MISS"})
+
+
+@app.get("/graphs/{graph_id}/expand/{group_id}")
+async def expand_graph_group(graph_id: str, group_id: str, request: Request):
+    """Drill-down : membres d'un super-nœud, arêtes internes et arêtes vers le reste du résumé"""
+    by = group_id.split(":", 1)[0]
+    if by not in graph_summary.SUMMARY_MODES:
+        raise HTTPException(status_code=404, detail=f"Super-nœud '{group_id}' non trouvé")
+    graph = registry.get(graph_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez le résumé")
+    _, summarized = await run_in_threadpool(_summarize, graph, by)
+    expanded = graph_summary.expand(graph, summarized, group_id)
+    if expanded is None:
+        raise HTTPException(status_code=404, detail=f"Super-nœud '{group_id}' non trouvé")
+    return graph_encoding.graph_response(request, {'graph_id': graph_id, 'group_id': group_id, **expanded})
+
+
+def _registered_graph(graph_id: str) -> Dict[str, Any]:
+    graph = registry.get(graph_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+    return graph
+
+
+def _graph_node(index: graph_index.CSRIndex, ref: str, name: str) -> int:
+    """Index du nœud désigné par `ref` (id ou propriété id / label / name) ; 404 si absent, 400 si ambigu."""
+    found = graph_index.find_nodes(index, ref)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Nœud '{ref}' ({name}) absent du graphe")
+    if len(found) > 1:
+        candidates = ', '.join(index.nodes[i]['id'] for i in found[:5])
+        raise HTTPException(status_code=400, detail=f"'{ref}' ({name}) désigne {len(found)} nœuds, précisez l'id: {candidates}")
+    return found[0]
+
+
+def _graph_index(graph_id: str) -> graph_index.CSRIndex:
+    """Index CSR du graphe, construit au premier usage et gardé avec lui dans le registre."""
+    return registry.derived(graph_id, 'index', graph_index.CSRIndex)
+
+
+def _check_traversal(direction: str, types: Optional[str]) -> Optional[frozenset]:
+    """Valide `direction` et retourne les types de relation demandés (séparés par des virgules ou des |)."""
+    if direction not in graph_index.DIRECTIONS:
+        raise HTTPException(status_code=400, detail=f"Paramètre 'direction' invalide ({', '.join(graph_index.DIRECTIONS)})")
+    return frozenset(t.strip() for t in types.replace('|', ',').split(',') if t.strip()) if types else None
+
+
+@app.get("/graphs/{graph_id}/paths")
+async def find_graph_paths(graph_id: str, request: Request, source: str, target: str, k: int = 1, max_depth: int = 10,
+                           types: Optional[str] = None, direction: str = "both"):
+    """Plus courts chemins entre deux nœuds d'un graphe déjà chargé, calculés localement (voir graph_paths)
+
+    `source` / `target` : id de nœud, ou valeur de la propriété id, label ou name ;
+    `k` : nombre de chemins (Yen, 1 à 20) ; `max_depth` : nombre maximal de relations (1 à 50) ;
+    `types` : types de relation autorisés, séparés par des virgules ou des | ; `direction` : both, out ou in.
+    """
+    if not 1 <= k <= 20:
+        raise HTTPException(status_code=400, detail="Paramètre 'k' invalide (1 à 20)")
+    if not 1 <= max_depth <= 50:
+        raise HTTPException(status_code=400, detail="Paramètre 'max_depth' invalide (1 à 50)")
+    type_filter = _check_traversal(direction, types)
+    _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        started = time.perf_counter()
+        index = _graph_index(graph_id)
+        src = _graph_node(index, source, "source")
+        dst = _graph_node(index, target, "target")
+        paths = graph_paths.k_shortest_paths(index, src, dst, k, direction, type_filter, max_depth)
+        found = graph_paths.path_subgraph(index, paths)
+        return {
+            'graph_id': graph_id,
+            'source': index.nodes[src]['id'],
+            'target': index.nodes[dst]['id'],
+            'k': k,
+            'max_depth': max_depth,
+            'types': sorted(type_filter) if type_filter else None,
+            'direction': direction,
+            **found,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    try:
+        return graph_encoding.graph_response(request, await run_in_threadpool(run))
+    except KeyError:
+        # graphe sorti du registre entre-temps
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+@app.get("/graphs/{graph_id}/neighbors/{node_id:path}")
+async def get_graph_neighbors(graph_id: str, node_id: str, request: Request, depth: int = 1, types: Optional[str] = None,
+                              direction: str = "both", limit: int = 500):
+    """Voisinage d'un nœud d'un graphe déjà chargé jusqu'à `depth` sauts (1 à 5), lu dans l'index CSR
+    (voir graph_index) : nœuds (avec `hops`, leur distance au nœud), arêtes qui les relient.
+    `types` : types de relation suivis ; `direction` : both, out ou in ; `limit` : nombre maximal de nœuds."""
+    if not 1 <= depth <= 5:
+        raise HTTPException(status_code=400, detail="Paramètre 'depth' invalide (1 à 5)")
+    if not 1 <= limit <= 10000:
+        raise HTTPException(status_code=400, detail="Paramètre 'limit' invalide (1 à 10000)")
+    type_filter = _check_traversal(direction, types)
+    _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        index = _graph_index(graph_id)
+        seed = _graph_node(index, node_id, "node")
+        ego = graph_index.ego_graph(index, seed, depth, direction, type_filter, limit)
+        return {
+            'graph_id': graph_id,
+            'node': index.nodes[seed]['id'],
+            'depth': depth,
+            'direction': direction,
+            'types': sorted(type_filter) if type_filter else None,
+            'degree': index.degree(seed, direction),
+            'hops': ego['hops'],
+            'truncated': ego['truncated'],
+            'graph': {'nodes': ego['nodes'], 'edges': ego['edges']},
+        }
+
+    try:
+        return graph_encoding.graph_response(request, await run_in_threadpool(run))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+def _store_index(key: str, build: Callable[[Any], Any], with_edges: bool = False) -> Any:
+    """Index `key` du store, construit par `build(nœuds)` (ou `build(graphe)` avec `with_edges`)
+    et gardé jusqu'au prochain changement du store."""
+    with _store_indexes_lock:
+        cached = _store_indexes.get(key)
+        if cached is None or cached[0] != store.version:
+            if with_edges:
+                # version lue avant le graphe : un changement concurrent provoque au pire une reconstruction de plus
+                version = store.version
+                source = store.graph()
+            else:
+                version, source = store.nodes()
+            cached = _store_indexes[key] = (version, build(source))
+        return cached[1]
+
+
+@app.get("/search")
+async def search_nodes(q: str, limit: int = 20, offset: int = 0, label: Optional[str] = None,
+                       graph_id: Optional[str] = None):
+    """Recherche de nœuds par préfixe / mot de leur id, nom, label, ip ou autre propriété textuelle
+    (voir search_index), dans le graphe fusionné ou dans un graphe chargé (`graph_id`).
+    Résultats classés par pertinence et paginés (`limit` 1 à 100, `offset`) ; `truncated` : mot trop
+    courant, seuls les meilleurs candidats ont été classés."""
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="Paramètre 'limit' invalide (1 à 100)")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Paramètre 'offset' invalide (>= 0)")
+    if graph_id is not None:
+        _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        started = time.perf_counter()
+        if graph_id is not None:
+            index = registry.derived(graph_id, 'search', lambda graph: search_index.SearchIndex(graph.get('nodes') or []))
+        else:
+            index = _store_index('search', search_index.SearchIndex)
+        searched = time.perf_counter()
+        total, truncated, page = index.search(q, limit, offset, label)
+        return {
+            'q': q,
+            'source': graph_id or 'store',
+            'total': total,
+            'truncated': truncated,
+            'offset': offset,
+            'limit': limit,
+            'results': [index.describe(i, score, q) for i, score in page],
+            'elapsed_ms': round((time.perf_counter() - searched) * 1000, 3),
+            'index_ms': round((searched - started) * 1000, 3),
+        }
+
+    try:
+        return await run_in_threadpool(run)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+MAX_IP_LOOKUP = int(os.environ.get("MAX_IP_LOOKUP", "100000"))
+
+
+def _ip_index(graph_id: Optional[str]) -> ip_index.IPIndex:
+    """Index des réseaux du graphe `graph_id` (gardé dans le registre) ou du store ; KeyError si le graphe a expiré."""
+    if graph_id is not None:
+        return registry.derived(graph_id, 'ip', lambda graph: ip_index.IPIndex(graph.get('nodes') or []))
+    return _store_index('ip', ip_index.IPIndex)
+
+
+@app.get("/ip/lookup")
+async def lookup_ip(ip: str, graph_id: Optional[str] = None):
+    """Subnets, IPRanges et SSLranges qui contiennent une adresse (voir ip_index), du plus au moins
+    spécifique, dans le graphe fusionné ou dans un graphe chargé (`graph_id`) ; les autres nœuds qui
+    portent cette adresse (Devices, ...) sont listés à part dans `hosts`"""
+    if graph_id is not None:
+        _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        index = _ip_index(graph_id)
+        try:
+            return {'source': graph_id or 'store', **index.lookup(ip)}
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Adresse IP invalide: {ip}")
+
+    try:
+        return await run_in_threadpool(run)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+class IPLookupRequest(BaseModel):
+    ips: List[str]
+    graph_id: Optional[str] = None
+
+
+@app.post("/ip/lookup")
+async def lookup_ips(req: IPLookupRequest):
+    """Recherche en lot (triage d'IOC) : pour chaque adresse, le réseau le plus spécifique qui la contient
+    et tous ceux qui la contiennent ; les adresses invalides sont listées à part"""
+    if len(req.ips) > MAX_IP_LOOKUP:
+        raise HTTPException(status_code=413, detail=f"Trop d'adresses ({len(req.ips)} > {MAX_IP_LOOKUP})")
+    if req.graph_id is not None:
+        _registered_graph(req.graph_id)
+
+    def run() -> Dict[str, Any]:
+        started = time.perf_counter()
+        index = _ip_index(req.graph_id)
+        indexed = time.perf_counter()
+        result = index.lookup_many(req.ips)
+        return {
+            'source': req.graph_id or 'store',
+            'count': len(req.ips),
+            **result,
+            'elapsed_ms': round((time.perf_counter() - indexed) * 1000, 3),
+            'index_ms': round((indexed - started) * 1000, 3),
+        }
+
+    try:
+        return await run_in_threadpool(run)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+def _risk_scores(graph_id: Optional[str]) -> risk_scoring.RiskScores:
+    """Scores d'exposition du graphe `graph_id` (gardés dans le registre) ou du store ; KeyError si le graphe a expiré."""
+    if graph_id is not None:
+        return registry.derived(graph_id, 'risk', risk_scoring.RiskScores)
+    return _store_index('risk', risk_scoring.RiskScores, with_edges=True)
+
+
+def _require_risk_scoring() -> None:
+    if not risk_scoring.available():
+        raise HTTPException(status_code=500, detail="numpy et scipy requis pour le score d'exposition mais ne sont pas installés")
+
+
+@app.get("/risk/ranking")
+async def get_risk_ranking(graph_id: Optional[str] = None, label: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """Nœuds classés par score d'exposition (voir risk_scoring : distance à Internet via EXPOSES / MAPPED_TO,
+    criticality_level, fan-in des policies), sur le graphe fusionné ou un graphe chargé (`graph_id`)"""
+    _require_risk_scoring()
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="Paramètre 'limit' invalide (1 à 1000)")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Paramètre 'offset' invalide (>= 0)")
+    if graph_id is not None:
+        _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        scores = _risk_scores(graph_id)
+        return {'source': graph_id or 'store', 'offset': offset, 'limit': limit,
+                **scores.ranking(limit, offset, label), 'stats': scores.stats()}
+
+    try:
+        return await run_in_threadpool(run)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+@app.get("/graphs/{graph_id}/risk")
+async def get_graph_risk(graph_id: str, request: Request, format: str = "default"):
+    """Graphe chargé dont chaque nœud porte les propriétés `exposure_score` (0 à 100) et `exposure_hops`"""
+    _require_risk_scoring()
+    _check_graph_format(format)
+    graph = _registered_graph(graph_id)
+
+    def run() -> Dict[str, Any]:
+        scores = _risk_scores(graph_id)
+        result = {'graph_id': graph_id, 'stats': scores.stats(),
+                  'graph': {'nodes': scores.annotate(), 'edges': graph.get('edges') or []}}
+        return _format_graph_result(result, format)
+
+    try:
+        return graph_encoding.graph_response(request, await run_in_threadpool(run))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Graphe inconnu ou expiré: rechargez-le (use case ou analyse)")
+
+
+@app.get("/store/stats")
+async def get_store_stats():
+    """Taille du graphe fusionné (voir graph_store) et taux de déduplication des éléments reçus"""
+    return {"enabled": GRAPH_STORE_ENABLED, **store.stats()}
+
+
+@app.get("/store/sources")
+async def get_store_sources():
+    """Analyses et use cases fusionnés dans le store, avec leur nombre d'éléments"""
+    return {"sources": await run_in_threadpool(store.sources)}
+
+
+@app.get("/store/graph")
+async def get_store_graph(request: Request, source: Optional[str] = None, label: Optional[str] = None,
+                          limit: Optional[int] = None, format: str = "default"):
+    """Graphe fusionné, éventuellement restreint à une source (`analysis:<question>`, `use_case:<id>`)
+    et/ou aux nœuds d'un label, avec les relations entre les nœuds retenus"""
+    _check_graph_format(format)
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Paramètre 'limit' invalide (>= 1)")
+    graph = await run_in_threadpool(store.graph, source, label, limit)
+    if graph is None:
+        raise HTTPException(status_code=404, detail=f"Source inconnue: {source}")
+    return graph_encoding.graph_response(request, _format_graph_result({'source': source, 'label': label, 'graph': graph}, format))
+
+
+@app.get("/store/nodes/{node_id:path}")
+async def get_store_node(node_id: str):
+    """Un nœud du graphe fusionné, les sources qui l'ont référencé et ses relations connues"""
+    node = store.node(node_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Nœud '{node_id}' absent du store")
+    return node
+
+
+@app.delete("/store")
+async def clear_store():
+    """Vide le graphe fusionné"""
+    return {"cleared": store.clear()}
+
+
+def _require_graph_db() -> Any:
+    conn = _graph_db()
+    if conn is None:
+        raise HTTPException(status_code=404, detail="Base de graphes absente ou désactivée (POST /db/ingest pour la créer)")
+    return conn
+
+
+def _split_param(value: Optional[str]) -> Optional[List[str]]:
+    return [v.strip() for v in value.replace('|', ',').split(',') if v.strip()] if value else None
+
+
+@app.get("/db/stats")
+async def get_db_stats():
+    """Taille de la base SQLite des instantanés (voir graph_db)"""
+    def run() -> Dict[str, Any]:
+        conn = _graph_db()
+        return {"enabled": GRAPH_DB_ENABLED, "path": str(graph_db.DB_PATH),
+                **(graph_db.stats(conn) if conn is not None else {"snapshots": 0})}
+    return await run_in_threadpool(run)
+
+
+@app.get("/db/snapshots")
+async def list_db_snapshots():
+    """Instantanés ingérés dans la base, du plus récent au plus ancien"""
+    return {"snapshots": await run_in_threadpool(lambda: graph_db.list_snapshots(_require_graph_db()))}
+
+
+@app.get("/db/snapshots/{name}/graph")
+async def get_db_snapshot_graph(name: str, request: Request, labels: Optional[str] = None, types: Optional[str] = None,
+                                limit: Optional[int] = None, format: str = "default"):
+    """Graphe d'un instantané lu dans la base, sans parser le fichier : restreint aux nœuds de certains
+    labels (`labels`), aux relations de certains types (`types`), aux `limit` premiers nœuds"""
+    _check_graph_format(format)
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Paramètre 'limit' invalide (>= 1)")
+    label_list, type_list = _split_param(labels), _split_param(types)
+    graph = await run_in_threadpool(lambda: graph_db.load_graph(_require_graph_db(), name, label_list, type_list, limit))
+    if graph is None:
+        raise HTTPException(status_code=404, detail=f"Instantané absent de la base: {name}")
+    result = {'snapshot': name, 'labels': label_list, 'types': type_list, 'graph': graph}
+    return graph_encoding.graph_response(request, _format_graph_result(result, format))
+
+
+@app.get("/db/nodes/{node_id:path}")
+async def get_db_node(node_id: str, snapshot: Optional[str] = None):
+    """Un nœud et ses relations, dans `snapshot` ou dans l'instantané le plus récent qui le contient"""
+    node = await run_in_threadpool(lambda: graph_db.node_relationships(_require_graph_db(), node_id, snapshot))
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Nœud '{node_id}' absent de la base")
+    return node
+
+
+class DbIngestRequest(BaseModel):
+    names: Optional[List[str]] = None
+    force: bool = False
+
+
+@app.post("/db/ingest")
+async def ingest_db_snapshots(req: Optional[DbIngestRequest] = None):
+    """Ingère des fichiers de data/ dans la base (`names`, par défaut tous les .json) ; les fichiers
+    déjà ingérés dans leur état actuel sont ignorés sauf `force`"""
+    if not GRAPH_DB_ENABLED:
+        raise HTTPException(status_code=404, detail="Base de graphes désactivée (GRAPH_DB=0)")
+    req = req or DbIngestRequest()
+    if req.names is not None:
+        paths = [_snapshot_path(name) for name in req.names]
+    else:
+        paths = sorted(p for p in DATA_DIR.glob("*.json") if p.resolve() != USE_CASES_PATH.resolve())
+
+    def run() -> Dict[str, Any]:
+        conn = _graph_db(create=True)
+        ingested, skipped, failed = [], [], []
+        for path in paths:
+            if not req.force and graph_db.snapshot_for_file(conn, path) is not None:
+                skipped.append(path.name)
+                continue
+            try:
+                ingested.append(graph_db.ingest_file(conn, path))
+            except (OSError, ValueError) as e:
+                failed.append({'name': path.name, 'error': str(e)})
+        return {'ingested': ingested, 'skipped': skipped, 'failed': failed}
+
+    return await run_in_threadpool(run)
+
+
+class LayoutRequest(BaseModel):
+    graph: Dict[str, Any]
+    iterations: Optional[int] = Field(None, ge=1, le=1000)
+    edge_length: float = Field(graph_layout.DEFAULT_EDGE_LENGTH, gt=0)
+
+
+@app.post("/layout")
+async def compute_layout(req: LayoutRequest):
+    """Calcule la disposition d'un graphe (format normalisé ou colonnes), mise en cache par topologie"""
+    if not graph_layout.available():
+        raise HTTPException(status_code=500, detail="numpy requis pour le calcul de disposition mais n'est pas installé")
+    try:
+        return await run_in_threadpool(graph_layout.layout_for, req.graph, req.iterations, req.edge_length)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Graphe invalide: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+"""
+Cache mémoire borné (TTL + LRU) pour les résultats normalisés d'analyse.
+
+La taille d'une entrée est estimée une seule fois, à l'insertion, d'après sa sérialisation
+JSON compacte : les longues listes (nœuds, arêtes) sont estimées sur un échantillon de
+SAMPLE_SIZE éléments, de sorte que l'estimation ne parcourt pas tout le graphe. Quand la taille
+totale dépasse `max_bytes`, les entrées les moins récemment utilisées sont évincées.
+Utilisable depuis le threadpool : accès sous verrou.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SAMPLE_SIZE = 32
+
+
+def estimate_size(value: Any) -> int:
+    """Taille approximative (en octets) de la sérialisation JSON compacte d'une valeur."""
+    if isinstance(value, dict):
+        return 2 + sum(len(str(k)) + 4 + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        n = len(value)
+        if n <= SAMPLE_SIZE:
+            return 2 + sum(estimate_size(v) + 1 for v in value)
+        step = n / SAMPLE_SIZE
+        sampled = sum(estimate_size(value[int(i * step)]) + 1 for i in range(SAMPLE_SIZE))
+        return 2 + sampled * n // SAMPLE_SIZE
+    if isinstance(value, str):
+        return len(value) + 2
+    if value is None or isinstance(value, bool):
+        return 5
+    return len(repr(value))
+
+
+class ResultCache:
+    """Cache clé → valeur avec expiration (TTL), limite en octets et éviction LRU."""
+
+    def __init__(self, ttl: float = 900.0, max_bytes: int = 256 * 1024 * 1024, max_entries: Optional[int] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # key -> (value, size, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Retourne (valeur, âge en secondes) ou None si absente/expirée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            age = time.monotonic() - stored_at
+            if self.ttl and age > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, age
+
+    def set(self, key: str, value: Any, size: Optional[int] = None) -> bool:
+        """Insère une valeur. Retourne False si elle est trop grosse pour le cache."""
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            if size > self.max_bytes:
+                self.rejected += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            self._evict()
+            return True
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return count
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            self._bytes > self.max_bytes
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,145 @@
+"""
+Score d'exposition (0 à 100) de chaque nœud d'un graphe normalisé, calculé en une passe
+vectorisée (tableaux NumPy, matrices creuses SciPy) au lieu d'une question upstream par nœud.
+
+Trois composantes, chacune ramenée entre 0 et 1 :
+  - exposition : distance en sauts depuis un nœud `Internet` le long des relations EXPOSES /
+    MAPPED_TO (dans leur sens), HOP_DECAY ** distance, 0 si le nœud n'est pas atteint en
+    MAX_HOPS sauts ; le parcours est un BFS par produits matrice creuse × frontière ;
+  - criticité : `criticality_level` numérique rapporté au maximum du graphe, UNKNOWN_CRITICALITY
+    quand il est absent ou non numérique (`NoInfo`) ;
+  - fan-in : nombre de couples (Policy, source) qui atteignent le nœud, Σ sur les policies
+    p -[:HAS_TARGET]-> nœud du nombre de p -[:HAS_SOURCE]-> source, en échelle log.
+
+score = 100 × moyenne des composantes pondérée par WEIGHTS.
+Nécessite les paquets optionnels `numpy` et `scipy`.
+"""
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    from scipy import sparse
+except Exception:
+    np = None
+    sparse = None
+
+SOURCE_LABELS = ("Internet",)
+EXPOSURE_TYPES = ("EXPOSES", "MAPPED_TO")
+MAX_HOPS = int(os.environ.get("RISK_MAX_HOPS", "6"))
+HOP_DECAY = 0.5
+UNKNOWN_CRITICALITY = 0.5
+WEIGHTS = {'exposure': 0.5, 'criticality': 0.3, 'fan_in': 0.2}
+
+
+def available() -> bool:
+    return np is not None and sparse is not None
+
+
+def _numeric(value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+class RiskScores:
+    """Scores et composantes par nœud, alignés sur l'ordre de `graph['nodes']`."""
+
+    def __init__(self, graph: Dict[str, Any]):
+        started = time.perf_counter()
+        self.nodes: List[Dict[str, Any]] = graph.get('nodes') or []
+        edges = graph.get('edges') or []
+        n = len(self.nodes)
+        index = {node['id']: i for i, node in enumerate(self.nodes)}
+        type_ids: Dict[str, int] = {}
+        src = np.fromiter((index.get(e['from'], -1) for e in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((index.get(e['to'], -1) for e in edges), dtype=np.int64, count=len(edges))
+        types = np.fromiter((type_ids.setdefault(e['label'], len(type_ids)) for e in edges), dtype=np.int64, count=len(edges))
+        valid = (src >= 0) & (dst >= 0)
+
+        def adjacency(names: Sequence[str]) -> Any:
+            ids = [type_ids[name] for name in names if name in type_ids]
+            mask = valid & np.isin(types, ids)
+            return sparse.csr_matrix((np.ones(int(mask.sum()), dtype=np.float32), (src[mask], dst[mask])), shape=(n, n))
+
+        # exposition : BFS depuis les nœuds Internet, une multiplication creuse par saut
+        self.hops = np.full(n, -1, dtype=np.int32)
+        frontier = np.fromiter((any(label in SOURCE_LABELS for label in node['labels']) for node in self.nodes),
+                               dtype=bool, count=n)
+        self.hops[frontier] = 0
+        incoming = adjacency(EXPOSURE_TYPES).T.tocsr()
+        for hop in range(1, MAX_HOPS + 1):
+            if not frontier.any():
+                break
+            reached = incoming.dot(frontier.astype(np.float32)) > 0
+            frontier = reached & (self.hops < 0)
+            self.hops[frontier] = hop
+        self.exposure = np.where(self.hops >= 0, HOP_DECAY ** np.maximum(self.hops, 0), 0.0)
+
+        # criticité numérique, rapportée au maximum observé
+        level = np.fromiter((_numeric(node['properties'].get('criticality_level')) for node in self.nodes),
+                            dtype=np.float64, count=n)
+        known = ~np.isnan(level)
+        top = level[known].max() if known.any() else 0.0
+        self.criticality = np.full(n, UNKNOWN_CRITICALITY)
+        if top > 0:
+            self.criticality[known] = np.clip(level[known] / top, 0.0, 1.0)
+
+        # fan-in : couples (policy, source) qui ciblent chaque nœud
+        sources_per_policy = np.asarray(adjacency(("HAS_SOURCE",)).sum(axis=1)).ravel()
+        self.fan_in = adjacency(("HAS_TARGET",)).T.dot(sources_per_policy)
+        peak = self.fan_in.max() if n else 0.0
+        fan_in = np.log1p(self.fan_in) / math.log1p(peak) if peak > 0 else np.zeros(n)
+
+        total = sum(WEIGHTS.values())
+        self.score = 100.0 * (WEIGHTS['exposure'] * self.exposure + WEIGHTS['criticality'] * self.criticality
+                              + WEIGHTS['fan_in'] * fan_in) / total
+        self.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _describe(self, i: int) -> Dict[str, Any]:
+        node = self.nodes[i]
+        props = node['properties']
+        return {
+            'id': node['id'],
+            'name': props.get('name') or props.get('label') or node['id'],
+            'labels': node['labels'],
+            'score': round(float(self.score[i]), 2),
+            'hops_from_internet': int(self.hops[i]) if self.hops[i] >= 0 else None,
+            'criticality': round(float(self.criticality[i]), 3),
+            'fan_in': int(self.fan_in[i]),
+        }
+
+    def ranking(self, limit: int = 50, offset: int = 0, label: Optional[str] = None) -> Dict[str, Any]:
+        """Nœuds par score décroissant (les `Internet` eux-mêmes exclus), paginés."""
+        candidates = np.flatnonzero(self.hops != 0)
+        if label is not None:
+            candidates = candidates[np.fromiter((label in self.nodes[i]['labels'] for i in candidates),
+                                                dtype=bool, count=len(candidates))]
+        order = candidates[np.argsort(-self.score[candidates], kind='stable')]
+        return {'total': len(order), 'results': [self._describe(int(i)) for i in order[offset:offset + limit]]}
+
+    def annotate(self) -> List[Dict[str, Any]]:
+        """Copies des nœuds avec les propriétés `exposure_score` et `exposure_hops` (à colorer côté frontend)."""
+        annotated = []
+        for i, node in enumerate(self.nodes):
+            properties = dict(node['properties'])
+            properties['exposure_score'] = round(float(self.score[i]), 2)
+            properties['exposure_hops'] = int(self.hops[i]) if self.hops[i] >= 0 else None
+            annotated.append({**node, 'properties': properties})
+        return annotated
+
+    def stats(self) -> Dict[str, Any]:
+        # mêmes candidats que ranking() : les nœuds Internet eux-mêmes ne sont pas classés
+        ranked = self.score[self.hops != 0]
+        return {
+            'nodes': len(self.nodes),
+            'exposed': int((self.hops > 0).sum()),
+            'sources': int((self.hops == 0).sum()),
+            'max_score': round(float(ranked.max()), 2) if len(ranked) else None,
+            'weights': WEIGHTS,
+            'elapsed_ms': self.elapsed_ms,
+        }
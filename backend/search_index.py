@@ -0,0 +1,224 @@
+"""
+Recherche de nœuds par préfixe, mot ou propriété (autocomplétion).
+
+Chaque valeur textuelle indexée produit des termes en minuscules : la valeur entière
+(`w1clictxxa2301.aepc.com`, `172.18.93.0`), ses mots alphanumériques (`w1clictxxa2301`, `aepc`)
+et les morceaux de ses mots en CamelCase (`VwLogibecDCR01` → `vw`, `logibec`, `dcr`, `01`).
+
+  - index inversé : terme -> postings compacts (`array`, nœud << 2 | poids du champ) ;
+  - index de préfixes : liste triée des termes, parcourue par `bisect` à partir du préfixe.
+
+Une requête est découpée en mots ; chaque mot doit correspondre (ET) à un terme identique ou
+commençant par lui, la requête entière à une valeur entière donne un bonus. Le nombre de
+termes développés par préfixe est borné et les mots peu sélectifs sont vérifiés sur les seuls
+candidats du mot le plus sélectif : la latence dépend du nombre de nœuds qui correspondent,
+pas de la taille du graphe.
+"""
+import bisect
+import heapq
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# poids par champ (sur 2 bits) : identifiants et noms, adresses, autres propriétés textuelles
+PRIMARY_FIELDS = ("id", "name", "label")
+ADDRESS_FIELDS = ("ip", "device_ip_address", "mask")
+PRIMARY, ADDRESS, OTHER = 3, 2, 1
+# les valeurs plus longues (listes sérialisées, descriptions...) ne sont pas indexées
+MAX_VALUE_LENGTH = 128
+# termes développés au plus par mot de la requête
+MAX_PREFIX_TERMS = 512
+# nœuds candidats lus au plus pour le mot le plus sélectif (au-delà, le résultat est tronqué)
+MAX_CANDIDATES = 2000
+# au-delà de VERIFY_RATIO postings par candidat, un mot est vérifié sur les candidats plutôt que lu dans l'index
+VERIFY_RATIO = 8
+
+_WORDS = re.compile(r"[0-9a-z]+")
+_CAMEL_WORDS = re.compile(r"[A-Za-z0-9]*[a-z][A-Z][A-Za-z0-9]*")
+_CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def words(value: str) -> List[str]:
+    """Mots alphanumériques en minuscules (découpage d'une requête)."""
+    return list(dict.fromkeys(_WORDS.findall(value.lower())))
+
+
+def tokenize(value: str) -> List[str]:
+    """Termes indexés d'une valeur : ses mots, plus les morceaux des mots en CamelCase."""
+    terms = dict.fromkeys(_WORDS.findall(value.lower()))
+    for word in _CAMEL_WORDS.findall(value):
+        terms.update(dict.fromkeys(p.lower() for p in _CAMEL.findall(word)))
+    return list(terms)
+
+
+def _field_weight(key: str) -> int:
+    if key in PRIMARY_FIELDS:
+        return PRIMARY
+    return ADDRESS if key in ADDRESS_FIELDS else OTHER
+
+
+def _indexed_values(node: Dict[str, Any]) -> Iterable[Tuple[str, str, int]]:
+    """(champ, valeur, poids) des valeurs textuelles indexées d'un nœud."""
+    yield 'id', node['id'], PRIMARY
+    for key, value in node['properties'].items():
+        if isinstance(value, str) and 0 < len(value) <= MAX_VALUE_LENGTH:
+            yield key, value, _field_weight(key)
+        elif key in PRIMARY_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield key, str(value), PRIMARY
+
+
+def _value_terms(value: str) -> List[str]:
+    """Termes d'une valeur : ses mots et morceaux CamelCase, puis la valeur entière."""
+    terms = tokenize(value)
+    full = value.lower()
+    if full not in terms:
+        terms.append(full)
+    return terms
+
+
+class SearchIndex:
+    """Index inversé et de préfixes des nœuds d'un graphe normalisé."""
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes = nodes
+        postings: Dict[str, List[int]] = {}
+        # termes de chaque nœud, précédés du poids de leur champ (chr(1..3)) : vérification d'un mot
+        # sur un nœud par recherche de sous-chaîne
+        self._texts: List[str] = []
+        for i, node in enumerate(nodes):
+            weights: Dict[str, int] = {}
+            for _, value, weight in _indexed_values(node):
+                for term in _value_terms(value):
+                    if weights.get(term, 0) < weight:
+                        weights[term] = weight
+            for term, weight in weights.items():
+                hits = postings.get(term)
+                if hits is None:
+                    hits = postings[term] = []
+                hits.append(i << 2 | weight)
+            self._texts.append(''.join(chr(w) + t for t, w in weights.items()) + '\x00')
+        self.terms: List[str] = sorted(postings)
+        self.postings: Dict[str, array] = {term: array('q', hits) for term, hits in postings.items()}
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        found = []
+        for term in self.terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            found.append(term)
+        return found
+
+    def _term_scores(self, token: str, terms: List[str], limit: Optional[int] = None) -> Dict[int, float]:
+        """nœud -> score du mot : poids × 2 pour un terme identique, poids × |mot| / |terme| pour un préfixe.
+        Avec `limit`, les termes sont lus du plus proche au plus long et la lecture s'arrête à `limit` nœuds."""
+        scores: Dict[int, float] = {}
+        if limit is not None:
+            terms = sorted(terms, key=len)
+        for term in terms:
+            factor = 2.0 if term == token else len(token) / len(term)
+            hits = self.postings[term]
+            if limit is not None:
+                hits = hits[:limit - len(scores)]
+            for packed in hits:
+                i, score = packed >> 2, (packed & 3) * factor
+                if scores.get(i, 0.0) < score:
+                    scores[i] = score
+            if limit is not None and len(scores) >= limit:
+                break
+        return scores
+
+    def _node_score(self, i: int, token: str) -> float:
+        """Même score que `_term_scores`, calculé sur les termes d'un seul nœud."""
+        text = self._texts[i]
+        best = 0.0
+        pos = text.find(token)
+        while pos >= 0:
+            if '\x01' <= text[pos - 1] <= '\x03':
+                end = pos + len(token)
+                while text[end] > '\x03':
+                    end += 1
+                score = ord(text[pos - 1]) * (2.0 if end == pos + len(token) else len(token) / (end - pos))
+                if score > best:
+                    best = score
+            pos = text.find(token, pos + 1)
+        return best
+
+    def _narrow(self, scores: Dict[int, float], token: str, terms: List[str], size: int,
+                required: bool = True, scale: float = 1.0) -> Dict[int, float]:
+        """Ajoute le score de `token` (× `scale`) aux candidats (et retire ceux qu'il ne couvre pas si `required`).
+        Quand ses postings sont bien plus nombreux que les candidats, chaque candidat est vérifié directement."""
+        if size > VERIFY_RATIO * len(scores):
+            extra = {i: self._node_score(i, token) for i in scores}
+        else:
+            extra = self._term_scores(token, terms)
+        if required:
+            return {i: s + extra[i] * scale for i, s in scores.items() if extra.get(i)}
+        return {i: s + extra.get(i, 0.0) * scale for i, s in scores.items()}
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               label: Optional[str] = None) -> Tuple[int, bool, List[Tuple[int, float]]]:
+        """(nombre de nœuds trouvés, recherche tronquée, [(index du nœud, score)] de la page), par score décroissant.
+
+        Le mot le plus sélectif est cherché dans l'index (au plus MAX_CANDIDATES nœuds, les termes
+        les plus proches d'abord), les autres restreignent ses résultats."""
+        tokens = words(query)
+        if not tokens:
+            return 0, False, []
+        expanded = []
+        for token in tokens:
+            terms = self._expand(token)
+            expanded.append((sum(len(self.postings[t]) for t in terms), token, terms))
+        expanded.sort(key=lambda item: item[0])
+        size, first, terms = expanded[0]
+        truncated = size > MAX_CANDIDATES or len(terms) >= MAX_PREFIX_TERMS
+        scores = self._term_scores(first, terms, MAX_CANDIDATES)
+        whole = query.strip().lower()
+        if len(tokens) > 1 and truncated:
+            # les valeurs qui commencent par la requête entière (`10.12.3` → 10.12.3.4) sont candidates d'office
+            for i in self._term_scores(whole, self._expand(whole), MAX_CANDIDATES):
+                if i not in scores:
+                    scores[i] = self._node_score(i, first)
+        for size, token, terms in expanded[1:]:
+            if not scores:
+                return 0, truncated, []
+            scores = self._narrow(scores, token, terms, size)
+        if scores and (len(tokens) > 1 or whole != tokens[0]):
+            terms = self._expand(whole)
+            # bonus de la requête entière, à la mesure du nombre de mots qu'elle couvre
+            scores = self._narrow(scores, whole, terms, sum(len(self.postings[t]) for t in terms),
+                                  required=False, scale=len(tokens))
+        if label is not None:
+            scores = {i: s for i, s in scores.items() if label in self.nodes[i]['labels']}
+        nodes = self.nodes
+        page = heapq.nlargest(offset + limit, scores.items(),
+                              key=lambda item: (item[1], -len(nodes[item[0]]['id'])))
+        return len(scores), truncated, page[offset:]
+
+    def describe(self, i: int, score: float, query: str) -> Dict[str, Any]:
+        """Résultat affichable : nœud (sans ses propriétés) et champ qui correspond le mieux."""
+        node = self.nodes[i]
+        tokens = words(query)
+        best = None
+        for key, value, weight in _indexed_values(node):
+            lowered = value.lower()
+            matched = sum(1 for t in tokens if t in lowered)
+            rank = (matched, lowered.startswith(tokens[0]) if tokens else False, weight)
+            if best is None or rank > best[0]:
+                best = (rank, key, value)
+        properties = node['properties']
+        return {
+            'id': node['id'],
+            'name': properties.get('name') or properties.get('label') or node['id'],
+            'labels': node['labels'],
+            'score': round(score, 3),
+            'field': best[1] if best else None,
+            'value': best[2] if best else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'nodes': len(self.nodes),
+            'terms': len(self.terms),
+            'postings': sum(len(p) for p in self.postings.values()),
+        }
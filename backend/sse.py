@@ -0,0 +1,49 @@
+"""
+Server-Sent Events (text/event-stream) : mise en forme des événements et réponse streamée.
+
+Chaque événement est envoyé sous la forme
+    id: <n>
+    event: <nom>
+    data: <json sur une ligne>
+suivi d'une ligne vide. Le client (EventSource ou lecteur fetch) les reçoit au fil de l'eau.
+"""
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+from starlette.responses import StreamingResponse
+
+from graph_encoding import json_default
+
+EVENT_STREAM = "text/event-stream"
+
+# Intervalle (secondes) des événements d'attente : gardent la connexion active à travers les
+# proxys (qui coupent souvent une connexion silencieuse après 30 à 60 s)
+HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", "10"))
+# Délai de reconnexion suggéré au client (ms)
+RETRY_MS = 5000
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default)
+    # json.dumps n'émet pas de saut de ligne brut, une seule ligne `data:` suffit
+    lines.append(f"data: {payload}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def sse_response(events: AsyncIterator[bytes], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    headers = dict(headers or {})
+    headers.setdefault("Cache-Control", "no-cache")
+    # pas de mise en tampon par un reverse proxy (nginx)
+    headers["X-Accel-Buffering"] = "no"
+
+    async def stream() -> AsyncIterator[bytes]:
+        yield f"retry: {RETRY_MS}\n\n".encode("ascii")
+        async for chunk in events:
+            yield chunk
+
+    return StreamingResponse(stream(), media_type=EVENT_STREAM, headers=headers)
@@ -0,0 +1,457 @@
+"""
+Client HTTP partagé vers l'API upstream et utilitaires d'appel (déduplication des requêtes en vol,
+limitation de la concurrence, disjoncteur, requêtes doublées).
+
+Un seul `httpx.AsyncClient` est créé par worker (au démarrage de l'application) et
+réutilisé par tous les endpoints proxy, ce qui permet de garder les connexions
+keep-alive ouvertes au lieu de refaire un handshake TCP/TLS à chaque requête.
+
+Configuration par variables d'environnement :
+  UPSTREAM_MAX_CONNECTIONS    nombre maximal de connexions simultanées (défaut 100)
+  UPSTREAM_MAX_KEEPALIVE      connexions keep-alive conservées dans le pool (défaut 20)
+  UPSTREAM_KEEPALIVE_EXPIRY   durée de vie d'une connexion inactive en secondes (défaut 30)
+  UPSTREAM_HTTP2              "1" pour activer HTTP/2 (nécessite le paquet `h2`)
+  UPSTREAM_CONNECT_TIMEOUT    timeout d'établissement de connexion en secondes (défaut 5)
+  UPSTREAM_TIMEOUT_<ENDPOINT> timeout de lecture par endpoint (MOCK, ANALYZE, LAST_QUERY, DATA)
+  UPSTREAM_MAX_CONCURRENCY    appels upstream simultanés au-delà desquels on attend (défaut 8, 0 = illimité)
+  UPSTREAM_MAX_WAITING        appels en attente d'une place au-delà desquels on refuse (défaut 32)
+  UPSTREAM_WAIT_TIMEOUT       attente maximale d'une place en secondes (défaut 30)
+  UPSTREAM_RETRY_AFTER        valeur de Retry-After renvoyée quand l'upstream est saturé (défaut 5)
+  UPSTREAM_BREAKER_FAILURES   échecs consécutifs qui ouvrent le disjoncteur (défaut 5, 0 = désactivé)
+  UPSTREAM_BREAKER_RESET      durée d'ouverture du disjoncteur avant un appel de test, en secondes (défaut 30)
+  UPSTREAM_HEDGE              "1" pour doubler les appels courts idempotents trop lents (défaut désactivé)
+  UPSTREAM_HEDGE_PERCENTILE   percentile de latence au-delà duquel l'appel est doublé (défaut 95)
+  UPSTREAM_HEDGE_MIN_SAMPLES  mesures de latence nécessaires avant de doubler (défaut 20)
+"""
+import os
+import json
+import math
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+# optional http client for upstream API
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (requis par httpx pour HTTP/2)
+    _h2_available = True
+except Exception:
+    _h2_available = False
+
+logger = logging.getLogger("poc_graphvizualiser.upstream")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning("%s invalide, utilisation de la valeur par défaut %s", name, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        logger.warning("%s invalide, utilisation de la valeur par défaut %s", name, default)
+        return default
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+MAX_CONNECTIONS = _env_int("UPSTREAM_MAX_CONNECTIONS", 100)
+MAX_KEEPALIVE_CONNECTIONS = _env_int("UPSTREAM_MAX_KEEPALIVE", 20)
+KEEPALIVE_EXPIRY = _env_float("UPSTREAM_KEEPALIVE_EXPIRY", 30.0)
+HTTP2 = _env_flag("UPSTREAM_HTTP2")
+CONNECT_TIMEOUT = _env_float("UPSTREAM_CONNECT_TIMEOUT", 5.0)
+
+# Timeouts de lecture par endpoint (mêmes valeurs qu'avant la mutualisation du client)
+ENDPOINT_TIMEOUTS: Dict[str, float] = {
+    "mock": _env_float("UPSTREAM_TIMEOUT_MOCK", 20.0),
+    "analyze": _env_float("UPSTREAM_TIMEOUT_ANALYZE", 30.0),
+    "last_query": _env_float("UPSTREAM_TIMEOUT_LAST_QUERY", 30.0),
+    "data": _env_float("UPSTREAM_TIMEOUT_DATA", 20.0),
+}
+
+
+# Limitation de la concurrence vers l'upstream (voir ConcurrencyLimiter)
+MAX_CONCURRENCY = _env_int("UPSTREAM_MAX_CONCURRENCY", 8)
+MAX_WAITING = _env_int("UPSTREAM_MAX_WAITING", 32)
+WAIT_TIMEOUT = _env_float("UPSTREAM_WAIT_TIMEOUT", 30.0)
+RETRY_AFTER = _env_int("UPSTREAM_RETRY_AFTER", 5)
+
+# Disjoncteur (voir CircuitBreaker) et requêtes doublées (voir Hedger)
+BREAKER_FAILURES = _env_int("UPSTREAM_BREAKER_FAILURES", 5)
+BREAKER_RESET = _env_float("UPSTREAM_BREAKER_RESET", 30.0)
+HEDGE = _env_flag("UPSTREAM_HEDGE")
+HEDGE_PERCENTILE = _env_float("UPSTREAM_HEDGE_PERCENTILE", 95.0)
+HEDGE_MIN_SAMPLES = _env_int("UPSTREAM_HEDGE_MIN_SAMPLES", 20)
+
+
+def endpoint_timeout(endpoint: str) -> "httpx.Timeout":
+    """Timeout httpx à utiliser pour un endpoint donné (lecture/écriture par endpoint, connexion commune)."""
+    read = ENDPOINT_TIMEOUTS.get(endpoint, 30.0)
+    return httpx.Timeout(read, connect=CONNECT_TIMEOUT)
+
+
+def build_client() -> Optional["httpx.AsyncClient"]:
+    """Construit le client partagé. Retourne None si httpx n'est pas installé."""
+    if httpx is None:
+        return None
+
+    http2 = HTTP2
+    if http2 and not _h2_available:
+        logger.warning("UPSTREAM_HTTP2 demandé mais le paquet 'h2' n'est pas installé: HTTP/1.1 utilisé")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2,
+        timeout=httpx.Timeout(ENDPOINT_TIMEOUTS["analyze"], connect=CONNECT_TIMEOUT),
+    )
+
+
+def pool_config() -> Dict[str, object]:
+    """Configuration effective du pool, pour diagnostic."""
+    return {
+        "max_connections": MAX_CONNECTIONS,
+        "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": KEEPALIVE_EXPIRY,
+        "http2": HTTP2 and _h2_available,
+        "connect_timeout": CONNECT_TIMEOUT,
+        "timeouts": dict(ENDPOINT_TIMEOUTS),
+    }
+
+
+def request_key(url: str, payload: Any, variant: str = "") -> str:
+    """Clé stable d'une requête upstream : URL + payload normalisé (ordre des clés, espaces de la question).
+
+    `variant` distingue les traitements locaux d'une même requête qui produisent des résultats différents.
+    """
+    if isinstance(payload, dict):
+        normalized = dict(payload)
+        question = normalized.get("question")
+        if isinstance(question, str):
+            normalized["question"] = " ".join(question.split())
+    else:
+        normalized = payload
+    body = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{url}\n{variant}\n{body}".encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Déduplication des appels concurrents identiques.
+
+    Tant qu'un appel est en vol pour une clé, les appelants suivants attendent son
+    résultat (ou son exception) au lieu de relancer l'appel. L'appel partagé est protégé
+    par `asyncio.shield` : la déconnexion d'un client n'annule pas l'appel des autres.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # marque l'exception comme récupérée même si tous les appelants ont abandonné
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
+
+
+class UpstreamBusy(Exception):
+    """Plus de place pour un appel upstream : file d'attente pleine ou attente trop longue."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Borne le nombre d'appels upstream simultanés, avec une file d'attente bornée.
+
+    Au-delà de `max_concurrency` appels en cours, les suivants attendent une place (dans l'ordre
+    d'arrivée) ; au-delà de `max_waiting` appels en attente, ou après `wait_timeout` secondes
+    d'attente, `acquire` lève UpstreamBusy au lieu d'empiler des requêtes vouées au timeout.
+    `max_concurrency <= 0` désactive la limite (les compteurs restent tenus).
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_waiting: int = MAX_WAITING,
+                 wait_timeout: float = WAIT_TIMEOUT, retry_after: int = RETRY_AFTER):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self, wait: bool = True) -> None:
+        """Prend une place. Avec `wait=False`, lève UpstreamBusy au lieu d'attendre si aucune n'est libre."""
+        if self.max_concurrency > 0:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if not self._semaphore.locked() and not self.waiting:
+                # place libre : acquise sans suspension
+                await self._semaphore.acquire()
+            elif not wait:
+                raise UpstreamBusy("Aucune place libre vers l'upstream", self.retry_after)
+            else:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise UpstreamBusy(
+                        f"Upstream saturé ({self.in_flight} appels en cours, {self.waiting} en attente)", self.retry_after)
+                self.queued += 1
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout if self.wait_timeout > 0 else None)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    raise UpstreamBusy(f"Pas de place libre vers l'upstream après {self.wait_timeout:g} s", self.retry_after)
+                finally:
+                    self.waiting -= 1
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._semaphore is not None and self.max_concurrency > 0:
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting,
+            "wait_timeout": self.wait_timeout,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(UpstreamBusy):
+    """Disjoncteur ouvert : l'upstream est considéré en panne, l'appel n'est pas tenté."""
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Échec imputable à l'upstream (connexion, timeout, réponse 5xx) ; les 4xx n'en sont pas."""
+    if httpx is None:
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """Disjoncteur devant l'upstream.
+
+    closed    : les appels passent ; `failure_threshold` échecs consécutifs ouvrent le disjoncteur.
+    open      : les appels échouent immédiatement (CircuitOpen) pendant `reset_timeout` secondes.
+    half_open : un seul appel de test passe ; son succès referme le disjoncteur, son échec le rouvre.
+    `failure_threshold <= 0` désactive le disjoncteur.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.opened = 0
+        self.short_circuited = 0
+
+    def before_call(self) -> None:
+        """À appeler avant chaque appel upstream ; lève CircuitOpen si l'appel ne doit pas être tenté."""
+        if self.failure_threshold <= 0 or self.state == CLOSED:
+            return
+        if self.state == OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.short_circuited += 1
+                raise CircuitOpen(f"Upstream indisponible (disjoncteur ouvert après {self.failures} échecs)",
+                                  max(1, math.ceil(remaining)))
+            self.state = HALF_OPEN
+        if self._probing:
+            self.short_circuited += 1
+            raise CircuitOpen("Upstream indisponible (appel de test en cours)", max(1, math.ceil(self.reset_timeout)))
+        self._probing = True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.failure_threshold > 0 and (self.state == HALF_OPEN or self.failures >= self.failure_threshold):
+            if self.state != OPEN:
+                self.opened += 1
+                logger.warning("Disjoncteur upstream ouvert après %s échecs consécutifs", self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_abort(self) -> None:
+        """Appel abandonné sans réponse exploitable (annulé, refusé localement) : ne compte ni comme succès
+        ni comme échec, mais libère l'appel de test éventuel."""
+        self._probing = False
+
+    def reset(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN and self.opened_at is not None:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return {
+            "state": self.state if self.failure_threshold > 0 else "disabled",
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in": retry_in,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class LatencyTracker:
+    """Latences (secondes) des derniers appels réussis, sur une fenêtre glissante."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(math.ceil(p / 100.0 * len(ordered))) - 1)] if p > 0 else ordered[0]
+
+
+class Hedger:
+    """Requêtes doublées (« hedged requests ») pour les appels courts et idempotents.
+
+    Si l'appel n'a pas répondu après le percentile `percentile` des latences récentes de l'endpoint,
+    une seconde copie est lancée et la première réponse réussie est gardée (l'autre est annulée).
+    Rien n'est doublé tant que `min_samples` latences n'ont pas été mesurées. La copie reçoit
+    `secondary=True` : à l'appelant de ne la lancer que si une place est libre immédiatement.
+    """
+
+    def __init__(self, enabled: bool = HEDGE, percentile: float = HEDGE_PERCENTILE, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self, endpoint: str) -> Optional[float]:
+        """Délai avant de doubler un appel à `endpoint`, None si l'endpoint ne doit pas (encore) l'être."""
+        tracker = self._latencies.get(endpoint)
+        if not self.enabled or tracker is None or len(tracker) < self.min_samples:
+            return None
+        return tracker.percentile(self.percentile)
+
+    async def _timed(self, endpoint: str, call: Callable[[bool], Awaitable[Any]], secondary: bool) -> Any:
+        started = time.monotonic()
+        result = await call(secondary)
+        self._latencies.setdefault(endpoint, LatencyTracker()).record(time.monotonic() - started)
+        return result
+
+    async def run(self, endpoint: str, call: Callable[[bool], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        delay = self.delay(endpoint)
+        primary = asyncio.ensure_future(self._timed(endpoint, call, False))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            self.hedged += 1
+            secondary = asyncio.ensure_future(self._timed(endpoint, call, True))
+            tasks.append(secondary)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    # l'erreur de l'appel principal prime sur celle de la copie (souvent un simple refus local)
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "min_samples": self.min_samples,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "delays": {endpoint: self.delay(endpoint) for endpoint in self._latencies},
+        }
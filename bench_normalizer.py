@@ -0,0 +1,117 @@
+"""
+Benchmark de la normalisation des graphes (backend/graph_normalizer.py)
+
+Génère des graphes synthétiques au format upstream (nodes/relationships) et mesure le débit
+de normalisation, comparé à l'ancienne boucle recopiée dans les endpoints.
+
+Usage:
+    python bench_normalizer.py                       # 10k, 100k et 1M éléments
+    python bench_normalizer.py --sizes 10000 --repeat 5 --prune
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import graph_normalizer
+
+LABELS = [["Device"], ["Subnet"], ["Policy"], ["IPRange"], ["VIP"], ["Device", "Server"]]
+REL_TYPES = ["HAS_SOURCE", "HAS_TARGET", "BELONGS_TO", "MEMBER_OF", "EXPOSES", "MAPPED_TO"]
+
+
+def generate_graph(elements: int, seed: int = 42):
+    """Graphe synthétique de `elements` éléments : moitié nœuds, moitié relations."""
+    rnd = random.Random(seed)
+    node_count = max(1, elements // 2)
+    rel_count = elements - node_count
+    prefix = "4:c21033e0-e210-4cfb-91fa-92e87910b655:"
+    nodes = [
+        {
+            "id": f"{prefix}{i}",
+            "labels": LABELS[i % len(LABELS)],
+            "properties": {"id": f"dev-{i}", "name": f"device-{i}", "ip": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "version": 1},
+        }
+        for i in range(node_count)
+    ]
+    relationships = [
+        {
+            "id": f"5:c21033e0:{i}",
+            "type": REL_TYPES[i % len(REL_TYPES)],
+            "start_id": f"{prefix}{rnd.randrange(node_count)}",
+            "end_id": f"{prefix}{rnd.randrange(node_count)}",
+            "properties": {},
+        }
+        for i in range(rel_count)
+    ]
+    return nodes, relationships
+
+
+def legacy_normalize(nodes_data, relationships_data):
+    """Ancienne implémentation (recopiée dans upstream_analyze et get_use_case_data), pour comparaison."""
+    nodes = []
+    edges = []
+    for n in nodes_data:
+        if not isinstance(n, dict):
+            continue
+        nid = str(n.get('id')) if n.get('id') is not None else (n.get('properties', {}).get('id') if isinstance(n.get('properties', {}), dict) else None)
+        nid = str(nid) if nid is not None else (n.get('label') or f'node_{len(nodes)}')
+        labels = n.get('labels') if isinstance(n.get('labels'), list) else []
+        props = n.get('properties', {}) if isinstance(n.get('properties'), dict) else {}
+        label = ', '.join(labels) if labels else (props.get('name') or nid)
+        nodes.append({'id': nid, 'label': label, 'labels': labels, 'properties': props})
+    for r in relationships_data:
+        if not isinstance(r, dict):
+            continue
+        source = r.get('start_id') or r.get('from') or r.get('start')
+        target = r.get('end_id') or r.get('to') or r.get('end')
+        reltype = r.get('type') or r.get('relationship_type') or ''
+        edges.append({
+            'from': str(source) if source is not None else None,
+            'to': str(target) if target is not None else None,
+            'label': reltype,
+            'properties': r.get('properties', {})
+        })
+    return {'nodes': nodes, 'edges': edges}
+
+
+def measure(fn, repeat: int) -> float:
+    """Meilleur temps (secondes) sur `repeat` exécutions, GC désactivé pendant la mesure."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--prune", action="store_true", help="active l'élagage des arêtes pendantes")
+    parser.add_argument("--no-legacy", action="store_true", help="ne mesure pas l'ancienne implémentation")
+    args = parser.parse_args()
+
+    print(f"{'éléments':>10} {'nodes':>9} {'impl':>8} {'temps (s)':>10} {'nodes/s':>12} {'éléments/s':>12}")
+    for size in args.sizes:
+        nodes, relationships = generate_graph(size)
+        runs = [("engine", lambda: graph_normalizer.normalize_graph(nodes, relationships, prune_dangling=args.prune))]
+        if not args.no_legacy:
+            runs.append(("legacy", lambda: legacy_normalize(nodes, relationships)))
+        for name, fn in runs:
+            elapsed = measure(fn, args.repeat)
+            print(f"{size:>10} {len(nodes):>9} {name:>8} {elapsed:>10.3f} {len(nodes) / elapsed:>12,.0f} {size / elapsed:>12,.0f}")
+        del nodes, relationships
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,16 @@
 Script pour récupérer les données depuis Neo4j et générer les fichiers JSON pour les use cases
 """
 import json
+import os
+import sys
+from pathlib import Path
 from neo4j import GraphDatabase
 from datetime import datetime
 from typing import Dict, List, Any
 
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+import graph_db
+
 # === CONFIGURATION NEO4J - À REMPLIR ===
 NEO4J_URI = "bolt://localhost:7687"  # ou neo4j://localhost:7687
 NEO4J_USER = "neo4j"
@@ -173,6 +179,7 @@ class Neo4jDataFetcher:
             # Sauvegarder
             with open(use_case['output_file'], 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            ingest_output(use_case, data)
             
             print(f"✅ Success!")
             print(f"   - Records: {record_count}")
@@ -201,10 +208,25 @@ class Neo4jDataFetcher:
             
             with open(use_case['output_file'], 'w', encoding='utf-8') as f:
                 json.dump(error_data, f, indent=2, ensure_ascii=False)
+            ingest_output(use_case, error_data)
             
             return False
 
 
+def ingest_output(use_case: Dict, data: Dict) -> None:
+    """Enregistre le fichier écrit dans la base SQLite des instantanés (data/graph.db).
+    Un échec n'empêche pas l'écriture du JSON : POST /db/ingest permet de rattraper."""
+    path = Path(use_case['output_file'])
+    try:
+        conn = graph_db.connect()
+        try:
+            graph_db.ingest_document(conn, path.name, data, source=f"neo4j:{use_case['id']}", file_stat=os.stat(path))
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️  Ingestion SQLite impossible ({path.name}): {e}")
+
+
 def main():
     print("="*60)
     print("Neo4j Data Fetcher for POC Graph Visualizer")
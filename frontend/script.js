@@ -55,6 +55,14 @@ let nodeGroup = null;
 let linkElements = null;
 let nodeElements = null;
 let currentAnalysisData = null;
+// Graphe affiché (nœuds/liens D3) et bloc `summary` de la réponse quand le graphe est résumé
+let currentGraph = null;
+let currentSummary = null;
+// graph_id du graphe complet chargé (chemins, voisinage, ... calculés côté serveur)
+let currentGraphId = null;
+// Version (graph_id) du graphe affiché tel que servi par le backend; null si l'affichage en diffère
+// (résumé, nœuds développés, ...). Envoyée en since_version pour ne recevoir qu'un patch
+let currentGraphVersion = null;
 
 // Initialisation au chargement de la page
 document.addEventListener('DOMContentLoaded', () => {
@@ -184,10 +192,301 @@ function displayNodeDetails(nodeData) {
         }
         html += `</ul>`;
     }
+
+    // Super-nœud d'un graphe résumé: proposer le drill-down
+    if (nodeData.properties && nodeData.properties.summary && currentSummary) {
+        html += `<button onclick="expandSuperNode('${nodeData.id}')" class="btn btn-info btn-sm">Développer (${nodeData.properties.count} nœuds)</button>`;
+    } else if (currentGraphId && !currentSummary) {
+        html += `<button onclick="expandNeighbors('${nodeData.id}')" class="btn btn-info btn-sm">Voisins</button>`;
+    }
     
     if (detailsDiv) detailsDiv.innerHTML = html;
 }
 
+// Affichage progressif demandé (endpoints NDJSON, graphe complet)
+function isProgressive() {
+    const el = document.getElementById('progressiveCheckbox');
+    return !!(el && el.checked);
+}
+
+// Lit une réponse NDJSON au fil de l'eau: onRecord est appelé pour chaque ligne dès qu'elle est complète
+async function readNdjson(response, onRecord) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onRecord(JSON.parse(line));
+        }
+    }
+    buffer += decoder.decode();
+    if (buffer.trim()) onRecord(JSON.parse(buffer));
+}
+
+// Lit un flux Server-Sent Events (text/event-stream) reçu via fetch (EventSource ne permet pas de POST):
+// onEvent(nom, données JSON) est appelé pour chaque événement complet; les commentaires sont ignorés
+async function readSse(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    const dispatch = block => {
+        let event = 'message';
+        const data = [];
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+        });
+        if (data.length) onEvent(event, JSON.parse(data.join('\n')));
+    };
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+        let end;
+        while ((end = buffer.indexOf('\n\n')) >= 0) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            dispatch(block);
+        }
+    }
+    if (buffer.trim()) dispatch(buffer);
+}
+
+// Intervalle minimal (ms) entre deux rendus du graphe partiel pendant la réception NDJSON
+const PROGRESSIVE_RENDER_INTERVAL = 300;
+
+// Affiche une réponse NDJSON (en-tête, lots de nœuds puis d'arêtes): l'analyse dès l'en-tête,
+// le graphe partiel re-rendu au fil des lots. Retourne l'en-tête
+async function displayNdjsonGraph(response) {
+    const nodes = [];
+    const edges = [];
+    const ids = new Set();
+    let header = null;
+    let lastRender = 0;
+    const draw = () => {
+        renderGraph({ nodes, edges });
+        lastRender = performance.now();
+    };
+
+    currentSummary = null;
+    await readNdjson(response, record => {
+        if (record.type === 'header') {
+            header = record;
+            currentGraphId = record.graph_id || null;
+            currentGraphVersion = null;
+            if (record.analysis) displayAnalysisDetails(record.analysis);
+        } else if (record.type === 'nodes') {
+            record.items.forEach(n => {
+                n.color = getNodeColor(n);
+                ids.add(String(n.id));
+                nodes.push(n);
+            });
+            if (performance.now() - lastRender > PROGRESSIVE_RENDER_INTERVAL) draw();
+        } else if (record.type === 'edges') {
+            // une arête dont une extrémité n'est pas un nœud du graphe ne peut pas être dessinée
+            record.items.forEach(e => {
+                if (ids.has(String(e.from)) && ids.has(String(e.to))) edges.push(e);
+            });
+            if (performance.now() - lastRender > PROGRESSIVE_RENDER_INTERVAL) draw();
+        } else if (record.type === 'end') {
+            draw();
+            currentGraphVersion = currentGraphId;
+        }
+    });
+    return header;
+}
+
+// Paramètres de requête communs aux endpoints qui renvoient un graphe
+function graphQueryParams() {
+    const summaryEl = document.getElementById('summarySelect');
+    const summary = summaryEl ? summaryEl.value : '';
+    let params = 'format=columnar&layout=true' + (summary ? `&summary=${encodeURIComponent(summary)}` : '');
+    if (currentGraphVersion && !summary) params += `&since_version=${encodeURIComponent(currentGraphVersion)}`;
+    return params;
+}
+
+// Affiche la réponse d'un endpoint de graphe: patch depuis la version affichée, ou graphe complet
+function displayGraphResult(analysis, data) {
+    currentSummary = data.summary || null;
+    currentGraphId = data.graph_id || null;
+    if (data.patch) {
+        displayAnalysisDetails(analysis);
+        applyGraphPatch(data.patch);
+    } else {
+        displayAnalysis(analysis, data.graph, data.layout);
+    }
+    currentGraphVersion = currentSummary ? null : currentGraphId;
+}
+
+// Applique au graphe affiché un patch du backend (nœuds et arêtes ajoutés, retirés, modifiés):
+// les éléments inchangés gardent leur position et leur élément SVG (voir renderGraph)
+function applyGraphPatch(patch) {
+    if (!currentGraph) return;
+    const removedNodes = new Set(patch.nodes.removed.map(String));
+    const changedNodes = new Map(patch.nodes.changed.map(c => [String(c.id), c.node]));
+    const nodes = [];
+    currentGraph.nodes.forEach(n => {
+        if (removedNodes.has(n.id)) return;
+        const changed = changedNodes.get(n.id);
+        if (changed) {
+            nodes.push({ id: n.id, label: changed.label, labels: changed.labels, properties: changed.properties, color: getNodeColor(changed), x: n.x, y: n.y });
+        } else {
+            nodes.push({ id: n.id, label: n.label, labels: n.labels, properties: n.properties, color: n.color, x: n.x, y: n.y });
+        }
+    });
+    patch.nodes.added.forEach(n => nodes.push({ id: String(n.id), label: n.label, labels: n.labels, properties: n.properties }));
+    const present = new Set(nodes.map(n => n.id));
+
+    // une arête retirée est retrouvée par son id ; sans id (ou id inconnu de l'affichage), elle enlève
+    // une occurrence de (origine, type, destination)
+    const linkIds = new Set(currentGraph.links.map(l => String(l.id)));
+    const removedIds = new Set();
+    const removedEdges = new Map();
+    patch.edges.removed.forEach(e => {
+        if (e.id != null && linkIds.has(String(e.id))) {
+            removedIds.add(String(e.id));
+            return;
+        }
+        const key = `${e.from}|${e.label}|${e.to}`;
+        removedEdges.set(key, (removedEdges.get(key) || 0) + 1);
+    });
+    const edges = [];
+    currentGraph.links.forEach(l => {
+        if (removedIds.has(String(l.id))) return;
+        const key = `${l.source.id}|${l.label}|${l.target.id}`;
+        const pending = removedEdges.get(key);
+        if (pending) {
+            removedEdges.set(key, pending - 1);
+            return;
+        }
+        edges.push({ id: l.id, from: l.source.id, to: l.target.id, label: l.label });
+    });
+    patch.edges.added.forEach(e => edges.push({ id: e.id, from: String(e.from), to: String(e.to), label: e.label }));
+
+    renderGraph({ nodes, edges: edges.filter(e => present.has(e.from) && present.has(e.to)) });
+    const s = patch.summary;
+    showMessage(s.identical ? 'Graphe inchangé'
+        : `Graphe mis à jour: +${s.nodes_added} / -${s.nodes_removed} nœuds, ${s.nodes_changed} modifiés`, 'success');
+}
+
+// Remplace un super-nœud par ses membres (GET /graphs/{graph_id}/expand/{group_id})
+async function expandSuperNode(groupId) {
+    if (!currentSummary || !currentGraph) return;
+    try {
+        const resp = await fetch(`${API_URL}/graphs/${currentSummary.graph_id}/expand/${encodeURIComponent(groupId)}`);
+        if (!resp.ok) {
+            const err = await resp.json().catch(() => ({}));
+            throw new Error(err.detail || `HTTP ${resp.status}`);
+        }
+        const data = await resp.json();
+
+        // les nœuds déjà affichés gardent leur position, les membres apparaissent à la place du super-nœud
+        const group = currentGraph.nodes.find(n => n.id === groupId);
+        const nodes = currentGraph.nodes
+            .filter(n => n.id !== groupId)
+            .map(n => ({ id: n.id, label: n.label, labels: n.labels, properties: n.properties, color: n.color, x: n.x, y: n.y }));
+        const present = new Set(nodes.map(n => n.id));
+        data.nodes.forEach(n => {
+            nodes.push({ id: String(n.id), label: n.label, labels: n.labels, properties: n.properties, x: group && group.x, y: group && group.y });
+            present.add(String(n.id));
+        });
+
+        const edges = currentGraph.links
+            .filter(l => l.source.id !== groupId && l.target.id !== groupId)
+            .map(l => ({ from: l.source.id, to: l.target.id, label: l.label }));
+        // extrémité réelle si elle est affichée, sinon son représentant dans le résumé (autre super-nœud)
+        const added = new Set();
+        data.edges.forEach(e => {
+            const from = present.has(e.from) ? e.from : e.from_group;
+            const to = present.has(e.to) ? e.to : e.to_group;
+            const key = `${from}|${to}|${e.label}`;
+            if (!present.has(from) || !present.has(to) || added.has(key)) return;
+            added.add(key);
+            edges.push({ from, to, label: e.label });
+        });
+
+        renderGraph({ nodes, edges });
+        currentGraphVersion = null;
+        showMessage(`${data.nodes.length} nœuds développés`, 'success');
+    } catch (e) {
+        showMessage('Erreur: ' + e.message, 'error');
+    }
+}
+
+// Ajoute au graphe affiché le voisinage d'un nœud (GET /graphs/{graph_id}/neighbors/{node_id})
+async function expandNeighbors(nodeId) {
+    if (!currentGraphId || !currentGraph) return;
+    try {
+        const resp = await fetch(`${API_URL}/graphs/${currentGraphId}/neighbors/${encodeURIComponent(nodeId)}?depth=1`);
+        if (!resp.ok) {
+            const err = await resp.json().catch(() => ({}));
+            throw new Error(err.detail || `HTTP ${resp.status}`);
+        }
+        const data = await resp.json();
+
+        // les nœuds déjà affichés gardent leur position, les nouveaux apparaissent autour du nœud cliqué
+        const origin = currentGraph.nodes.find(n => n.id === nodeId);
+        const nodes = currentGraph.nodes
+            .map(n => ({ id: n.id, label: n.label, labels: n.labels, properties: n.properties, color: n.color, x: n.x, y: n.y }));
+        const present = new Set(nodes.map(n => n.id));
+        let added = 0;
+        data.graph.nodes.forEach(n => {
+            if (present.has(String(n.id))) return;
+            nodes.push({ id: String(n.id), label: n.label, labels: n.labels, properties: n.properties, x: origin && origin.x, y: origin && origin.y });
+            present.add(String(n.id));
+            added++;
+        });
+
+        const edges = currentGraph.links.map(l => ({ from: l.source.id, to: l.target.id, label: l.label }));
+        const keys = new Set(edges.map(e => `${e.from}|${e.to}|${e.label}`));
+        data.graph.edges.forEach(e => {
+            const key = `${e.from}|${e.to}|${e.label}`;
+            if (keys.has(key)) return;
+            keys.add(key);
+            edges.push({ from: e.from, to: e.to, label: e.label });
+        });
+
+        renderGraph({ nodes, edges });
+        if (added) currentGraphVersion = null;
+        showMessage(added ? `${added} voisins ajoutés` : 'Tous les voisins sont déjà affichés', 'success');
+    } catch (e) {
+        showMessage('Erreur: ' + e.message, 'error');
+    }
+}
+
+// Colore les nœuds affichés selon leur score d'exposition (GET /graphs/{graph_id}/risk)
+async function colorByRisk() {
+    if (!currentGraphId || !currentGraph || currentSummary) {
+        showMessage('Chargez un graphe complet (use case ou analyse) pour le colorer par risque', 'error');
+        return;
+    }
+    try {
+        const resp = await fetch(`${API_URL}/graphs/${currentGraphId}/risk`);
+        if (!resp.ok) {
+            const err = await resp.json().catch(() => ({}));
+            throw new Error(err.detail || `HTTP ${resp.status}`);
+        }
+        const data = await resp.json();
+        const scored = new Map(data.graph.nodes.map(n => [String(n.id), n.properties]));
+        currentGraph.nodes.forEach(n => {
+            const props = scored.get(n.id);
+            if (!props) return;
+            n.properties = { ...n.properties, exposure_score: props.exposure_score, exposure_hops: props.exposure_hops };
+            n.color = getNodeColor(n);
+        });
+        nodeElements.select('rect').attr('fill', d => d.color);
+        showMessage(`Score d'exposition: ${data.stats.exposed} nœuds exposés, max ${data.stats.max_score}`, 'success');
+    } catch (e) {
+        showMessage('Erreur: ' + e.message, 'error');
+    }
+}
+
 // La gestion des fichiers locaux a été retirée : la frontend n'interroge plus /files
 
 // La charge d'analyses par fichier local a été supprimée.
@@ -284,8 +583,8 @@ function displayTechnicalAnalysis(data) {
     }
 }
 
-// Fonction centralisée pour afficher une analyse et son graphe
-function displayAnalysis(analysis, graph) {
+// Affiche les informations d'une analyse (statut, résumé, recommandations, JSON), sans le graphe
+function displayAnalysisDetails(analysis) {
     // Mettre à jour les données courantes
     currentAnalysisData = analysis;
     
@@ -298,9 +597,18 @@ function displayAnalysis(analysis, graph) {
     // Afficher le JSON
     const jsonDisplayEl = document.getElementById('jsonDisplay');
     if (jsonDisplayEl) jsonDisplayEl.textContent = JSON.stringify(analysis, null, 2);
+}
+
+// Fonction centralisée pour afficher une analyse et son graphe
+function displayAnalysis(analysis, graph, layout = null) {
+    displayAnalysisDetails(analysis);
     
     // Afficher le graphe si disponible
-    if (graph && Array.isArray(graph.nodes) && Array.isArray(graph.edges)) {
+    if (isColumnarGraph(graph)) {
+        // Format colonnes: consommé directement par renderGraph, sans copie ni pré-traitement
+        renderGraph(graph, layout);
+        showMessage('Graphe rendu', 'success');
+    } else if (graph && Array.isArray(graph.nodes) && Array.isArray(graph.edges)) {
         const graphData = JSON.parse(JSON.stringify(graph));
         graphData.nodes.forEach(node => {
             node.color = getNodeColor(node);
@@ -309,7 +617,7 @@ function displayAnalysis(analysis, graph) {
             }
             node.id = String(node.id);
         });
-        renderGraph(graphData);
+        renderGraph(graphData, layout);
         showMessage('Graphe rendu', 'success');
     } else if (analysis && analysis.data && analysis.data.nodes && analysis.data.relationships) {
         // Fallback: si analysis contient un champ 'data' avec nodes/relationships
@@ -343,7 +651,9 @@ async function analyzeQuestion() {
 
     try {
         // Request include_data=true so the upstream (proxied by backend) will include the normalized graph in the response
-        const response = await fetch(`${API_URL}/upstream/analyze`, {
+        const progressive = isProgressive();
+        const url = progressive ? `${API_URL}/upstream/analyze/ndjson` : `${API_URL}/upstream/analyze/events?${graphQueryParams()}`;
+        const response = await fetch(url, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ question: question, include_data: true })
@@ -367,58 +677,32 @@ async function analyzeQuestion() {
             throw new Error(`HTTP ${response.status} ${response.statusText}: ${bodyMsg}`);
         }
 
-        let result = null;
-        try {
-            result = await response.json();
-        } catch (e) {
-            // Unexpected non-JSON success response
-            throw new Error(`Invalid JSON from upstream (HTTP ${response.status}): ${e.message}`);
-        }
-
-    // Normalise la réponse pour l'affichage. Backend returns { analysis, graph, graph_present, data_included }
-    const analysis = result.analysis || result.data || result;
-        currentAnalysisData = analysis;
-
-        updateStatusBar(analysis);
-        displaySummary(analysis);
-        displayRecommendations(analysis);
-        displayTechnicalAnalysis(analysis);
-    const jsonDisplayEl = document.getElementById('jsonDisplay');
-    if (jsonDisplayEl) jsonDisplayEl.textContent = JSON.stringify(analysis, null, 2);
-
-        // If the backend returned a graph (built from data.nodes/relationships), render it
-        if (result && result.graph && Array.isArray(result.graph.nodes) && Array.isArray(result.graph.edges)) {
-            const graphData = JSON.parse(JSON.stringify(result.graph));
-            graphData.nodes.forEach(node => {
-                node.color = getNodeColor(node);
-                if (node.id === undefined || node.id === null) node.id = node.label || Math.random().toString(36).slice(2,9);
-                node.id = String(node.id);
-            });
-            renderGraph(graphData);
-            showMessage('Graphe rendu', 'success');
-        } else if (analysis && analysis.data && analysis.data.nodes && analysis.data.relationships) {
-            // Fallback: if analysis contains a `data` field with nodes/relationships, convert to graph
-            const dat = analysis.data;
-            const nodes = (dat.nodes || []).map(n => ({
-                id: String(n.id ?? (n.properties && n.properties.id) ?? n.label ?? Math.random().toString(36).slice(2,9)),
-                label: n.labels ? (n.labels.join(', ') || String(n.id)) : (n.label || String(n.id)),
-                labels: n.labels || [],
-                properties: n.properties || {}
-            }));
-            const edges = (dat.relationships || []).map((r, i) => ({
-                id: r.id ?? `e${i}`,
-                from: String(r.start_id ?? r.from ?? r.start ?? ''),
-                to: String(r.end_id ?? r.to ?? r.end ?? ''),
-                label: r.type || r.relationship_type || ''
-            }));
-
-            const graphData = { nodes, edges };
-            graphData.nodes.forEach(node => node.color = getNodeColor(node));
-            renderGraph(graphData);
-            showMessage('Graphe rendu (from analysis.data)', 'success');
+        if (progressive) {
+            await displayNdjsonGraph(response);
+            showMessage('Analyse reçue', 'success');
+            return;
         }
 
-        showMessage('Analyse reçue', 'success');
+        // Progression en Server-Sent Events: résumé de l'analyse dès réception, graphe ensuite
+        let finished = false;
+        await readSse(response, (event, data) => {
+            if (event === 'waiting') {
+                const statusEl = document.getElementById('analysisStatus');
+                if (statusEl) statusEl.textContent = `⏳ upstream (${Math.round(data.elapsed)} s)`;
+            } else if (event === 'analysis') {
+                if (data.analysis) displayAnalysisDetails(data.analysis);
+                showMessage('Analyse reçue', 'success');
+            } else if (event === 'graph') {
+                // Backend returns { analysis, graph, graph_present, data_included } (+ layout, summary)
+                const analysis = data.analysis || data.data || data;
+                displayGraphResult(analysis, data);
+            } else if (event === 'error') {
+                throw new Error(`HTTP ${data.status}: ${data.detail}`);
+            } else if (event === 'done') {
+                finished = true;
+            }
+        });
+        if (!finished) throw new Error('Flux d\'événements interrompu avant la fin de l\'analyse');
     } catch (error) {
         showMessage('Erreur: ' + error.message, 'error');
         console.error(error);
@@ -428,6 +712,13 @@ async function analyzeQuestion() {
 // Retourne une couleur selon le type et la criticité du nœud
 function getNodeColor(node) {
     try {
+        // Score d'exposition calculé par le backend (GET /graphs/{graph_id}/risk), de vert (0) à rouge (100)
+        const exposure = node?.properties?.exposure_score;
+        if (typeof exposure === 'number') {
+            const ratio = Math.max(0, Math.min(1, exposure / 100));
+            return d3.interpolateRgb('#1dd1a1', '#ff6b6b')(ratio);
+        }
+
         // Priorité à la criticité si présente dans les propriétés
         const critRaw = node?.properties?.criticality;
         if (critRaw !== undefined && critRaw !== null) {
@@ -472,23 +763,112 @@ function getNodeColor(node) {
     }
 }
 
+// Vrai si le graphe est au format colonnes renvoyé par le backend (?format=columnar)
+function isColumnarGraph(graph) {
+    return !!(graph && graph.format === 'columnar' && graph.nodes && Array.isArray(graph.nodes.id));
+}
+
+// Construit les nœuds/liens D3 depuis un graphe en colonnes: les extrémités des arêtes sont des
+// index dans le tableau des nœuds, donc aucun lookup par id n'est nécessaire
+function columnarToD3(graphData) {
+    const cols = graphData.nodes;
+    const labelSets = graphData.label_sets || [];
+    const nodes = new Array(cols.id.length);
+    for (let i = 0; i < cols.id.length; i++) {
+        const id = String(cols.id[i]);
+        const labels = labelSets[cols.label_set[i]] || [];
+        const properties = cols.properties[i] || {};
+        const node = {
+            id,
+            label: labels.length ? labels.join(', ') : (properties.name || id),
+            labels,
+            properties
+        };
+        node.color = getNodeColor(node);
+        nodes[i] = node;
+    }
+
+    const edges = graphData.edges;
+    const types = graphData.types || [];
+    const edgeIds = edges.id || [];
+    const links = new Array(edges.source.length);
+    for (let i = 0; i < edges.source.length; i++) {
+        links[i] = {
+            id: edgeIds[i] != null ? String(edgeIds[i]) : `e${i}`,
+            source: nodes[edges.source[i]],
+            target: nodes[edges.target[i]],
+            label: types[edges.type[i]] || ''
+        };
+    }
+    return { nodes, links };
+}
+
+// Au-delà de ce nombre de nœuds, une disposition calculée par le backend est affichée telle quelle
+// (pas de simulation du tout); en dessous, la simulation ne fait qu'un court ajustement
+const LAYOUT_STATIC_THRESHOLD = 1500;
+
+// Place les nœuds aux coordonnées calculées par le backend (?layout=true), centrées dans la vue.
+// Retourne false si la disposition ne correspond pas au graphe (nombre de nœuds différent)
+function applyLayout(nodes, layout, width, height) {
+    if (!layout || !Array.isArray(layout.x) || layout.x.length !== nodes.length) return false;
+    for (let i = 0; i < nodes.length; i++) {
+        nodes[i].x = width / 2 + layout.x[i];
+        nodes[i].y = height / 2 + layout.y[i];
+    }
+    return true;
+}
+
 // Render graph with D3 (force-directed)
-function renderGraph(graphData) {
-    const nodes = graphData.nodes.map(n => ({
-        id: String(n.id),
-        label: n.label || String(n.id),
-        type: n.type,
-        labels: n.labels,
-        properties: n.properties,
-        color: n.color || getNodeColor(n)
-    }));
-
-    const links = graphData.edges.map((e, i) => ({
-        id: e.id ?? `e${i}`,
-        source: String(e.from ?? e.source),
-        target: String(e.to ?? e.target),
-        label: e.label
-    }));
+function renderGraph(graphData, layout = null) {
+    let nodes;
+    let links;
+    if (isColumnarGraph(graphData)) {
+        ({ nodes, links } = columnarToD3(graphData));
+    } else {
+        nodes = graphData.nodes.map(n => ({
+            id: String(n.id),
+            label: n.label || String(n.id),
+            type: n.type,
+            labels: n.labels,
+            properties: n.properties,
+            color: n.color || getNodeColor(n),
+            x: n.x,
+            y: n.y
+        }));
+
+        links = graphData.edges.map((e, i) => ({
+            id: e.id ?? `e${i}`,
+            source: String(e.from ?? e.source),
+            target: String(e.to ?? e.target),
+            label: e.label
+        }));
+    }
+
+    // les nœuds déjà affichés gardent leur position (mise à jour par patch, voisins ajoutés, ...)
+    const previous = new Map(currentGraph ? currentGraph.nodes.map(n => [n.id, n]) : []);
+    let kept = 0;
+    nodes.forEach(n => {
+        const old = previous.get(n.id);
+        if (!old) return;
+        kept++;
+        if (n.x === undefined || n.x === null) {
+            n.x = old.x;
+            n.y = old.y;
+        }
+    });
+
+    // clé stable d'un lien pour la jointure D3: (origine, type, destination) + rang parmi les liens parallèles
+    const occurrences = new Map();
+    links.forEach(l => {
+        const source = typeof l.source === 'object' ? l.source.id : l.source;
+        const target = typeof l.target === 'object' ? l.target.id : l.target;
+        const base = `${source}|${l.label}|${target}`;
+        const rank = occurrences.get(base) || 0;
+        occurrences.set(base, rank + 1);
+        l.key = `${base}#${rank}`;
+    });
+
+    currentGraph = { nodes, links };
 
     // stop previous simulation
     if (simulation) {
@@ -496,63 +876,57 @@ function renderGraph(graphData) {
         simulation = null;
     }
 
-    // clear previous elements
-    linkGroup.selectAll('*').remove();
-    nodeGroup.selectAll('*').remove();
-
-    // create links
+    // jointures par clé: seuls les éléments ajoutés ou retirés touchent au DOM
     linkElements = linkGroup.selectAll('line')
-        .data(links, d => d.id)
-        .enter()
-        .append('line')
-        .attr('stroke', '#95a5a6')
-        .attr('stroke-width', 2)
-        .attr('marker-end', 'url(#arrow)');
-
-    // create nodes as groups with rect + text
-    nodeElements = nodeGroup.selectAll('g')
+        .data(links, d => d.key)
+        .join(enter => enter.append('line')
+            .attr('stroke', '#95a5a6')
+            .attr('stroke-width', 2)
+            .attr('marker-end', 'url(#arrow)'));
+
+    // nodes as groups with rect + text
+    nodeElements = nodeGroup.selectAll('g.node')
         .data(nodes, d => d.id)
-        .enter()
-        .append('g')
-        .attr('class', 'node')
-        .call(d3.drag()
-            .on('start', (event, d) => {
-                if (!event.active) simulation.alphaTarget(0.3).restart();
-                d.fx = d.x;
-                d.fy = d.y;
-            })
-            .on('drag', (event, d) => {
-                d.fx = event.x;
-                d.fy = event.y;
-            })
-            .on('end', (event, d) => {
-                if (!event.active) simulation.alphaTarget(0);
-                d.fx = null;
-                d.fy = null;
-            })
-        )
-        .on('click', (event, d) => {
-            // affichage des détails
-            displayNodeDetails(d);
+        .join(enter => {
+            const g = enter.append('g')
+                .attr('class', 'node')
+                .call(d3.drag()
+                    .on('start', (event, d) => {
+                        if (!event.active) simulation.alphaTarget(0.3).restart();
+                        d.fx = d.x;
+                        d.fy = d.y;
+                    })
+                    .on('drag', (event, d) => {
+                        d.fx = event.x;
+                        d.fy = event.y;
+                    })
+                    .on('end', (event, d) => {
+                        if (!event.active) simulation.alphaTarget(0);
+                        d.fx = null;
+                        d.fy = null;
+                    })
+                )
+                .on('click', (event, d) => {
+                    // affichage des détails
+                    displayNodeDetails(d);
+                });
+            g.append('rect')
+                .attr('y', -14)
+                .attr('height', 28)
+                .attr('rx', 6)
+                .attr('ry', 6)
+                .attr('stroke', '#222');
+            g.append('text')
+                .attr('text-anchor', 'middle')
+                .attr('dy', '0.35em')
+                .attr('fill', '#ecf0f1')
+                .style('pointer-events', 'none');
+            return g;
         });
 
-    // append rect and text
-    nodeElements.append('rect')
-        .attr('x', -50)
-        .attr('y', -14)
-        .attr('width', 100)
-        .attr('height', 28)
-        .attr('rx', 6)
-        .attr('ry', 6)
-        .attr('fill', d => d.color)
-        .attr('stroke', '#222');
-
-    nodeElements.append('text')
-        .attr('text-anchor', 'middle')
-        .attr('dy', '0.35em')
-        .attr('fill', '#ecf0f1')
-        .style('pointer-events', 'none')
-        .text(d => d.label);
+    // select() propage la nouvelle donnée du groupe au rect et au texte
+    nodeElements.select('rect').attr('fill', d => d.color);
+    nodeElements.select('text').text(d => d.label);
 
     // adjust rect size to text width
     nodeElements.each(function(d) {
@@ -567,6 +941,7 @@ function renderGraph(graphData) {
     // simulation
     const width = svg.node().viewBox.baseVal.width || svg.node().clientWidth || 800;
     const height = svg.node().viewBox.baseVal.height || 600;
+    const preset = applyLayout(nodes, layout, width, height);
 
     simulation = d3.forceSimulation(nodes)
         .force('link', d3.forceLink(links).id(d => d.id).distance(140).strength(1))
@@ -587,6 +962,19 @@ function renderGraph(graphData) {
     simulation.nodes(nodes);
     simulation.force('link').links(links);
 
+    if (preset) {
+        // positions déjà calculées: court ajustement (collisions) ou aucun pour les gros graphes
+        if (nodes.length > LAYOUT_STATIC_THRESHOLD) {
+            simulation.stop();
+            simulation.on('tick')();
+        } else {
+            simulation.alpha(0.1).alphaDecay(0.1);
+        }
+    } else if (kept > nodes.length / 2) {
+        // graphe surtout inchangé: on place les nouveaux éléments sans tout redisposer
+        simulation.alpha(0.3);
+    }
+
     // fit view
     try {
         const all = svg.node();
@@ -736,11 +1124,25 @@ async function loadSelectedUseCase() {
             status.style.color = '#f39c12';
         }
         
-        const resp = await fetch(`${API_URL}/use-cases/${useCaseId}`);
+        const progressive = isProgressive();
+        const resp = await fetch(progressive
+            ? `${API_URL}/use-cases/${useCaseId}/ndjson`
+            : `${API_URL}/use-cases/${useCaseId}?${graphQueryParams()}`);
         if (!resp.ok) {
             const err = await resp.json().catch(() => ({}));
             throw new Error(err.detail || 'Erreur lors du chargement du use case');
         }
+
+        if (progressive) {
+            const header = await displayNdjsonGraph(resp);
+            const questionInput = document.getElementById('questionInput');
+            if (questionInput && header && header.use_case) questionInput.value = header.use_case.name;
+            if (status) {
+                status.textContent = '✓ Chargé';
+                status.style.color = '#27ae60';
+            }
+            return;
+        }
         
         const data = await resp.json();
         
@@ -753,7 +1155,7 @@ async function loadSelectedUseCase() {
         // Traiter les données comme une analyse normale
         if (data.analysis) {
             currentAnalysisData = data.analysis;
-            displayAnalysis(data.analysis, data.graph);
+            displayGraphResult(data.analysis, data);
             
             if (status) {
                 status.textContent = '✓ Chargé';
@@ -18,6 +18,9 @@ RETRY_DELAY = 5
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR.parent / "data"
 
+sys.path.insert(0, str(SCRIPT_DIR.parent / "backend"))
+import graph_db
+
 
 def check_backend_status():
     """Vérifie que le backend est accessible"""
@@ -163,6 +166,19 @@ def send_question(question, description="", max_retries=RETRY_ATTEMPTS):
     return None
 
 
+def ingest_response(filepath, data, use_case_id):
+    """Enregistre la réponse sauvegardée dans la base SQLite des instantanés (data/graph.db)"""
+    try:
+        conn = graph_db.connect()
+        try:
+            graph_db.ingest_document(conn, filepath.name, data, source=f"test:{use_case_id}", file_stat=filepath.stat())
+        finally:
+            conn.close()
+        print(f"  Ingérée dans {graph_db.DB_PATH.name}")
+    except Exception as e:
+        print(f"  ⚠ Ingestion SQLite impossible: {e}")
+
+
 def save_response(data, use_case_id, use_case_name):
     """
     Sauvegarde la réponse dans un fichier JSON
@@ -189,6 +205,7 @@ def save_response(data, use_case_id, use_case_name):
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"\n✓ Réponse sauvegardée: {filepath}")
+        ingest_response(filepath, data, use_case_id)
         
         # Afficher la taille du fichier
         file_size = filepath.stat().st_size
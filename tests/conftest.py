@@ -0,0 +1,5 @@
+"""Les modules du backend s'importent à plat (comme depuis main.py)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
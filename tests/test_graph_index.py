@@ -0,0 +1,49 @@
+from graph_index import CSRIndex, ego_graph, find_nodes
+
+
+def _graph(nodes, edges):
+    return {
+        'nodes': [{'id': n, 'label': n, 'labels': [], 'properties': {'name': n.upper()}} for n in nodes],
+        'edges': [{'from': u, 'to': v, 'label': t, 'properties': {}} for u, v, t in edges],
+    }
+
+
+def test_neighbors_by_direction_and_type():
+    graph = _graph("abcd", [("a", "b", "X"), ("a", "c", "Y"), ("c", "a", "X"), ("d", "a", "Y")])
+    index = CSRIndex(graph)
+    a = index.index['a']
+    assert sorted(index.neighbors(a, "out")) == [(1, 0), (2, 1)]
+    assert sorted(index.neighbors(a, "in")) == [(2, 2), (3, 3)]
+    assert sorted(index.neighbors(a, "both")) == [(1, 0), (2, 1), (2, 2), (3, 3)]
+    assert sorted(index.neighbors(a, "both", index.type_filter(["X"]))) == [(1, 0), (2, 2)]
+    assert index.degree(a) == 4 and index.degree(a, "out") == 2 and index.degree(index.index['b']) == 1
+
+
+def test_dangling_edges_are_kept_but_not_indexed():
+    index = CSRIndex(_graph("ab", [("a", "b", "X"), ("a", "z", "X")]))
+    assert index.stats()['edges'] == 2
+    assert index.stats()['indexed_edges'] == 1
+    assert list(index.neighbors(index.index['a'], "out")) == [(1, 0)]
+
+
+def test_type_filter_ignores_unknown_types():
+    index = CSRIndex(_graph("ab", [("a", "b", "X")]))
+    assert index.type_filter(None) is None
+    assert index.type_filter(["X", "NOPE"]) == frozenset({0})
+
+
+def test_find_nodes_by_id_then_property():
+    index = CSRIndex(_graph("ab", []))
+    assert find_nodes(index, "b") == [1]
+    assert find_nodes(index, "A") == [0]
+    assert find_nodes(index, "missing") == []
+
+
+def test_ego_graph_depth_and_truncation():
+    index = CSRIndex(_graph("abcde", [("a", "b", "X"), ("b", "c", "X"), ("c", "d", "X"), ("a", "e", "Y")]))
+    ego = ego_graph(index, index.index['a'], depth=2)
+    assert [n['id'] for n in ego['nodes']] == ["a", "b", "e", "c"]
+    assert ego['hops'] == [0, 1, 1, 2]
+    assert len(ego['edges']) == 3 and not ego['truncated']
+    assert [n['id'] for n in ego_graph(index, 0, depth=2, types=["X"])['nodes']] == ["a", "b", "c"]
+    assert ego_graph(index, 0, depth=3, max_nodes=2)['truncated']
@@ -0,0 +1,120 @@
+import random
+from collections import deque
+
+import pytest
+
+from graph_index import CSRIndex
+from graph_paths import k_shortest_paths, path_subgraph, shortest_path
+
+
+def _graph(n, edges):
+    return {
+        'nodes': [{'id': str(i), 'label': str(i), 'labels': [], 'properties': {}} for i in range(n)],
+        'edges': [{'from': str(u), 'to': str(v), 'label': t, 'properties': {}} for u, v, t in edges],
+    }
+
+
+def _random_graph(rng, n, m):
+    return _graph(n, [(rng.randrange(n), rng.randrange(n), rng.choice("XY")) for _ in range(m)])
+
+
+def _bfs_length(index, source, target, direction):
+    seen = {source: 0}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for v, _ in index.neighbors(u, direction):
+            if v not in seen:
+                seen[v] = seen[u] + 1
+                queue.append(v)
+    return seen.get(target)
+
+
+def _all_simple_paths(index, source, target, direction):
+    """Tous les chemins sans cycle (par arêtes), par force brute."""
+    found = []
+
+    def walk(nodes, edges):
+        u = nodes[-1]
+        if u == target:
+            found.append((list(nodes), list(edges)))
+            return
+        for v, e in index.neighbors(u, direction):
+            if v not in nodes:
+                walk(nodes + [v], edges + [e])
+
+    walk([source], [])
+    return found
+
+
+def _check_path(index, path, source, target, direction):
+    nodes, edges = path
+    assert nodes[0] == source and nodes[-1] == target
+    assert len(set(nodes)) == len(nodes) and len(edges) == len(nodes) - 1
+    for u, v, e in zip(nodes, nodes[1:], edges):
+        assert (v, e) in set(index.neighbors(u, direction))
+
+
+@pytest.mark.parametrize("direction", ["both", "out", "in"])
+def test_shortest_path_matches_bfs(direction):
+    rng = random.Random(7)
+    for _ in range(30):
+        index = CSRIndex(_random_graph(rng, 12, 18))
+        for source in range(12):
+            for target in range(12):
+                expected = _bfs_length(index, source, target, direction)
+                path = shortest_path(index, source, target, direction, max_depth=20)
+                if expected is None:
+                    assert path is None
+                else:
+                    _check_path(index, path, source, target, direction)
+                    assert len(path[1]) == expected
+
+
+def test_shortest_path_follows_edge_direction():
+    index = CSRIndex(_graph(3, [(0, 1, "X"), (1, 2, "X")]))
+    assert shortest_path(index, 0, 2, "out") == ([0, 1, 2], [0, 1])
+    assert shortest_path(index, 0, 2, "in") is None
+    assert shortest_path(index, 2, 0, "in") == ([2, 1, 0], [1, 0])
+    assert shortest_path(index, 2, 0, "both") == ([2, 1, 0], [1, 0])
+
+
+def test_no_path_and_limits():
+    index = CSRIndex(_graph(4, [(0, 1, "X"), (1, 2, "Y")]))
+    assert shortest_path(index, 0, 3) is None
+    assert k_shortest_paths(index, 0, 3, k=3) == []
+    assert shortest_path(index, 0, 2, max_depth=1) is None
+    assert shortest_path(index, 0, 2, types=index.type_filter(["X"])) is None
+    assert shortest_path(index, 1, 1) == ([1], [])
+
+
+@pytest.mark.parametrize("direction", ["both", "out", "in"])
+def test_k_shortest_paths_matches_brute_force(direction):
+    rng = random.Random(11)
+    for _ in range(30):
+        index = CSRIndex(_random_graph(rng, 8, 12))
+        source, target = rng.sample(range(8), 2)
+        every = _all_simple_paths(index, source, target, direction)
+        k = rng.randint(1, len(every) + 2)
+        paths = k_shortest_paths(index, source, target, k=k, direction=direction, max_depth=20)
+        assert len(paths) == min(k, len(every))
+        for path in paths:
+            _check_path(index, path, source, target, direction)
+        assert len({tuple(edges) for _, edges in paths}) == len(paths)
+        assert [len(e) for _, e in paths] == sorted(len(e) for _, e in every)[:len(paths)]
+
+
+def test_k_larger_than_number_of_paths():
+    # deux chemins 0 → 3 (dont un par une relation parallèle) et un plus long par 4
+    index = CSRIndex(_graph(5, [(0, 1, "X"), (1, 3, "X"), (1, 3, "Y"), (0, 4, "X"), (4, 2, "X"), (2, 3, "X")]))
+    paths = k_shortest_paths(index, 0, 3, k=10, direction="out")
+    assert paths == [([0, 1, 3], [0, 1]), ([0, 1, 3], [0, 2]), ([0, 4, 2, 3], [3, 4, 5])]
+    assert k_shortest_paths(index, 0, 3, k=10, direction="out", types=["X"]) == [([0, 1, 3], [0, 1]), ([0, 4, 2, 3], [3, 4, 5])]
+
+
+def test_path_subgraph():
+    index = CSRIndex(_graph(4, [(0, 1, "X"), (1, 3, "X"), (0, 2, "X"), (2, 3, "X")]))
+    sub = path_subgraph(index, k_shortest_paths(index, 0, 3, k=2, direction="out"))
+    assert [p['nodes'] for p in sub['paths']] == [["0", "1", "3"], ["0", "2", "3"]]
+    assert [p['edges'] for p in sub['paths']] == [[0, 1], [2, 3]]
+    assert len(sub['graph']['nodes']) == 4 and len(sub['graph']['edges']) == 4
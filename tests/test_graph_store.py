@@ -0,0 +1,67 @@
+from graph_store import GraphStore
+
+
+def _node(node_id, labels=("Device",), **properties):
+    return {'id': node_id, 'label': node_id, 'labels': list(labels), 'properties': properties}
+
+
+def _edge(source, target, label="LINK", id=None, **properties):
+    edge = {'from': source, 'to': target, 'label': label, 'properties': properties}
+    if id is not None:
+        edge['id'] = id
+    return edge
+
+
+def test_merge_deduplicates_and_tracks_sources():
+    store = GraphStore()
+    store.add_graph({'nodes': [_node("a"), _node("b")], 'edges': [_edge("a", "b", id="e1")]}, "s1")
+    counts = store.add_graph({'nodes': [_node("b"), _node("c", ("Subnet",))], 'edges': [_edge("a", "b", id="e1"), _edge("b", "c")]}, "s2")
+    assert counts == {'nodes': 2, 'edges': 2, 'new_nodes': 1, 'new_edges': 1}
+    assert store.stats()['nodes'] == 3 and store.stats()['edges'] == 2
+    assert store.node("b")['sources'] == ["s1", "s2"]
+    assert store.node("a")['sources'] == ["s1"]
+    assert [e['id'] for e in store.graph("s1")['edges']] == ["e1"]
+    assert [n['id'] for n in store.graph(label="Subnet")['nodes']] == ["c"]
+    assert store.graph("unknown") is None
+
+
+def test_edge_update_by_id_replaces_it():
+    store = GraphStore()
+    store.add_graph({'nodes': [_node("a"), _node("b"), _node("c")], 'edges': [_edge("a", "b", "OLD", id="e1", port=80)]}, "s1")
+    store.add_graph({'nodes': [], 'edges': [_edge("a", "c", "NEW", id="e1", port=443)]}, "s2")
+    edges = store.graph()['edges']
+    assert edges == [{'from': "a", 'to': "c", 'label': "NEW", 'properties': {'port': 443}, 'id': "e1"}]
+    assert store.updated_edges == 1
+    assert store.node("b")['edges'] == []
+    assert [e['id'] for e in store.node("c")['edges']] == ["e1"]
+
+
+def test_node_update_replaces_properties():
+    store = GraphStore()
+    store.add_graph({'nodes': [_node("a", name="old")], 'edges': []}, "s1")
+    store.add_graph({'nodes': [_node("a", ("Device", "VIP"), name="new")], 'edges': []}, "s1")
+    node = store.node("a")
+    assert node['labels'] == ["Device", "VIP"] and node['properties'] == {'name': "new"}
+    assert store.updated_nodes == 1
+
+
+def test_same_fingerprint_is_skipped():
+    store = GraphStore()
+    graph = {'nodes': [_node("a")], 'edges': []}
+    store.add_graph(graph, "s1", fingerprint="f1")
+    version = store.version
+    assert store.add_graph(graph, "s1", fingerprint="f1")['skipped']
+    assert store.version == version and store.skipped_graphs == 1
+    assert 'skipped' not in store.add_graph(graph, "s1", fingerprint="f2")
+
+
+def test_oldest_source_is_released():
+    store = GraphStore(max_sources=2)
+    store.add_graph({'nodes': [_node("a"), _node("shared")], 'edges': [_edge("a", "shared")]}, "s1")
+    store.add_graph({'nodes': [_node("b"), _node("shared")], 'edges': []}, "s2")
+    store.add_graph({'nodes': [_node("c")], 'edges': []}, "s3")
+    assert [s['source'] for s in store.sources()] == ["s2", "s3"]
+    assert store.node("a") is None
+    assert store.node("shared")['sources'] == ["s2"] and store.node("shared")['edges'] == []
+    assert store.stats()['edges'] == 0 and store.released_sources == 1
+    assert [n['id'] for n in store.graph("s3")['nodes']] == ["c"]
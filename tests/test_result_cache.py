@@ -0,0 +1,59 @@
+import result_cache
+from result_cache import ResultCache, estimate_size
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock.monotonic)
+    cache = ResultCache(ttl=10)
+    cache.set("a", {"x": 1})
+    clock.now += 4
+    assert cache.get("a") == ({"x": 1}, 4)
+    clock.now += 7
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+    assert stats["expirations"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_size_eviction_is_lru():
+    cache = ResultCache(ttl=0, max_bytes=100)
+    for key in "abc":
+        assert cache.set(key, None, size=30)
+    cache.get("a")
+    cache.set("d", None, size=30)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.stats()["bytes"] == 90 and cache.evictions == 1
+
+
+def test_entry_limit_and_replacement():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1, size=10)
+    cache.set("a", 2, size=20)
+    assert cache.stats()["bytes"] == 20
+    cache.set("b", 3, size=10)
+    cache.set("c", 4, size=10)
+    assert cache.get("a") is None and cache.get("b")[0] == 3 and cache.get("c")[0] == 4
+
+
+def test_too_large_is_rejected():
+    cache = ResultCache(max_bytes=10)
+    assert not cache.set("a", "x" * 100)
+    assert cache.get("a") is None and cache.rejected == 1
+
+
+def test_estimate_size_samples_long_lists():
+    # l'échantillon d'une liste homogène donne la même estimation que le parcours complet
+    item = {"id": "n00000", "labels": ["Device"], "properties": {"port": 443}}
+    per_item = estimate_size([item] * result_cache.SAMPLE_SIZE) - 2
+    assert estimate_size([item] * 10000) == 2 + per_item * 10000 // result_cache.SAMPLE_SIZE
+    assert estimate_size("abc") == 5 and estimate_size(None) == 5 and estimate_size(443) == 3